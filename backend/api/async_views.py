@@ -0,0 +1,191 @@
+"""
+Асинхронные представления горячих эндпоинтов чтения (режим ASGI).
+
+Теги, ингредиенты, список и карточка рецепта, короткие ссылки. Выборки
+идут через асинхронный ORM, ответ совпадает с синхронными ViewSet'ами,
+а остальные методы (запись) передаются им через sync_to_async.
+"""
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, Value
+from django.http import Http404, HttpResponse
+from django.shortcuts import redirect
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from foodgram.cache import SHORT_LINK_KEY
+from foodgram.constants import SHORT_CODE_MAX_LENGTH, SHORT_LINK_CACHE_TTL
+from foodgram.metrics import cache_lookup
+from recipes.models import (
+    Favorite, Ingredient, Recipe, ShoppingCart, Tag, decode_short_code,
+)
+from users.models import Follow
+from .facets import get_facets, requested_facets
+from .filters import CustomRecipeFilter, IngredientNameFilter
+from .pagination import CustomRecipePaginator
+from .serializers import (
+    IngredientViewSerializer,
+    RecipeDetailSerializer,
+    TagViewSerializer,
+)
+
+READ_METHODS = ('GET', 'HEAD')
+
+
+def render(data, status=200):
+    return HttpResponse(
+        JSONRenderer().render(data),
+        status=status,
+        content_type='application/json',
+    )
+
+
+def read_or_delegate(async_view, sync_view):
+    """GET/HEAD — асинхронно, остальное — синхронному представлению."""
+    async def view(request, *args, **kwargs):
+        if request.method in READ_METHODS:
+            try:
+                return await async_view(request, *args, **kwargs)
+            except exceptions.APIException as error:
+                detail = error.detail
+                if not isinstance(detail, (list, dict)):
+                    detail = {'detail': detail}
+                return render(detail, error.status_code)
+        return await sync_to_async(sync_view)(request, *args, **kwargs)
+    # csrf_exempt() в Django 4.2 превратил бы view в синхронную.
+    view.csrf_exempt = True
+    return view
+
+
+def not_found(model):
+    # Тот же текст, что у get_object_or_404 в синхронных ViewSet'ах.
+    return exceptions.NotFound(
+        f'No {model._meta.object_name} matches the given query.')
+
+
+async def authenticate(request):
+    """DRF Request с пользователем, определённым по токену."""
+    drf_request = Request(request, authenticators=[
+        authenticator() for authenticator
+        in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    ])
+    # Токен проверяется через кэш и, при промахе, через БД.
+    await sync_to_async(lambda: drf_request.user)()
+    return drf_request
+
+
+async def tag_list(request):
+    tags = [tag async for tag in Tag.objects.all()]
+    return render(TagViewSerializer(tags, many=True).data)
+
+
+async def tag_detail(request, pk):
+    try:
+        tag = await Tag.objects.aget(pk=pk)
+    except Tag.DoesNotExist:
+        raise not_found(Tag)
+    return render(TagViewSerializer(tag).data)
+
+
+async def ingredient_list(request):
+    queryset = IngredientNameFilter().filter_queryset(
+        Request(request), Ingredient.objects.all(), None)
+    ingredients = [ingredient async for ingredient in queryset]
+    return render(IngredientViewSerializer(ingredients, many=True).data)
+
+
+async def ingredient_detail(request, pk):
+    try:
+        ingredient = await Ingredient.objects.aget(pk=pk)
+    except Ingredient.DoesNotExist:
+        raise not_found(Ingredient)
+    return render(IngredientViewSerializer(ingredient).data)
+
+
+def recipe_queryset(user):
+    """Рецепты со всем, что нужно RecipeDetailSerializer, без N+1."""
+    queryset = Recipe.objects.select_related('author').prefetch_related(
+        'tags', 'ingredient_connections__ingredient')
+    if not user.is_authenticated:
+        return queryset.annotate(
+            is_favorited=Value(False),
+            is_in_shopping_cart=Value(False),
+            author_is_subscribed=Value(False),
+        )
+    return queryset.annotate(
+        is_favorited=Exists(Favorite.objects.filter(
+            user=user, recipe=OuterRef('pk'))),
+        is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+            user=user, recipe=OuterRef('pk'))),
+        author_is_subscribed=Exists(Follow.objects.filter(
+            follower=user, following=OuterRef('author'))),
+    )
+
+
+def mark_subscriptions(recipes):
+    for recipe in recipes:
+        recipe.author.is_subscribed = recipe.author_is_subscribed
+    return recipes
+
+
+async def fetch_recipes(queryset):
+    return mark_subscriptions([recipe async for recipe in queryset])
+
+
+def filter_recipes(request, queryset):
+    filterset = CustomRecipeFilter(
+        request.query_params, queryset=queryset, request=request)
+    if not filterset.is_valid():
+        raise exceptions.ValidationError(filterset.errors)
+    return filterset.qs
+
+
+async def recipe_list(request):
+    request = await authenticate(request)
+    facets = requested_facets(request)
+    queryset = await sync_to_async(filter_recipes)(
+        request, recipe_queryset(request.user))
+    # Страница, число и ссылки — тем же пагинатором, что у RecipeViewSet.
+    paginator = CustomRecipePaginator()
+    recipes = await sync_to_async(paginator.paginate_queryset)(
+        queryset, request)
+    serializer = RecipeDetailSerializer(
+        mark_subscriptions(recipes), many=True, context={'request': request})
+    data = paginator.get_paginated_response(serializer.data).data
+    if facets:
+        data['facets'] = await sync_to_async(get_facets)(
+            request, queryset, facets)
+    return render(data)
+
+
+async def recipe_detail(request, pk):
+    request = await authenticate(request)
+    recipes = await fetch_recipes(
+        recipe_queryset(request.user).filter(pk=pk))
+    if not recipes:
+        raise not_found(Recipe)
+    return render(RecipeDetailSerializer(
+        recipes[0], context={'request': request}).data)
+
+
+async def get_recipe_by_hash(request, short_hash):
+    """Асинхронный вариант api.views.get_recipe_by_hash."""
+    if not (short_hash.isascii() and short_hash.isalnum()) or (
+        len(short_hash) > SHORT_CODE_MAX_LENGTH
+    ):
+        raise Http404('Рецепт не найден')
+    key = SHORT_LINK_KEY.format(short_hash)
+    pk = await cache.aget(key)
+    cache_lookup('short_link', pk is not None)
+    if pk is not None:
+        return redirect(f'/recipes/{pk}')
+    pk = await Recipe.objects.filter(short_code=short_hash).values_list(
+        'pk', flat=True).afirst()
+    if pk is None:
+        pk = decode_short_code(short_hash)
+        if pk is None or not await Recipe.objects.filter(pk=pk).aexists():
+            raise Http404('Рецепт не найден')
+    await cache.aset(key, pk, SHORT_LINK_CACHE_TTL)
+    return redirect(f'/recipes/{pk}')
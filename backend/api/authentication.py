@@ -0,0 +1,142 @@
+"""
+Аутентификация по токену с кэшем.
+
+Токен → (пользователь, версия) хранится в общем кэше и в LRU процесса
+с коротким TTL. На каждом запросе одним обращением к общему кэшу
+проверяется, что токен не удалён и версия пользователя не сменилась
+(пароль, is_active, профиль): выход и деактивация действуют сразу,
+а БД запрашивается только при промахе.
+
+Если кэш не общий для воркеров (LocMemCache при GUNICORN_WORKERS > 1),
+токен каждый раз проверяется по БД: иначе воркер, не обработавший
+выход, принимал бы токен до истечения TTL.
+
+Токен читается с основной базы: сразу после входа его может ещё не
+быть на реплике.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from foodgram.cache import VERSION_KEY, auth_namespace, get_versions, token_key
+from foodgram.constants import (
+    AUTH_TOKEN_CACHE_TTL,
+    AUTH_TOKEN_LOCAL_SIZE,
+    AUTH_TOKEN_LOCAL_TTL,
+)
+from foodgram.metrics import cache_lookup
+
+
+class LocalLRUCache:
+    """Потокобезопасный LRU с TTL в памяти процесса."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication без запроса к БД на каждый вызов API."""
+
+    local_cache = LocalLRUCache(AUTH_TOKEN_LOCAL_SIZE, AUTH_TOKEN_LOCAL_TTL)
+
+    def authenticate_credentials(self, key):
+        if not settings.CACHE_SHARED_BY_WORKERS:
+            token = self.get_token(key)
+            return token.user, token
+        cache_key = token_key(key)
+        entry = self.local_cache.get(cache_key)
+        from_local = entry is not None
+        if entry is None:
+            entry = cache.get(cache_key)
+        if entry is not None and not self.is_current(cache_key, entry):
+            self.local_cache.delete(cache_key)
+            entry = None
+        cache_lookup(
+            'auth_token_local' if from_local else 'auth_token',
+            entry is not None,
+        )
+        if entry is None:
+            entry = self.load(key, cache_key)
+        if not from_local:
+            self.local_cache.set(cache_key, entry)
+        # Копия: запросы не должны делить один изменяемый объект.
+        user = copy.copy(entry[0])
+        token = self.get_model()(key=key)
+        # Иначе присваивание user спросит у роутера базу для записи,
+        # и запрос не пойдёт на реплику.
+        token._state.db = user._state.db or DEFAULT_DB_ALIAS
+        token.user = user
+        return user, token
+
+    def is_current(self, cache_key, entry):
+        """Токен не удалён, а версия пользователя не изменилась."""
+        user, version = entry
+        version_key = VERSION_KEY.format(auth_namespace(user.pk))
+        shared = cache.get_many([cache_key, version_key])
+        return cache_key in shared and shared.get(version_key) == version
+
+    def get_token(self, key):
+        model = self.get_model()
+        try:
+            token = model.objects.using(DEFAULT_DB_ALIAS).select_related(
+                'user').get(key=key)
+        except model.DoesNotExist:
+            raise AuthenticationFailed(_('Invalid token.'))
+        if not token.user.is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        return token
+
+    def load(self, key, cache_key):
+        """
+        Версия читается до пользователя: изменение, закоммиченное между
+        чтениями, сменит версию уже после неё, и запись не пройдёт
+        is_current. В обратном порядке старая строка попала бы в кэш
+        под новой версией.
+        """
+        user_id = self.get_model().objects.using(DEFAULT_DB_ALIAS).filter(
+            key=key).values_list('user_id', flat=True).first()
+        if user_id is None:
+            raise AuthenticationFailed(_('Invalid token.'))
+        version = get_versions(auth_namespace(user_id))[0]
+        token = self.get_token(key)
+        entry = (token.user, version)
+        cache.set(cache_key, entry, AUTH_TOKEN_CACHE_TTL)
+        return entry
@@ -0,0 +1,269 @@
+"""
+Пакетный импорт рецептов: NDJSON, по рецепту на строку.
+
+Строки читаются потоком и обрабатываются пачками по IMPORT_BATCH_SIZE:
+форма каждой строки проверяется сериализатором, ссылки на теги и
+ингредиенты — одним запросом на пачку, рецепты и связи вставляются
+через bulk_create в транзакции пачки. Ошибка в строке не мешает
+остальным: в ответе — номер строки и ошибки, как у POST /api/recipes/.
+Изображение строки сохраняется в хранилище сразу после проверки, а
+временный файл закрывается: в пачке остаются только имена файлов.
+Изображения по URL скачиваются в фоне после коммита; до этого у
+рецепта заглушка.
+"""
+import json
+import logging
+import time
+from itertools import islice
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connection, transaction
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import BaseParser
+from rest_framework.serializers import (
+    PrimaryKeyRelatedField,
+    as_serializer_error,
+)
+
+from foodgram.cache import RECIPES_NAMESPACE, bump_version
+from foodgram.constants import (
+    IMPORT_BATCH_SIZE,
+    IMPORT_ERRORS_LIMIT,
+    IMPORT_LINE_MAX_BYTES,
+    RECIPE_IMAGE_SIZES,
+)
+from foodgram.images import (
+    download_image,
+    generate_derivatives,
+    get_placeholder_bytes,
+    run_in_background,
+    schedule_derivatives,
+)
+from foodgram.metrics import recipes_imported
+from recipes.models import Ingredient, Recipe, RecipeChange, Tag
+from .serializers import RecipeImportSerializer
+from .uploads import DecodedImageFile
+
+logger = logging.getLogger(__name__)
+
+# Multipart: файл NDJSON в этом поле, изображения — в остальных.
+RECIPES_FIELD = 'recipes'
+PLACEHOLDER_NAME = 'placeholder.png'
+
+
+def read_lines(stream):
+    """(номер, строка) непустых строк; вместо слишком длинной — None."""
+    number = 0
+    while line := stream.readline(IMPORT_LINE_MAX_BYTES + 1):
+        number += 1
+        if len(line) > IMPORT_LINE_MAX_BYTES:
+            while line and not line.endswith(b'\n'):
+                line = stream.readline(IMPORT_LINE_MAX_BYTES)
+            yield number, None
+        elif line.strip():
+            yield number, line
+
+
+class NDJSONParser(BaseParser):
+    """application/x-ndjson: request.data — ленивый поток строк."""
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return read_lines(stream) if stream is not None else iter(())
+
+
+def attach_remote_image(recipe_id, url, placeholder):
+    """Фоновая задача: изображение по URL вместо заглушки рецепта."""
+    close_old_connections()
+    try:
+        name = download_image(url, Recipe.image.field.upload_to)
+        with transaction.atomic():
+            # Рецепт могли удалить или уже сменить изображение.
+            updated = Recipe.objects.filter(
+                pk=recipe_id, image=placeholder).update(image=name)
+            if updated:
+                RecipeChange.record(RecipeChange.UPDATED, [recipe_id])
+        if updated:
+            bump_version(RECIPES_NAMESPACE)
+            generate_derivatives(name, RECIPE_IMAGE_SIZES)
+    except Exception:
+        logger.warning(
+            'Не удалось загрузить изображение %s рецепта %s',
+            url, recipe_id, exc_info=True,
+        )
+    finally:
+        connection.close()
+
+
+class RecipeImport:
+    """Импорт одного запроса: run(строки) → report()."""
+
+    def __init__(self, request, files):
+        self.request = request
+        self.files = files
+        self.tag_ids = set(Tag.objects.values_list('pk', flat=True))
+        # Один экземпляр на все строки: поля строятся однажды.
+        self.serializer = RecipeImportSerializer(
+            context={'request': request})
+        self.placeholder = None
+        self.received = 0
+        self.failed = 0
+        self.created = []
+        self.errors = []
+        self.seconds = 0.0
+
+    def run(self, lines):
+        started = time.perf_counter()
+        lines = iter(lines)
+        while batch := list(islice(lines, IMPORT_BATCH_SIZE)):
+            self.received += len(batch)
+            self.import_batch(batch)
+        if self.created:
+            bump_version(RECIPES_NAMESPACE)
+        self.seconds = time.perf_counter() - started
+        recipes_imported(len(self.created), self.failed)
+
+    def report(self):
+        return {
+            'received': self.received,
+            'created': self.created,
+            'failed': self.failed,
+            'errors': sorted(self.errors, key=lambda error: error['line']),
+            'seconds': round(self.seconds, 3),
+            'recipes_per_second': round(
+                len(self.created) / self.seconds, 1) if self.seconds else 0,
+        }
+
+    def error(self, number, detail):
+        self.failed += 1
+        if len(self.errors) < IMPORT_ERRORS_LIMIT:
+            self.errors.append({'line': number, 'errors': detail})
+
+    def validate(self, number, line):
+        """Проверенные данные строки или None (ошибка записана)."""
+        if line is None:
+            self.error(number, {'non_field_errors': [
+                f'Строка длиннее {IMPORT_LINE_MAX_BYTES} байт.']})
+            return None
+        try:
+            item = json.loads(line)
+        except ValueError as error:
+            self.error(number, {'non_field_errors': [
+                f'Некорректный JSON: {error}']})
+            return None
+        if not isinstance(item, dict):
+            self.error(number, {'non_field_errors': [
+                'Ожидается JSON-объект рецепта.']})
+            return None
+        if 'image_file' in item:
+            image_file = item.pop('image_file')
+            if image_file not in self.files:
+                self.error(number, {'image_file': [
+                    f'В запросе нет файла {image_file!r}.']})
+                return None
+            item['image'] = self.files[image_file]
+        try:
+            data = self.serializer.run_validation(item)
+        except ValidationError as error:
+            self.error(number, as_serializer_error(error))
+            return None
+        if 'image' in data:
+            data['image'] = self.store_image(data['image'])
+        return data
+
+    @staticmethod
+    def store_image(file):
+        """
+        Имя сохранённого изображения. Декодированный из data URI файл
+        закрывается сразу; файлы multipart закроет сам запрос.
+        """
+        field = Recipe.image.field
+        name = field.storage.save(
+            field.generate_filename(None, file.name), file,
+            max_length=field.max_length,
+        )
+        if isinstance(file, DecodedImageFile):
+            file.close()
+        return name
+
+    def check_references(self, rows):
+        """Строки, все теги и ингредиенты которых существуют."""
+        existing = set(Ingredient.objects.filter(pk__in={
+            component['id']
+            for _, data in rows
+            for component in data['ingredients']
+        }).values_list('pk', flat=True))
+        message = PrimaryKeyRelatedField.default_error_messages[
+            'does_not_exist']
+        valid = []
+        for number, data in rows:
+            errors = {}
+            tags = [pk for pk in data['tags'] if pk not in self.tag_ids]
+            if tags:
+                errors['tags'] = [message.format(pk_value=pk) for pk in tags]
+            ingredients = [
+                component['id'] for component in data['ingredients']
+                if component['id'] not in existing
+            ]
+            if ingredients:
+                errors['ingredients'] = [
+                    message.format(pk_value=pk) for pk in ingredients]
+            if errors:
+                self.error(number, errors)
+            else:
+                valid.append((number, data))
+        return valid
+
+    def get_placeholder(self):
+        """Заглушка для рецептов с image_url (одна на все)."""
+        if self.placeholder is None:
+            self.placeholder = default_storage.save(
+                Recipe.image.field.upload_to + PLACEHOLDER_NAME,
+                ContentFile(get_placeholder_bytes()),
+            )
+        return self.placeholder
+
+    def import_batch(self, batch):
+        rows = []
+        for number, line in batch:
+            data = self.validate(number, line)
+            if data is not None:
+                rows.append((number, data))
+        rows = self.check_references(rows)
+        if not rows:
+            return
+        with transaction.atomic():
+            recipes = Recipe.bulk_create_with_relations(
+                [
+                    Recipe(
+                        author=self.request.user,
+                        name=data['name'],
+                        text=data['text'],
+                        cooking_time=data['cooking_time'],
+                        image=data.get('image') or self.get_placeholder(),
+                    )
+                    for _, data in rows
+                ],
+                [data['tags'] for _, data in rows],
+                [
+                    {
+                        component['id']: component['amount']
+                        for component in data['ingredients']
+                    }
+                    for _, data in rows
+                ],
+            )
+            for recipe, (_, data) in zip(recipes, rows):
+                if 'image_url' in data:
+                    run_in_background(
+                        attach_remote_image,
+                        recipe.pk, data['image_url'], self.placeholder,
+                    )
+                else:
+                    schedule_derivatives(
+                        recipe.image.name, RECIPE_IMAGE_SIZES)
+        self.created.extend(
+            {'line': number, 'id': recipe.pk}
+            for recipe, (number, _) in zip(recipes, rows)
+        )
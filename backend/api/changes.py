@@ -0,0 +1,85 @@
+"""
+Инкрементальная синхронизация рецептов по журналу RecipeChange.
+
+Курсор — непрозрачная строка с (txid, id) последней отданной записи
+журнала; страницы идут по (txid, id) (keyset), без OFFSET. На
+PostgreSQL отдаются только записи транзакций ниже горизонта снимка:
+долгая транзакция задерживает выдачу более поздних изменений, но
+ни одно не теряется. Без курсора журнал читается
+с начала: после уплотнения в нём по записи на рецепт, так что первый
+проход — полный список рецептов.
+
+Уплотнение удаляет запись created, если после неё рецепт менялся:
+рецепт, которого клиент ещё не видел, может прийти в updated. Клиент
+обязан понимать неизвестный id из updated как «загрузить и добавить».
+"""
+import base64
+
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+from recipes.models import RecipeChange
+
+CURSOR_PREFIX = 'c2:'
+# Курсор прежнего формата — id записи; у старых записей txid = 0.
+LEGACY_CURSOR_PREFIX = 'c1:'
+
+
+def encode_cursor(txid, change_id):
+    raw = f'{CURSOR_PREFIX}{txid}:{change_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(txid, id) записи журнала из курсора; (0, 0) — с начала журнала."""
+    if not cursor:
+        return 0, 0
+    try:
+        raw = base64.urlsafe_b64decode(
+            cursor + '=' * (-len(cursor) % 4)).decode()
+        if raw.startswith(CURSOR_PREFIX):
+            txid, change_id = map(int, raw[len(CURSOR_PREFIX):].split(':'))
+        elif raw.startswith(LEGACY_CURSOR_PREFIX):
+            txid, change_id = 0, int(raw[len(LEGACY_CURSOR_PREFIX):])
+        else:
+            raise ValueError(raw)
+        if txid >= 0 and change_id >= 0:
+            return txid, change_id
+    except ValueError:
+        pass
+    raise ValidationError('Некорректный курсор.')
+
+
+def read_changes(since, limit):
+    """
+    Страница журнала после курсора since = (txid, id): id рецептов по
+    итоговому действию, курсор следующей страницы и признак, что есть ещё.
+    """
+    since_txid, since_id = since
+    queryset = RecipeChange.objects.filter(
+        Q(txid__gt=since_txid) | Q(txid=since_txid, id__gt=since_id))
+    # Горизонт — до чтения строк: всё ниже него уже закоммичено.
+    horizon = RecipeChange.commit_horizon(queryset.db)
+    if horizon is not None:
+        queryset = queryset.filter(txid__lt=horizon)
+    rows = list(
+        queryset.order_by('txid', 'id')
+        .values_list('txid', 'id', 'recipe_id', 'action')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    latest = {}
+    created = set()
+    for _, _, recipe_id, action in rows:
+        latest[recipe_id] = action
+        if action == RecipeChange.CREATED:
+            created.add(recipe_id)
+    changes = {action: [] for action, _ in RecipeChange.ACTIONS}
+    for recipe_id, action in latest.items():
+        # Созданный и изменённый на этой странице рецепт клиенту — новый.
+        if action == RecipeChange.UPDATED and recipe_id in created:
+            action = RecipeChange.CREATED
+        changes[action].append(recipe_id)
+    changes['cursor'] = encode_cursor(*(rows[-1][:2] if rows else since))
+    changes['has_more'] = has_more
+    return changes
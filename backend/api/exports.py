@@ -0,0 +1,133 @@
+"""
+Потоковая выгрузка таблиц в NDJSON или CSV.
+
+Строки читаются серверным курсором (.iterator(chunk_size)) с реплики,
+если она настроена, и кодируются по мере чтения: память не зависит от
+размера таблицы. Связи рецептов (теги, ингредиенты) добираются одним
+запросом на каждую выборку курсора. gzip сжимает поток на лету.
+"""
+import csv
+import io
+import json
+import zlib
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import router
+
+from foodgram.constants import EXPORT_BUFFER_BYTES, EXPORT_CHUNK_SIZE
+from foodgram.db.routers import use_replica
+from recipes.models import Favorite, Recipe, RecipeIngredient, ShoppingCart
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+GZIP_CONTENT_TYPE = 'application/gzip'
+# 16 + MAX_WBITS: zlib пишет заголовок и хвост формата gzip
+GZIP_WBITS = 31
+
+
+def database_for(model):
+    """База для всей выгрузки: реплика, если она есть."""
+    with use_replica():
+        return router.db_for_read(model)
+
+
+def recipe_rows(using, chunk_size):
+    recipes = Recipe.objects.using(using).order_by('pk').values_list(
+        'pk', 'name', 'author_id', 'text', 'cooking_time', 'pub_date',
+        'image', 'short_code',
+    ).iterator(chunk_size=chunk_size)
+    while chunk := list(islice(recipes, chunk_size)):
+        ids = [row[0] for row in chunk]
+        tags = {pk: [] for pk in ids}
+        for recipe_id, slug in Recipe.tags.through.objects.using(
+            using
+        ).filter(recipe_id__in=ids).order_by('tag_id').values_list(
+            'recipe_id', 'tag__slug'
+        ):
+            tags[recipe_id].append(slug)
+        ingredients = {pk: [] for pk in ids}
+        for recipe_id, *ingredient in RecipeIngredient.objects.using(
+            using
+        ).filter(recipe_id__in=ids).order_by('pk').values_list(
+            'recipe_id', 'ingredient_id', 'ingredient__name',
+            'ingredient__measurement_unit', 'amount',
+        ):
+            ingredients[recipe_id].append(dict(zip(
+                ('id', 'name', 'measurement_unit', 'amount'), ingredient)))
+        for pk, *row in chunk:
+            yield (pk, *row, tags[pk], ingredients[pk])
+
+
+def user_recipe_rows(model):
+    def rows(using, chunk_size):
+        return model.objects.using(using).order_by('pk').values_list(
+            'pk', 'user_id', 'recipe_id').iterator(chunk_size=chunk_size)
+    return rows
+
+
+# Таблица: (модель, поля, строки(база, chunk_size))
+EXPORTS = {
+    'recipes': (Recipe, (
+        'id', 'name', 'author', 'text', 'cooking_time', 'pub_date',
+        'image', 'short_code', 'tags', 'ingredients',
+    ), recipe_rows),
+    'favorites': (
+        Favorite, ('id', 'user', 'recipe'), user_recipe_rows(Favorite)),
+    'shopping_cart': (
+        ShoppingCart, ('id', 'user', 'recipe'),
+        user_recipe_rows(ShoppingCart)),
+}
+
+
+def export_rows(table, chunk_size=EXPORT_CHUNK_SIZE, using=None):
+    """(поля, строки) таблицы выгрузки."""
+    model, fields, rows = EXPORTS[table]
+    return fields, rows(using or database_for(model), chunk_size)
+
+
+def encode(fields, rows, fmt):
+    """Байтовые куски по EXPORT_BUFFER_BYTES: NDJSON или CSV."""
+    buffer = io.StringIO()
+    if fmt == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+    else:
+        encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        if fmt == 'csv':
+            # Вложенные списки (теги, ингредиенты) — JSON в ячейке.
+            writer.writerow([
+                json.dumps(value, ensure_ascii=False)
+                if isinstance(value, list) else value
+                for value in row
+            ])
+        else:
+            buffer.write(encoder.encode(dict(zip(fields, row))))
+            buffer.write('\n')
+        if buffer.tell() >= EXPORT_BUFFER_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def gzipped(chunks):
+    compressor = zlib.compressobj(wbits=GZIP_WBITS)
+    for chunk in chunks:
+        if data := compressor.compress(chunk):
+            yield data
+    yield compressor.flush()
+
+
+async def async_chunks(chunks):
+    """
+    Синхронный поток для ASGI без чтения целиком: каждый кусок — в
+    одном и том же потоке, где живёт соединение с серверным курсором.
+    """
+    while (chunk := await sync_to_async(next)(chunks, None)) is not None:
+        yield chunk
@@ -0,0 +1,153 @@
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import Count, Exists, F, OuterRef, Q, Sum
+from rest_framework.exceptions import ValidationError
+
+from foodgram.cache import (
+    RECIPES_NAMESPACE,
+    query_signature,
+    user_namespace,
+    versioned_key,
+)
+from foodgram.constants import (
+    COOKING_TIME_BUCKETS,
+    FACET_AUTHORS_LIMIT,
+    FACETS_CACHE_TTL,
+)
+from foodgram.metrics import cache_lookup
+from recipes.models import Recipe, Tag
+
+FACETS_PARAM = 'facets'
+FACET_NAMES = ('tags', 'author', 'cooking_time_bucket')
+# Параметры, не влияющие на отфильтрованную выборку.
+NON_FILTER_PARAMS = ('page', 'limit', 'offset')
+USER_FILTER_PARAMS = ('is_favorited', 'is_in_shopping_cart')
+
+
+def requested_facets(request):
+    """Список фасетов из ?facets=..., пустой — если блок не запрошен."""
+    raw = request.query_params.get(FACETS_PARAM)
+    if not raw:
+        return []
+    names = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = set(names) - set(FACET_NAMES)
+    if unknown:
+        raise ValidationError({FACETS_PARAM: (
+            f'Неизвестные фасеты: {", ".join(sorted(unknown))}. '
+            f'Доступны: {", ".join(FACET_NAMES)}.'
+        )})
+    return [name for name in FACET_NAMES if name in names]
+
+
+def _count_aggregates(names, tags):
+    """Агрегаты счётчиков тегов и интервалов времени приготовления."""
+    aggregates = {}
+    if 'tags' in names:
+        for tag in tags:
+            if tag.mask_bit:
+                aggregates[f'tag_{tag.pk}'] = Sum(
+                    F('tags_mask').bitrightshift(tag.pk - 1).bitand(1))
+            else:
+                aggregates[f'tag_{tag.pk}'] = Count('pk', filter=Q(Exists(
+                    Recipe.tags.through.objects.filter(
+                        recipe=OuterRef('pk'), tag=tag))))
+    if 'cooking_time_bucket' in names:
+        for label, lower, upper in COOKING_TIME_BUCKETS:
+            condition = Q(cooking_time__gte=lower)
+            if upper is not None:
+                condition &= Q(cooking_time__lt=upper)
+            aggregates[f'bucket_{label}'] = Count('pk', filter=condition)
+    return aggregates
+
+
+def _author_counts(queryset, aggregates):
+    """
+    Топ авторов и остальные счётчики одним запросом.
+
+    Внутренний запрос группирует выборку по автору, внешний суммирует
+    групповые счётчики оконной функцией SUM() OVER () до LIMIT, так что
+    итоги по тегам и интервалам есть в каждой строке топа.
+    """
+    grouped = queryset.values(
+        facet_author_id=F('author_id'),
+        facet_username=F('author__username'),
+    ).annotate(facet_count=Count('pk'), **aggregates)
+    try:
+        sql, params = grouped.query.get_compiler(using=grouped.db).as_sql()
+    except EmptyResultSet:
+        return [], {}
+    connection = connections[grouped.db]
+    quote = connection.ops.quote_name
+    columns = ['facet_author_id', 'facet_username', 'facet_count'] + [
+        f'SUM({quote(alias)}) OVER () AS {quote(alias)}'
+        for alias in aggregates
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT {", ".join(columns)} FROM ({sql}) grouped '
+            f'ORDER BY facet_count DESC, facet_author_id LIMIT %s',
+            (*params, FACET_AUTHORS_LIMIT),
+        )
+        rows = cursor.fetchall()
+    authors = [
+        {'id': author_id, 'username': username, 'count': count}
+        for author_id, username, count, *_ in rows
+    ]
+    totals = dict(zip(aggregates, rows[0][3:])) if rows else {}
+    return authors, totals
+
+
+def compute_facets(queryset, names):
+    """
+    Счётчики фасетов по уже отфильтрованной выборке рецептов.
+
+    Все счётчики считаются одним запросом к рецептам; ещё один запрос —
+    список тегов, по которому строятся агрегаты и подписи фасета tags.
+    """
+    tags = list(Tag.objects.order_by('pk')) if 'tags' in names else []
+    aggregates = _count_aggregates(names, tags)
+    queryset = queryset.order_by()
+    if 'author' in names:
+        authors, counts = _author_counts(queryset, aggregates)
+    elif aggregates:
+        counts = queryset.aggregate(**aggregates)
+    else:
+        counts = {}
+    facets = {}
+    if 'tags' in names:
+        facets['tags'] = [
+            {
+                'id': tag.pk,
+                'slug': tag.slug,
+                'name': tag.name,
+                'count': int(counts.get(f'tag_{tag.pk}') or 0),
+            }
+            for tag in tags
+        ]
+    if 'author' in names:
+        facets['author'] = authors
+    if 'cooking_time_bucket' in names:
+        facets['cooking_time_bucket'] = [
+            {'bucket': label, 'count': int(counts.get(f'bucket_{label}') or 0)}
+            for label, _, _ in COOKING_TIME_BUCKETS
+        ]
+    return facets
+
+
+def get_facets(request, queryset, names):
+    """Фасеты с кэшированием по подписи фильтров и версиям данных."""
+    namespaces = [RECIPES_NAMESPACE]
+    user = request.user
+    if user.is_authenticated and any(
+        param in request.query_params for param in USER_FILTER_PARAMS
+    ):
+        namespaces.append(user_namespace(user.pk))
+    signature = query_signature(request.query_params, NON_FILTER_PARAMS)
+    key = versioned_key('facets', signature, namespaces)
+    facets = cache.get(key)
+    cache_lookup('facets', facets is not None)
+    if facets is None:
+        facets = compute_facets(queryset, names)
+        cache.set(key, facets, FACETS_CACHE_TTL)
+    return facets
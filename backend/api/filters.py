@@ -1,9 +1,9 @@
-from django.db.models import Q
+from django.db.models import Exists, F, OuterRef, Q
 from django_filters import rest_framework as filters
 
 from rest_framework.filters import SearchFilter
 
-from recipes.models import Recipe, Tag
+from recipes.models import Favorite, Recipe, ShoppingCart, Tag
 
 
 class IngredientNameFilter(SearchFilter):
@@ -21,13 +21,13 @@ class IngredientNameFilter(SearchFilter):
         for term in search_terms:
             query |= Q(name__istartswith=term)
 
-        return queryset.filter(query).distinct()
+        return queryset.filter(query)
 
 
 class CustomRecipeFilter(filters.FilterSet):
     """
     Фильтры для рецептов:
-    - по тегам (slug),
+    - по тегам (slug): tags — любой из, tags_all — все сразу,
     - по автору (id),
     - только избранные текущего пользователя,
     - только в корзине текущего пользователя.
@@ -37,9 +37,18 @@ class CustomRecipeFilter(filters.FilterSet):
         queryset=Tag.objects.all(),
         field_name='tags__slug',
         to_field_name='slug',
+        method='filter_tags',
         label='Список тегов для фильтрации',
     )
 
+    tags_all = filters.ModelMultipleChoiceFilter(
+        queryset=Tag.objects.all(),
+        field_name='tags__slug',
+        to_field_name='slug',
+        method='filter_tags_all',
+        label='Рецепты, у которых есть все указанные теги',
+    )
+
     author = filters.NumberFilter(
         field_name='author__id',
         label='Идентификатор автора рецепта',
@@ -57,17 +66,61 @@ class CustomRecipeFilter(filters.FilterSet):
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'tags', 'tags_all', 'author',
+            'is_favorited', 'is_in_shopping_cart',
+        )
+
+    @staticmethod
+    def _split_tags(tags):
+        """Маска тегов, попавших в tags_mask, и список остальных."""
+        mask = 0
+        overflow = []
+        for tag in tags:
+            if tag.mask_bit:
+                mask |= tag.mask_bit
+            else:
+                overflow.append(tag)
+        return mask, overflow
+
+    @staticmethod
+    def _has_tags(tags):
+        return Exists(Recipe.tags.through.objects.filter(
+            recipe=OuterRef('pk'), tag__in=tags))
+
+    def filter_tags(self, queryset, name, value):
+        """Хотя бы один из тегов: (tags_mask & mask) != 0."""
+        mask, overflow = self._split_tags(value)
+        condition = Q()
+        if mask:
+            queryset = queryset.alias(
+                tags_any_bits=F('tags_mask').bitand(mask))
+            condition |= ~Q(tags_any_bits=0)
+        if overflow:
+            condition |= Q(self._has_tags(overflow))
+        return queryset.filter(condition)
+
+    def filter_tags_all(self, queryset, name, value):
+        """Все теги сразу: (tags_mask & mask) == mask."""
+        mask, overflow = self._split_tags(value)
+        if mask:
+            queryset = queryset.alias(
+                tags_all_bits=F('tags_mask').bitand(mask)
+            ).filter(tags_all_bits=mask)
+        for tag in overflow:
+            queryset = queryset.filter(self._has_tags([tag]))
+        return queryset
 
-    def filter_is_favorited(self, queryset, name, value):
+    def _filter_user_relation(self, queryset, model, value):
+        """Рецепты, связанные с текущим пользователем через model (EXISTS)."""
         user = getattr(self.request, 'user', None)
         if value and user and user.is_authenticated:
-
-            return queryset.filter(in_favorites__user=user).distinct()
+            return queryset.filter(Exists(model.objects.filter(
+                user=user, recipe=OuterRef('pk'))))
         return queryset
 
+    def filter_is_favorited(self, queryset, name, value):
+        return self._filter_user_relation(queryset, Favorite, value)
+
     def filter_is_in_shopping_cart(self, queryset, name, value):
-        user = getattr(self.request, 'user', None)
-        if value and user and user.is_authenticated:
-            return queryset.filter(in_shopping_carts__user=user).distinct()
-        return queryset
+        return self._filter_user_relation(queryset, ShoppingCart, value)
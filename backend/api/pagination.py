@@ -1,10 +1,161 @@
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connections
+from django.utils.functional import cached_property
 from rest_framework.pagination import PageNumberPagination
 
-from foodgram.constants import RECIPE_PAGINATION
+from foodgram.cache import (
+    RECIPES_NAMESPACE,
+    USERS_NAMESPACE,
+    hash_signature,
+    user_namespace,
+    versioned_key,
+)
+from foodgram.constants import (
+    COUNT_CACHE_TTL,
+    COUNT_ESTIMATE_THRESHOLD,
+    RECIPE_PAGE_SIZE_MAX,
+    RECIPE_PAGINATION,
+    USER_PAGE_SIZE_MAX,
+    USER_PAGINATION,
+)
+from foodgram.metrics import cache_lookup
 
 
-class CustomRecipePaginator(PageNumberPagination):
+def estimate_count(queryset):
+    """
+    Оценка числа строк таблицы по pg_class.reltuples.
+
+    Только для выборок без условий на Postgres и только для больших
+    таблиц; иначе None — считать нужно точно.
+    """
+    connection = connections[queryset.db]
+    query = queryset.query
+    if (
+        connection.vendor != 'postgresql'
+        or query.where or query.distinct or query.combinator
+        or query.low_mark or query.high_mark is not None
+    ):
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    if row and row[0] >= COUNT_ESTIMATE_THRESHOLD:
+        return row[0]
+    return None
+
+
+class CountingPaginator(DjangoPaginator):
+    """Paginator, получающий число объектов через count_func."""
+
+    def __init__(self, object_list, per_page, count_func, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_func = count_func
+
+    @cached_property
+    def count(self):
+        return self.count_func(self.object_list)
+
+
+class CachedCountMixin:
+    """
+    Кэшируемый COUNT(*) для пагинаторов.
+
+    Точное число кэшируется на COUNT_CACHE_TTL по подписи SQL-запроса
+    и версиям get_count_namespaces(). Выборки без фильтров на больших
+    таблицах Postgres считаются по оценке reltuples. Признак точности
+    отдаётся в ответе полем count_is_exact.
+    """
+    count_cache_prefix = None
+    count_namespaces = ()
+    count_is_exact = True
+
+    @staticmethod
+    def get_exact_count(queryset):
+        try:
+            return queryset.count()
+        except (AttributeError, TypeError):
+            return len(queryset)
+
+    def get_count_namespaces(self):
+        return list(self.count_namespaces)
+
+    def get_count(self, queryset):
+        self.count_is_exact = True
+        if not self.count_cache_prefix or not hasattr(queryset, 'query'):
+            return self.get_exact_count(queryset)
+        estimate = estimate_count(queryset)
+        if estimate is not None:
+            self.count_is_exact = False
+            return estimate
+        try:
+            sql = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        key = versioned_key(
+            self.count_cache_prefix,
+            hash_signature(sql),
+            self.get_count_namespaces(),
+        )
+        count = cache.get(key)
+        cache_lookup('count', count is not None)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, COUNT_CACHE_TTL)
+        return count
+
+    def django_paginator_class(self, queryset, page_size):
+        return CountingPaginator(queryset, page_size, self.get_count)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['count_is_exact'] = self.count_is_exact
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_is_exact'] = {
+            'type': 'boolean',
+            'example': True,
+        }
+        return response_schema
+
+
+class LimitPageNumberPagination(CachedCountMixin, PageNumberPagination):
+    """
+    Нумерация страниц с размером страницы в параметре limit.
+
+    Слишком большой limit не отклоняется, а урезается до max_page_size.
+    """
+
+    page_size_query_param = 'limit'
+
+
+class CustomRecipePaginator(LimitPageNumberPagination):
     """Нумерация страниц."""
 
     page_size = RECIPE_PAGINATION
-    page_size_query_param = 'name'
+    max_page_size = RECIPE_PAGE_SIZE_MAX
+    count_cache_prefix = 'recipes-count'
+    count_namespaces = (RECIPES_NAMESPACE,)
+
+    def get_count_namespaces(self):
+        namespaces = super().get_count_namespaces()
+        user = getattr(self.request, 'user', None)
+        if user and user.is_authenticated:
+            # is_favorited / is_in_shopping_cart зависят от пользователя.
+            namespaces.append(user_namespace(user.pk))
+        return namespaces
+
+
+class UserListPaginator(LimitPageNumberPagination):
+    """Пагинация пользователей и подписок."""
+
+    page_size = USER_PAGINATION
+    max_page_size = USER_PAGE_SIZE_MAX
+    count_cache_prefix = 'users-count'
+    count_namespaces = (USERS_NAMESPACE,)
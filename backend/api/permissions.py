@@ -17,3 +17,9 @@ class ContentOwnerAccessControl(BasePermission):
             return True
         return getattr(
             obj, 'author_id', None) == getattr(request.user, 'id', None)
+
+
+def can_import_remote_images(user):
+    """image_url в импорте: сотрудники и партнёры с правом на это."""
+    return bool(user and user.is_authenticated and (
+        user.is_staff or user.has_perm('recipes.import_remote_images')))
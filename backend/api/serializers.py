@@ -1,7 +1,5 @@
-import base64
-import uuid
-
-from django.core.files.base import ContentFile
+from django.core.files import File
+from django.db import transaction
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
@@ -14,17 +12,52 @@ from recipes.models import (
     Tag,
 )
 from users.models import Follow, User
-from foodgram.constants import BASIC_MIN_VALUE, MAXIMUM_QUANTITY
+from foodgram.constants import (
+    BASIC_MIN_VALUE,
+    CHANGES_MAX_PAGE_SIZE,
+    CHANGES_PAGE_SIZE,
+    MAXIMUM_QUANTITY,
+)
+from foodgram.images import build_srcset
+from foodgram.performance import TimedSerializerMixin
+from .changes import decode_cursor
+from .permissions import can_import_remote_images
+from .uploads import check_uploaded_image, decode_base64_image
+
+
+class TimedModelSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """ModelSerializer с замером времени сериализации (Server-Timing)."""
 
 
-class CompactRecipeViewSerializer(serializers.ModelSerializer):
+class ImageSrcsetField(serializers.Field):
+    """
+    srcset миниатюр поля image_field по форматам (None, пока не готовы).
+    Ширины — из <image_field>_derivatives той же строки.
+    """
+    def __init__(self, image_field, **kwargs):
+        kwargs['read_only'] = True
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+        self.image_field = image_field
+
+    def to_representation(self, instance):
+        return build_srcset(
+            getattr(instance, self.image_field),
+            getattr(instance, f'{self.image_field}_derivatives'),
+            self.context.get('request'),
+        )
+
+
+class CompactRecipeViewSerializer(TimedModelSerializer):
     """Компактное отображение рецепта."""
+    image_srcset = ImageSrcsetField('image')
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_srcset', 'cooking_time')
 
 
-class UnionFavoriteShoppingCartSerializer(serializers.ModelSerializer):
+class UnionFavoriteShoppingCartSerializer(TimedModelSerializer):
     """
     Универсальный сериализатор для представления рецептов
     в избранном и корзине.
@@ -77,34 +110,28 @@ class ShoppingCartSerializer(BaseUserRecipeRelationSerializer):
 
 
 class Base64ImageConverter(serializers.ImageField):
-    """Конвертер для изображений в формате base64."""
+    """Конвертер для изображений в формате base64 или multipart-файлом."""
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            try:
-                format, imgstr = data.split(';base64,')
-                ext = format.split('/')[-1]
-                data = ContentFile(
-                    base64.b64decode(imgstr),
-                    name=f'{uuid.uuid4()}.{ext}',
-                )
-            except Exception:
-                raise serializers.ValidationError('Некорректное изображение.')
+            data = decode_base64_image(data)
+        elif isinstance(data, File):
+            check_uploaded_image(data)
         return super().to_internal_value(data)
 
 
-class TagViewSerializer(serializers.ModelSerializer):
+class TagViewSerializer(TimedModelSerializer):
     class Meta:
         model = Tag
         fields = '__all__'
 
 
-class IngredientViewSerializer(serializers.ModelSerializer):
+class IngredientViewSerializer(TimedModelSerializer):
     class Meta:
         model = Ingredient
         fields = '__all__'
 
 
-class RecipeComponentViewSerializer(serializers.ModelSerializer):
+class RecipeComponentViewSerializer(TimedModelSerializer):
     """Ингредиент в составе рецепта."""
     id = serializers.ReadOnlyField(source='ingredient.id')
     name = serializers.ReadOnlyField(source='ingredient.name')
@@ -117,7 +144,7 @@ class RecipeComponentViewSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
-class RecipeComponentEditSerializer(serializers.ModelSerializer):
+class RecipeComponentEditSerializer(TimedModelSerializer):
     """
     Сериализатор для обновления ингредиентов в рецепте.
     Используется для валидации и передачи информации
@@ -138,10 +165,11 @@ class RecipeComponentEditSerializer(serializers.ModelSerializer):
         fields = ('id', 'amount')
 
 
-class UserProfileViewSerializer(serializers.ModelSerializer):
+class UserProfileViewSerializer(TimedModelSerializer):
     """Сериализатор для чтения данных пользователя с проверкой подписки."""
     is_subscribed = serializers.SerializerMethodField(read_only=True)
     avatar = Base64ImageConverter(required=False, allow_null=True)
+    avatar_srcset = ImageSrcsetField('avatar')
 
     class Meta:
         model = User
@@ -153,10 +181,14 @@ class UserProfileViewSerializer(serializers.ModelSerializer):
             'last_name',
             'is_subscribed',
             'avatar',
+            'avatar_srcset',
         )
 
     def get_is_subscribed(self, obj):
         """Проверяет подписку текущего пользователя на просматриваемого."""
+        # Асинхронные представления заранее аннотируют признак.
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return request.user.following_authors.filter(
@@ -165,10 +197,11 @@ class UserProfileViewSerializer(serializers.ModelSerializer):
         return False
 
 
-class RecipeDetailSerializer(serializers.ModelSerializer):
+class RecipeDetailSerializer(TimedModelSerializer):
     """Полное представление рецепта."""
     author = UserProfileViewSerializer(read_only=True)
     image = Base64ImageConverter()
+    image_srcset = ImageSrcsetField('image')
     ingredients = RecipeComponentViewSerializer(
         source='ingredient_connections', many=True, read_only=True
     )
@@ -187,11 +220,14 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'author',
             'image',
+            'image_srcset',
             'cooking_time',
             'name',
         )
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         user = getattr(request, 'user', None)
         if not user or not user.is_authenticated:
@@ -199,6 +235,8 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
         return user.favorites.filter(recipe=obj).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context.get('request')
         user = getattr(request, 'user', None)
         if not user or not user.is_authenticated:
@@ -206,7 +244,7 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
         return user.shopping_carts.filter(recipe=obj).exists()
 
 
-class RecipeEditHandlerSerializer(serializers.ModelSerializer):
+class RecipeEditHandlerSerializer(TimedModelSerializer):
     """
     Сериализатор для обновления рецепта.
     Обрабатывает вложенные ингредиенты и теги, выполняет валидацию,
@@ -276,8 +314,9 @@ class RecipeEditHandlerSerializer(serializers.ModelSerializer):
             ) for ingredient in ingredients
         ])
 
+    @transaction.atomic
     def create(self, validate_data):
-        """Создание рецепта."""
+        """Создание рецепта (вместе со связями и журналом изменений)."""
         ingredients = validate_data.pop('ingredients')
         tags = validate_data.pop('tags')
         validate_data['author'] = self.context['request'].user
@@ -286,6 +325,7 @@ class RecipeEditHandlerSerializer(serializers.ModelSerializer):
         self.create_ingredients(ingredients, recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, recipe, validate_data):
         """Обновление рецепта."""
         ingredients = validate_data.pop('ingredients')
@@ -304,6 +344,76 @@ class RecipeEditHandlerSerializer(serializers.ModelSerializer):
         return RecipeDetailSerializer(instance, context=context).data
 
 
+class ImportComponentSerializer(serializers.Serializer):
+    """Ингредиент строки импорта: id проверяется пачкой, не здесь."""
+    id = serializers.IntegerField()
+    amount = serializers.IntegerField(
+        min_value=BASIC_MIN_VALUE,
+        max_value=MAXIMUM_QUANTITY
+    )
+
+
+class RecipeImportSerializer(RecipeEditHandlerSerializer):
+    """
+    Строка пакетного импорта рецептов.
+
+    Теги и ингредиенты — просто id: их существование проверяется сразу
+    для пачки строк, а не запросом на каждую ссылку. Изображение —
+    data URI или файл (image) либо адрес для фоновой загрузки (image_url).
+    """
+    author = None
+    image = Base64ImageConverter(required=False)
+    image_url = serializers.URLField(required=False)
+    ingredients = ImportComponentSerializer(many=True)
+    tags = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+    )
+
+    class Meta(RecipeEditHandlerSerializer.Meta):
+        fields = (
+            'ingredients',
+            'tags',
+            'image',
+            'image_url',
+            'name',
+            'text',
+            'cooking_time',
+        )
+
+    def validate_image_url(self, value):
+        request = self.context.get('request')
+        if not can_import_remote_images(getattr(request, 'user', None)):
+            raise serializers.ValidationError(
+                'Загрузка изображений по URL доступна только сотрудникам '
+                'и партнёрам.'
+            )
+        return value
+
+    def validate(self, data):
+        data = super().validate(data)
+        if ('image' in data) == ('image_url' in data):
+            raise serializers.ValidationError(
+                {'image': 'Нужно ровно одно из полей image и image_url.'}
+            )
+        return data
+
+
+class ChangesQuerySerializer(serializers.Serializer):
+    """Параметры /recipes/changes/: курсор, размер страницы, expand."""
+    since = serializers.CharField(
+        required=False, allow_blank=True, default='')
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=CHANGES_MAX_PAGE_SIZE,
+        default=CHANGES_PAGE_SIZE,
+    )
+    expand = serializers.BooleanField(default=False)
+
+    def validate_since(self, value):
+        return decode_cursor(value)
+
+
 class FollowDetailViewSerializer(UserProfileViewSerializer):
     """Сериализатор для отображения подписок с рецептами."""
     recipes = serializers.SerializerMethodField()
@@ -339,7 +449,7 @@ class FollowDetailViewSerializer(UserProfileViewSerializer):
         return serializer.data
 
 
-class FollowCreateHandlerSerializer(serializers.ModelSerializer):
+class FollowCreateHandlerSerializer(TimedModelSerializer):
     """Сериализатор для создания подписок."""
     class Meta:
         model = Follow
@@ -0,0 +1,54 @@
+import json
+
+from asgiref.sync import async_to_sync
+from django.test import RequestFactory
+from rest_framework.test import APITestCase
+
+from api.async_views import read_or_delegate, recipe_list
+from api.views import RecipeViewSet
+from recipes.models import Recipe
+from users.models import User
+
+RECIPES_URL = '/api/recipes/'
+
+
+class AsyncRecipeListTests(APITestCase):
+    """Асинхронный список рецептов отвечает так же, как RecipeViewSet."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username='cook', email='cook@example.com', password='password',
+            first_name='Имя', last_name='Фамилия',
+        )
+        Recipe.objects.bulk_create(
+            Recipe(
+                name=f'Рецепт {index}', text='Описание', cooking_time=10,
+                author=author, image='recipes/images/image.png',
+            )
+            for index in range(7)
+        )
+
+    def get_async(self, params):
+        view = read_or_delegate(
+            recipe_list, RecipeViewSet.as_view({'get': 'list'}))
+        request = RequestFactory().get(RECIPES_URL, params)
+        response = async_to_sync(view)(request)
+        return response.status_code, json.loads(response.content)
+
+    def test_same_pages_as_sync_view(self):
+        for params in (
+            {},
+            {'limit': 3},
+            {'limit': 3, 'page': 2},
+            {'limit': 3, 'page': 'last'},
+            {'limit': 3, 'page': 4},
+            {'limit': 3, 'page': 'x'},
+            {'limit': 3, 'facets': 'author'},
+        ):
+            response = self.client.get(RECIPES_URL, params)
+            self.assertEqual(
+                self.get_async(params),
+                (response.status_code, response.json()),
+                params,
+            )
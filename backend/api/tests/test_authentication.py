@@ -0,0 +1,60 @@
+from unittest import mock
+
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from api.authentication import CachedTokenAuthentication
+from users.models import User
+
+ME_URL = '/api/users/me/'
+
+
+class CachedTokenRaceTests(APITestCase):
+    """Изменение, закоммиченное во время промаха кэша, не теряется."""
+
+    def setUp(self):
+        cache.clear()
+        CachedTokenAuthentication.local_cache.clear()
+        self.user = User.objects.create_user(
+            username='cook', email='cook@example.com', password='password',
+            first_name='Имя', last_name='Фамилия',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def race(self, change):
+        """Промах кэша, во время которого другой запрос коммитит change."""
+        get_token = CachedTokenAuthentication.get_token
+
+        def get_token_then_change(auth, key):
+            token = get_token(auth, key)
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+            return token
+
+        with mock.patch.object(
+            CachedTokenAuthentication, 'get_token', get_token_then_change
+        ):
+            # Этот запрос начался до изменения и ещё проходит.
+            self.assertEqual(self.client.get(ME_URL).status_code, 200)
+        CachedTokenAuthentication.local_cache.clear()
+        return self.client.get(ME_URL)
+
+    def deactivate(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save()
+
+    def test_deactivation_during_load(self):
+        self.assertEqual(self.race(self.deactivate).status_code, 401)
+
+    def test_logout_during_load(self):
+        self.assertEqual(self.race(self.token.delete).status_code, 401)
+
+    def test_cached_token_is_reused(self):
+        self.assertEqual(self.client.get(ME_URL).status_code, 200)
+        with mock.patch.object(
+            CachedTokenAuthentication, 'load', side_effect=AssertionError
+        ):
+            self.assertEqual(self.client.get(ME_URL).status_code, 200)
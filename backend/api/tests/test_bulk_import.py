@@ -0,0 +1,116 @@
+import json
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import Permission
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from api.uploads import TOO_LARGE_MESSAGE
+from foodgram.constants import IMAGE_UPLOAD_MAX_BYTES
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+IMPORT_URL = '/api/recipes/import/'
+PIXEL = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJ'
+    'AAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=='
+)
+
+
+class BulkImportUploadTests(APITestCase):
+    """Лимит размера multipart касается изображений, а не файла NDJSON."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media = tempfile.mkdtemp()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media)
+        cls.media_settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='importer', email='importer@example.com',
+            password='password', first_name='Имя', last_name='Фамилия',
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(name='Завтрак', slug='breakfast')
+        self.ingredient = Ingredient.objects.create(
+            name='Соль', measurement_unit='г')
+
+    def line(self, **fields):
+        return json.dumps({
+            'name': 'Рецепт',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'tags': [self.tag.pk],
+            'ingredients': [{'id': self.ingredient.pk, 'amount': 5}],
+            **fields,
+        }, ensure_ascii=False)
+
+    def test_manifest_larger_than_image_limit(self):
+        line = self.line(text='т' * 50_000, image=PIXEL)
+        count = IMAGE_UPLOAD_MAX_BYTES // len(line.encode()) + 1
+        manifest = SimpleUploadedFile(
+            'recipes.ndjson', '\n'.join([line] * count).encode(),
+            content_type='application/x-ndjson',
+        )
+        self.assertGreater(manifest.size, IMAGE_UPLOAD_MAX_BYTES)
+        response = self.client.post(
+            IMPORT_URL, {'recipes': manifest}, format='multipart')
+        self.assertEqual(response.status_code, 200, response.content[:500])
+        self.assertEqual(response.data['failed'], 0)
+        self.assertEqual(len(response.data['created']), count)
+        self.assertEqual(Recipe.objects.count(), count)
+
+    def test_image_file_over_limit_is_rejected(self):
+        manifest = SimpleUploadedFile(
+            'recipes.ndjson', self.line(image_file='photo').encode(),
+            content_type='application/x-ndjson',
+        )
+        photo = SimpleUploadedFile(
+            'photo.png', b'\0' * (IMAGE_UPLOAD_MAX_BYTES + 1),
+            content_type='image/png',
+        )
+        response = self.client.post(
+            IMPORT_URL, {'recipes': manifest, 'photo': photo},
+            format='multipart',
+        )
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(
+            response.json(), {'detail': TOO_LARGE_MESSAGE})
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_body_over_import_limit_is_rejected(self):
+        body = '\n'.join([self.line()] * 3).encode()
+        with mock.patch('api.views.IMPORT_BODY_MAX_BYTES', len(body) - 1):
+            response = self.client.post(
+                IMPORT_URL, body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 413)
+        self.assertIn('detail', response.json())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_image_url_requires_permission(self):
+        body = self.line(image_url='https://example.org/soup.jpg').encode()
+        response = self.client.post(
+            IMPORT_URL, body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['failed'], 1)
+        self.assertIn(
+            'image_url', response.data['errors'][0]['errors'])
+        self.user.user_permissions.add(Permission.objects.get(
+            codename='import_remote_images'))
+        self.user = User.objects.get(pk=self.user.pk)
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            IMPORT_URL, body, content_type='application/x-ndjson')
+        self.assertEqual(response.data['failed'], 0)
+        self.assertEqual(Recipe.objects.count(), 1)
@@ -0,0 +1,161 @@
+import base64
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+
+from api.changes import decode_cursor, encode_cursor
+from recipes.models import Recipe, RecipeChange
+from users.models import User
+
+CHANGES_URL = '/api/recipes/changes/'
+
+
+class RecipeChangesTests(APITestCase):
+    """Синхронизация по журналу изменений: курсоры, страницы, уплотнение."""
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username='cook', email='cook@example.com', password='password',
+            first_name='Имя', last_name='Фамилия',
+        )
+
+    def create_recipe(self, name='Рецепт'):
+        return Recipe.objects.create(
+            name=name, text='Описание', cooking_time=10,
+            author=self.author, image='recipes/images/image.png',
+        )
+
+    def read(self, since='', **params):
+        response = self.client.get(CHANGES_URL, {'since': since, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def read_all(self, since='', limit=2):
+        """Все страницы от since: итоговое действие по каждому рецепту."""
+        state = {}
+        while True:
+            page = self.read(since, limit=limit)
+            for action in ('created', 'updated', 'deleted'):
+                for recipe_id in page[action]:
+                    state[recipe_id] = action
+            since = page['cursor']
+            if not page['has_more']:
+                return state, since
+
+    def test_cursor_round_trip(self):
+        for position in ((0, 0), (0, 1), (7, 42), (10 ** 12, 10 ** 12)):
+            self.assertEqual(decode_cursor(encode_cursor(*position)), position)
+        self.assertEqual(decode_cursor(''), (0, 0))
+        legacy = base64.urlsafe_b64encode(b'c1:42').decode()
+        self.assertEqual(decode_cursor(legacy), (0, 42))
+
+    def test_invalid_cursor(self):
+        for cursor in (
+            'garbage',
+            base64.urlsafe_b64encode(b'c1:-1').decode(),
+            base64.urlsafe_b64encode(b'c3:5').decode(),
+            base64.urlsafe_b64encode(b'c1:x').decode(),
+            base64.urlsafe_b64encode(b'c2:5').decode(),
+            base64.urlsafe_b64encode(b'c2:1:-5').decode(),
+        ):
+            response = self.client.get(CHANGES_URL, {'since': cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+            self.assertIn('since', response.json())
+
+    def test_keyset_pages(self):
+        recipes = [self.create_recipe(f'Рецепт {n}') for n in range(5)]
+        first = self.read(limit=2)
+        self.assertEqual(first['created'], [recipes[0].pk, recipes[1].pk])
+        self.assertTrue(first['has_more'])
+        state, cursor = self.read_all(first['cursor'])
+        self.assertEqual(
+            state, {recipe.pk: 'created' for recipe in recipes[2:]})
+        last = self.read(cursor)
+        self.assertEqual(
+            (last['created'], last['updated'], last['deleted']),
+            ([], [], []),
+        )
+        self.assertEqual(last['cursor'], cursor)
+        self.assertFalse(last['has_more'])
+
+    def test_created_and_updated_on_one_page_is_created(self):
+        cursor = self.read()['cursor']
+        recipe = self.create_recipe()
+        recipe.name = 'Новое название'
+        recipe.save()
+        page = self.read(cursor)
+        self.assertEqual(page['created'], [recipe.pk])
+        self.assertEqual(page['updated'], [])
+        recipe.save()
+        self.assertEqual(self.read(page['cursor'])['updated'], [recipe.pk])
+
+    def test_deleted(self):
+        recipe = self.create_recipe()
+        cursor = self.read()['cursor']
+        recipe_id = recipe.pk
+        recipe.delete()
+        page = self.read(cursor)
+        self.assertEqual(page['deleted'], [recipe_id])
+
+    def test_expand(self):
+        kept = self.create_recipe('Остался')
+        removed = self.create_recipe('Удалён')
+        removed.delete()
+        page = self.read(expand='1')
+        self.assertEqual(page['created'], [kept.pk])
+        self.assertEqual(
+            [(recipe['id'], recipe['name']) for recipe in page['recipes']],
+            [(kept.pk, 'Остался')],
+        )
+        self.assertNotIn('recipes', self.read())
+
+    def test_cursor_survives_compaction(self):
+        updated, deleted, untouched = (
+            self.create_recipe(name) for name in ('А', 'Б', 'В'))
+        cursor = self.read()['cursor']
+        updated.save()
+        updated.save()
+        deleted_id = deleted.pk
+        deleted.delete()
+        created = self.create_recipe('Г')
+        expected, _ = self.read_all(cursor)
+
+        call_command('compact_recipe_changes', stdout=StringIO())
+        self.assertEqual(RecipeChange.objects.count(), 4)
+        state, _ = self.read_all(cursor)
+        self.assertEqual(state, expected)
+        self.assertEqual(state, {
+            updated.pk: 'updated',
+            deleted_id: 'deleted',
+            created.pk: 'created',
+        })
+        self.assertNotIn(untouched.pk, state)
+
+    def test_compaction_turns_unseen_created_into_updated(self):
+        recipe = self.create_recipe()
+        recipe.save()
+        call_command('compact_recipe_changes', stdout=StringIO())
+        # Клиент без курсора рецепта не знает: updated для него — upsert.
+        page = self.read()
+        self.assertEqual(page['created'], [])
+        self.assertEqual(page['updated'], [recipe.pk])
+
+    def test_rows_above_commit_horizon_wait(self):
+        recipes = [self.create_recipe(name) for name in ('А', 'Б', 'В')]
+        RecipeChange.objects.all().delete()
+        # Транзакция 12 ещё идёт, её запись — с меньшим id, чем у 7.
+        for txid, recipe in zip((3, 12, 7), recipes):
+            RecipeChange.objects.create(
+                txid=txid, recipe_id=recipe.pk, action=RecipeChange.UPDATED)
+        with mock.patch.object(
+            RecipeChange, 'commit_horizon', return_value=10
+        ):
+            page = self.read()
+        self.assertEqual(page['updated'], [recipes[0].pk, recipes[2].pk])
+        with mock.patch.object(
+            RecipeChange, 'commit_horizon', return_value=20
+        ):
+            page = self.read(page['cursor'])
+        self.assertEqual(page['updated'], [recipes[1].pk])
@@ -0,0 +1,163 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+
+from api.exports import encode, export_rows
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    Tag,
+)
+from users.models import User
+
+RECIPE_FIELDS = [
+    'id', 'name', 'author', 'text', 'cooking_time', 'pub_date',
+    'image', 'short_code', 'tags', 'ingredients',
+]
+
+
+class ExportTests(APITestCase):
+    """Выгрузка таблиц: доступ, форма строк, gzip и поток по кускам."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(
+            username='staff', email='staff@example.com', password='password',
+            first_name='Имя', last_name='Фамилия', is_staff=True,
+        )
+        cls.user = User.objects.create_user(
+            username='cook', email='cook@example.com', password='password',
+            first_name='Имя', last_name='Фамилия',
+        )
+        breakfast = Tag.objects.create(name='Завтрак', slug='breakfast')
+        dinner = Tag.objects.create(name='Ужин', slug='dinner')
+        salt = Ingredient.objects.create(name='Соль', measurement_unit='г')
+        milk = Ingredient.objects.create(
+            name='Молоко', measurement_unit='мл')
+        cls.recipes = []
+        for number, tags in enumerate(([breakfast, dinner], [], [dinner])):
+            recipe = Recipe.objects.create(
+                name=f'Рецепт {number}', text='Описание', cooking_time=10,
+                author=cls.user, image='recipes/images/image.png',
+            )
+            recipe.tags.set(tags)
+            cls.recipes.append(recipe)
+        RecipeIngredient.objects.create(
+            recipe=cls.recipes[0], ingredient=salt, amount=5)
+        RecipeIngredient.objects.create(
+            recipe=cls.recipes[0], ingredient=milk, amount=200)
+        Favorite.objects.create(user=cls.user, recipe=cls.recipes[1])
+
+    def get(self, path, user=None):
+        if user is not None:
+            self.client.force_authenticate(user)
+        return self.client.get(f'/api/export/{path}')
+
+    @staticmethod
+    def body(response):
+        return b''.join(response.streaming_content)
+
+    def test_staff_only(self):
+        self.assertEqual(self.get('recipes.ndjson').status_code, 401)
+        self.assertEqual(
+            self.get('recipes.ndjson', self.user).status_code, 403)
+        self.assertEqual(
+            self.get('recipes.ndjson', self.staff).status_code, 200)
+
+    def test_recipes_ndjson(self):
+        response = self.get('recipes.ndjson', self.staff)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(response['X-Accel-Buffering'], 'no')
+        rows = [
+            json.loads(line)
+            for line in self.body(response).decode().splitlines()
+        ]
+        self.assertEqual([row['id'] for row in rows],
+                         [recipe.pk for recipe in self.recipes])
+        self.assertEqual(list(rows[0]), RECIPE_FIELDS)
+        self.assertEqual(rows[0]['author'], self.user.pk)
+        self.assertEqual(rows[0]['tags'], ['breakfast', 'dinner'])
+        self.assertEqual(
+            [(item['name'], item['measurement_unit'], item['amount'])
+             for item in rows[0]['ingredients']],
+            [('Соль', 'г', 5), ('Молоко', 'мл', 200)],
+        )
+        self.assertEqual((rows[1]['tags'], rows[1]['ingredients']), ([], []))
+
+    def test_recipes_csv(self):
+        response = self.get('recipes.csv', self.staff)
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename="recipes.csv"',
+        )
+        rows = list(csv.reader(io.StringIO(self.body(response).decode())))
+        self.assertEqual(rows[0], RECIPE_FIELDS)
+        self.assertEqual(len(rows), len(self.recipes) + 1)
+        first = dict(zip(rows[0], rows[1]))
+        self.assertEqual(json.loads(first['tags']), ['breakfast', 'dinner'])
+        self.assertEqual(len(json.loads(first['ingredients'])), 2)
+
+    def test_gzip(self):
+        plain = self.body(self.get('favorites.csv', self.staff))
+        response = self.get('favorites.csv.gz', self.staff)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename="favorites.csv.gz"',
+        )
+        self.assertEqual(gzip.decompress(self.body(response)), plain)
+        self.assertEqual(
+            plain.decode().splitlines(),
+            ['id,user,recipe',
+             f'{Favorite.objects.get().pk},{self.user.pk},'
+             f'{self.recipes[1].pk}'],
+        )
+
+    def test_streamed_in_chunks(self):
+        with mock.patch('api.exports.EXPORT_BUFFER_BYTES', 1):
+            response = self.get('recipes.ndjson', self.staff)
+            chunks = list(response.streaming_content)
+        self.assertEqual(len(chunks), len(self.recipes))
+
+    def test_rows_are_read_lazily(self):
+        read = []
+
+        def rows():
+            for number in range(1000):
+                read.append(number)
+                yield (number,)
+
+        with mock.patch('api.exports.EXPORT_BUFFER_BYTES', 1):
+            chunks = encode(['id'], rows(), 'ndjson')
+            self.assertEqual(next(chunks), b'{"id": 0}\n')
+        self.assertEqual(read, [0])
+
+    def test_relations_across_cursor_chunks(self):
+        fields, rows = export_rows('recipes', chunk_size=1)
+        rows = [dict(zip(fields, row)) for row in rows]
+        self.assertEqual(
+            [row['tags'] for row in rows],
+            [['breakfast', 'dinner'], [], ['dinner']],
+        )
+
+    def test_export_data_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'recipes.csv.gz')
+            call_command(
+                'export_data', 'recipes', '--format', 'csv', '--gzip',
+                '-o', path, stderr=io.StringIO(),
+            )
+            with gzip.open(path, 'rt', encoding='utf-8') as file:
+                rows = list(csv.reader(file))
+        self.assertEqual(rows[0], RECIPE_FIELDS)
+        self.assertEqual(len(rows), len(self.recipes) + 1)
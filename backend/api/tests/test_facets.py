@@ -0,0 +1,70 @@
+from rest_framework.test import APITestCase
+
+from api.facets import FACET_NAMES, compute_facets
+from foodgram.constants import TAG_BITMASK_CAPACITY
+from recipes.models import Recipe, Tag
+from users.models import User
+
+
+class ComputeFacetsTests(APITestCase):
+    """Счётчики фасетов считаются одним запросом к рецептам."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.breakfast = Tag.objects.create(name='Завтрак', slug='breakfast')
+        # Тег вне битовой маски считается через таблицу связей.
+        cls.dinner = Tag.objects.create(
+            pk=TAG_BITMASK_CAPACITY + 1, name='Ужин', slug='dinner')
+        cls.alice, cls.bob = (
+            User.objects.create_user(
+                username=name, email=f'{name}@example.com',
+                password='password', first_name='Имя', last_name='Фамилия',
+            )
+            for name in ('alice', 'bob')
+        )
+        for author, cooking_time, tags in (
+            (cls.alice, 10, [cls.breakfast]),
+            (cls.alice, 20, [cls.breakfast, cls.dinner]),
+            (cls.alice, 90, [cls.dinner]),
+            (cls.bob, 40, [cls.breakfast]),
+        ):
+            recipe = Recipe.objects.create(
+                name='Рецепт', text='Описание', cooking_time=cooking_time,
+                author=author, image='recipes/images/image.png',
+            )
+            recipe.tags.set(tags)
+
+    def test_all_facets(self):
+        with self.assertNumQueries(2):
+            facets = compute_facets(Recipe.objects.all(), FACET_NAMES)
+        self.assertEqual(
+            [(tag['slug'], tag['count']) for tag in facets['tags']],
+            [('breakfast', 3), ('dinner', 2)],
+        )
+        self.assertEqual(facets['author'], [
+            {'id': self.alice.pk, 'username': 'alice', 'count': 3},
+            {'id': self.bob.pk, 'username': 'bob', 'count': 1},
+        ])
+        self.assertEqual(
+            [bucket['count'] for bucket in facets['cooking_time_bucket']],
+            [1, 1, 1, 1],
+        )
+
+    def test_filtered_queryset(self):
+        queryset = Recipe.objects.filter(author=self.bob)
+        with self.assertNumQueries(1):
+            facets = compute_facets(
+                queryset, ['author', 'cooking_time_bucket'])
+        self.assertEqual(facets['author'], [
+            {'id': self.bob.pk, 'username': 'bob', 'count': 1},
+        ])
+        self.assertEqual(
+            [bucket['count'] for bucket in facets['cooking_time_bucket']],
+            [0, 0, 1, 0],
+        )
+
+    def test_empty_queryset(self):
+        facets = compute_facets(Recipe.objects.none(), FACET_NAMES)
+        self.assertEqual(facets['author'], [])
+        self.assertEqual(
+            [tag['count'] for tag in facets['tags']], [0, 0])
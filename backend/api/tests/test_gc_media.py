@@ -0,0 +1,38 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+ORPHAN = 'recipes/images/ab/cd/' + 'a' * 64 + '.png'
+
+
+class GcMediaTests(APITestCase):
+    """gc_media: --min-age действует и на обход, и на удаление."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.media_root = directory.name
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.path = os.path.join(self.media_root, *ORPHAN.split('/'))
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'wb') as file:
+            file.write(b'image')
+
+    def gc(self, *args):
+        output = StringIO()
+        call_command('gc_media', '--delete', *args, stdout=output)
+        return output.getvalue()
+
+    def test_fresh_orphan_kept_by_default(self):
+        self.assertIn('файлов без ссылок: 0', self.gc())
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_min_age_zero_deletes_fresh_orphan(self):
+        self.assertIn(ORPHAN, self.gc('--min-age', '0'))
+        self.assertFalse(os.path.exists(self.path))
@@ -0,0 +1,69 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from foodgram.constants import DISH_NAME_LIMIT
+from recipes.models import Recipe
+from users.models import User
+
+
+class LoadSampleRecipesTests(APITestCase):
+    """load_sample_recipes: проверка файла и поиск повторов частями."""
+
+    def setUp(self):
+        User.objects.create_user(
+            username='cook', email='cook@example.com', password='password',
+            first_name='Имя', last_name='Фамилия',
+        )
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings = override_settings(MEDIA_ROOT=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def load(self, recipes):
+        path = os.path.join(self.directory, 'recipes.json')
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(recipes, file, ensure_ascii=False)
+        call_command('load_sample_recipes', path, stdout=StringIO())
+
+    @staticmethod
+    def recipe(name='Рецепт', **fields):
+        return {
+            'name': name,
+            'text': 'Описание',
+            'cooking_time': 10,
+            'components': [['Соль', 5, 'г']],
+            **fields,
+        }
+
+    def test_skips_existing_names_across_chunks(self):
+        recipes = [self.recipe(f'Рецепт {n}') for n in range(5)]
+        with mock.patch(
+            'recipes.management.commands.load_sample_recipes.'
+            'NAME_LOOKUP_CHUNK', 2,
+        ):
+            self.load(recipes[:3])
+            self.load(recipes)
+        self.assertEqual(
+            sorted(Recipe.objects.values_list('name', flat=True)),
+            [recipe['name'] for recipe in recipes],
+        )
+
+    def test_invalid_recipes_are_rejected(self):
+        for recipe in (
+            self.recipe(cooking_time=0),
+            self.recipe('б' * (DISH_NAME_LIMIT + 1)),
+            self.recipe(components=[['Соль', 0, 'г']]),
+            self.recipe(components=[['Соль', 20000, 'г']] * 2),
+        ):
+            with self.assertRaises(CommandError):
+                self.load([self.recipe('Верный'), recipe])
+        self.assertFalse(Recipe.objects.exists())
@@ -0,0 +1,54 @@
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.test import RequestFactory
+from rest_framework.test import APITestCase
+
+from foodgram.memory import MemoryProfile, in_flight
+from foodgram.middleware import MemoryProfileMiddleware
+from users.models import User
+
+
+class MemoryProfileScopeTests(APITestCase):
+    """Отчёт помечается scope=process, если шли другие запросы."""
+
+    def profile(self, during=None):
+        profile = MemoryProfile()
+        self.assertTrue(profile.start())
+        try:
+            if during:
+                during()
+        finally:
+            report = profile.finish()
+        return report['scope']
+
+    def test_alone(self):
+        self.assertEqual(self.profile(), 'request')
+
+    def test_request_started_during_trace(self):
+        def other_request():
+            with in_flight():
+                pass
+
+        self.assertEqual(self.profile(other_request), 'process')
+
+    def test_request_in_flight_at_start(self):
+        with in_flight():
+            self.assertEqual(self.profile(), 'process')
+        self.assertEqual(self.profile(), 'request')
+
+    def test_header(self):
+        staff = User.objects.create_user(
+            username='staff', email='staff@example.com', password='password',
+            first_name='Имя', last_name='Фамилия', is_staff=True,
+        )
+        request = RequestFactory().get('/', HTTP_X_MEMORY_PROFILE='1')
+        request.user = staff
+        middleware = MemoryProfileMiddleware(
+            lambda request: HttpResponse(b'x' * 1024))
+        with self.assertLogs('foodgram.performance') as logs:
+            response = middleware(request)
+        self.assertEqual(response['X-Memory-Scope'], 'request')
+        self.assertIn('"scope": "request"', logs.output[0])
+        self.assertIn('X-Memory-Peak-KB', response)
+        request.user = AnonymousUser()
+        self.assertNotIn('X-Memory-Scope', middleware(request))
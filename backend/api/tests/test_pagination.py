@@ -0,0 +1,107 @@
+import yaml
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from foodgram.constants import RECIPE_PAGE_SIZE_MAX, USER_PAGE_SIZE_MAX
+from recipes.models import Recipe
+from users.models import User
+
+SCHEMA_PATH = (
+    settings.BASE_DIR.parent / 'infra' / 'docs' / 'openapi-schema.yml')
+HUGE_LIMIT = 1_000_000
+JSON_TYPES = {
+    'array': list,
+    'boolean': bool,
+    'integer': int,
+    'object': dict,
+    'string': str,
+}
+
+
+class PageSizeLimitTests(APITestCase):
+    """Огромный limit урезается до максимума, а не отдаётся целиком."""
+
+    @classmethod
+    def setUpTestData(cls):
+        password = make_password('password')
+        User.objects.bulk_create(
+            User(
+                username=f'user{index}', email=f'user{index}@example.com',
+                first_name='Имя', last_name='Фамилия', password=password,
+            )
+            for index in range(USER_PAGE_SIZE_MAX + 5)
+        )
+        author = User.objects.order_by('id').first()
+        Recipe.objects.bulk_create(
+            Recipe(
+                name=f'Рецепт {index}', text='Описание', cooking_time=10,
+                author=author, image='recipes/images/image.png',
+            )
+            for index in range(RECIPE_PAGE_SIZE_MAX + 5)
+        )
+        with open(SCHEMA_PATH, encoding='utf-8') as schema_file:
+            cls.schema = yaml.safe_load(schema_file)
+
+    def get_page(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'limit': HUGE_LIMIT})
+        self.assertEqual(response.status_code, 200)
+        # Из базы читается одна страница, а не все строки по limit.
+        self.assertFalse(
+            [query['sql'] for query in queries
+             if f'LIMIT {HUGE_LIMIT}' in query['sql']])
+        return response.json()
+
+    def resolve(self, schema):
+        while '$ref' in schema:
+            node = self.schema
+            for part in schema['$ref'].lstrip('#/').split('/'):
+                node = node[part]
+            schema = node
+        return schema
+
+    def assert_matches_schema(self, data, schema, path='$'):
+        schema = self.resolve(schema)
+        if data is None:
+            # Пустые картинки и ссылки отдаются как null.
+            return
+        expected_type = schema.get('type', 'object')
+        self.assertIsInstance(data, JSON_TYPES[expected_type], path)
+        if expected_type == 'array':
+            for index, item in enumerate(data):
+                self.assert_matches_schema(
+                    item, schema['items'], f'{path}[{index}]')
+        elif expected_type == 'object' and 'properties' in schema:
+            self.assertEqual(set(data), set(schema['properties']), path)
+            for key, value in data.items():
+                self.assert_matches_schema(
+                    value, schema['properties'][key], f'{path}.{key}')
+
+    def response_schema(self, path):
+        return self.schema['paths'][path]['get']['responses']['200'][
+            'content']['application/json']['schema']
+
+    def test_recipe_list_limit_is_clamped(self):
+        data = self.get_page('/api/recipes/')
+        self.assertEqual(len(data['results']), RECIPE_PAGE_SIZE_MAX)
+        self.assertEqual(data['count'], RECIPE_PAGE_SIZE_MAX + 5)
+        self.assertIn('page=2', data['next'])
+
+    def test_user_list_limit_is_clamped(self):
+        data = self.get_page('/api/users/')
+        self.assertEqual(len(data['results']), USER_PAGE_SIZE_MAX)
+        self.assertEqual(data['count'], USER_PAGE_SIZE_MAX + 5)
+        self.assertIn('page=2', data['next'])
+
+    def test_user_list_matches_openapi_schema(self):
+        data = self.get_page('/api/users/')
+        self.assert_matches_schema(data, self.response_schema('/api/users/'))
+        parameters = {
+            parameter['name']
+            for parameter in self.schema['paths']['/api/users/']['get'][
+                'parameters']
+        }
+        self.assertEqual(parameters, {'page', 'limit'})
@@ -0,0 +1,62 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import mock
+from urllib.error import URLError
+
+from django.test import SimpleTestCase
+
+from foodgram.images import download_image
+
+PUBLIC_ADDRESS = '93.184.216.34'
+
+
+class RecordingHandler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        self.requests.append(self.path)
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class DownloadImageTests(SimpleTestCase):
+    """Изображение по URL скачивается только с проверенного адреса."""
+
+    def setUp(self):
+        RecordingHandler.requests = []
+        self.server = HTTPServer(('127.0.0.1', 0), RecordingHandler)
+        self.port = self.server.server_address[1]
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def fake_getaddrinfo(self, answers):
+        """Разрешение имени: по очереди адреса answers, затем последний."""
+        answers = list(answers)
+
+        def getaddrinfo(host, port, *args, **kwargs):
+            address = answers.pop(0) if len(answers) > 1 else answers[0]
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, '',
+                     (address, port or 80))]
+        return getaddrinfo
+
+    def test_rebinding_to_private_address_is_refused(self):
+        getaddrinfo = self.fake_getaddrinfo([PUBLIC_ADDRESS, '127.0.0.1'])
+        with mock.patch('socket.getaddrinfo', getaddrinfo):
+            with self.assertRaises(URLError):
+                download_image(
+                    f'http://images.example.org:{self.port}/a.png',
+                    'recipes/images/')
+        self.assertEqual(RecordingHandler.requests, [])
+
+    def test_private_address_is_refused(self):
+        with self.assertRaises(ValueError):
+            download_image(
+                f'http://127.0.0.1:{self.port}/a.png', 'recipes/images/')
+        self.assertEqual(RecordingHandler.requests, [])
@@ -0,0 +1,23 @@
+import base64
+import os
+
+from rest_framework.test import APITestCase
+
+from api.uploads import decode_base64_image
+from foodgram.constants import BASE64_DECODE_CHUNK
+
+
+class DecodeBase64ImageTests(APITestCase):
+    """Декодирование data URI кусками."""
+
+    def test_whitespace_after_first_chunk(self):
+        content = os.urandom(BASE64_DECODE_CHUNK * 2)
+        encoded = base64.b64encode(content).decode()
+        # Перенос строки только во втором куске.
+        position = BASE64_DECODE_CHUNK + 1
+        encoded = f'{encoded[:position]}\r\n{encoded[position:]}'
+        file = decode_base64_image(f'data:image/png;base64,{encoded}')
+        try:
+            self.assertEqual(file.read(), content)
+        finally:
+            file.close()
@@ -0,0 +1,171 @@
+"""
+Приём изображений без лишних копий в памяти.
+
+JSON: data URI декодируется кусками прямо во временный файл на диске.
+Multipart: файл пишется на диск стандартными обработчиками Django,
+а UploadSizeLimitHandler обрывает загрузку сверх лимита.
+Размер и число пикселей проверяются до полного декодирования.
+"""
+import binascii
+import json
+import re
+import uuid
+
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from PIL import Image
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.parsers import MultiPartParser
+
+from foodgram.constants import (
+    BASE64_DECODE_CHUNK,
+    IMAGE_MAX_PIXELS,
+    IMAGE_UPLOAD_MAX_BYTES,
+)
+
+DATA_URI_MARKER = ';base64,'
+# Заголовок data URI короткий: маркер ищем только в его пределах.
+DATA_URI_HEADER_LIMIT = 100
+WHITESPACE_RE = re.compile(r'\s')
+TOO_LARGE_MESSAGE = (
+    f'Изображение больше {IMAGE_UPLOAD_MAX_BYTES // (1024 * 1024)} МБ.')
+
+
+class PayloadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Слишком большой запрос.'
+    default_code = 'payload_too_large'
+
+
+class DecodedImageFile(TemporaryUploadedFile):
+    """Декодированное изображение во временном файле."""
+
+    def __del__(self):
+        # Файл мог быть перемещён хранилищем: close() это переживает,
+        # а финализатор tempfile — нет.
+        self.close()
+
+
+def check_image_pixels(file):
+    """Проверяет число пикселей по заголовку изображения."""
+    file.seek(0)
+    try:
+        with Image.open(file) as image:
+            width, height = image.size
+    except Image.DecompressionBombError:
+        raise ValidationError('Слишком большое разрешение изображения.')
+    except Exception:
+        # Формат определит ImageField при полной проверке.
+        return False
+    finally:
+        file.seek(0)
+    if width * height > IMAGE_MAX_PIXELS:
+        raise ValidationError('Слишком большое разрешение изображения.')
+    return True
+
+
+def check_uploaded_image(file):
+    """Лимиты для файла, пришедшего через multipart."""
+    if file.size is not None and file.size > IMAGE_UPLOAD_MAX_BYTES:
+        raise ValidationError(TOO_LARGE_MESSAGE)
+    check_image_pixels(file)
+    return file
+
+
+def decode_base64_image(data):
+    """
+    Декодирует data:image/...;base64,... во временный файл на диске.
+
+    Размер проверяется по длине строки до декодирования, разрешение —
+    по первому декодированному куску (заголовку изображения).
+    """
+    marker = data.find(DATA_URI_MARKER, 0, DATA_URI_HEADER_LIMIT)
+    if marker == -1:
+        raise ValidationError('Некорректное изображение.')
+    ext = data[:marker].split('/')[-1]
+    start = marker + len(DATA_URI_MARKER)
+    if WHITESPACE_RE.search(data, start):
+        # Переносы строк ломают выравнивание кусков по 4 символа.
+        data = data[:start] + ''.join(data[start:].split())
+    if (len(data) - start) * 3 // 4 > IMAGE_UPLOAD_MAX_BYTES:
+        raise ValidationError(TOO_LARGE_MESSAGE)
+    file = DecodedImageFile(
+        f'{uuid.uuid4()}.{ext}', f'image/{ext}', 0, None)
+    pixels_checked = False
+    try:
+        for offset in range(start, len(data), BASE64_DECODE_CHUNK):
+            file.write(binascii.a2b_base64(
+                data[offset:offset + BASE64_DECODE_CHUNK]))
+            if not pixels_checked:
+                file.flush()
+                pixels_checked = check_image_pixels(file)
+                file.seek(0, 2)
+    except (binascii.Error, ValueError):
+        file.close()
+        raise ValidationError('Некорректное изображение.')
+    except ValidationError:
+        file.close()
+        raise
+    file.size = file.tell()
+    file.flush()
+    file.seek(0)
+    return file
+
+
+class UploadSizeLimitHandler(FileUploadHandler):
+    """
+    Обрывает multipart-загрузку изображения, превысившего лимит размера.
+    Поля unlimited_fields (например, файл NDJSON импорта) не ограничены.
+    """
+    unlimited_fields = ()
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.field_name in self.unlimited_fields:
+            return raw_data
+        self.received += len(raw_data)
+        if self.received > IMAGE_UPLOAD_MAX_BYTES:
+            # Ответ API (413 JSON), а не HTML-страница ошибки Django.
+            raise PayloadTooLarge(TOO_LARGE_MESSAGE)
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def allow_large_uploads(request, fields):
+    """Снимает лимит размера с файлов fields запроса (до разбора тела)."""
+    for handler in request.upload_handlers:
+        if isinstance(handler, UploadSizeLimitHandler):
+            handler.unlimited_fields = tuple(fields)
+
+
+class RecipeMultiPartParser(MultiPartParser):
+    """
+    multipart/form-data для рецептов: image — файлом, tags — повтором
+    поля, ingredients — JSON-строкой.
+    """
+    list_fields = ('tags',)
+    json_fields = ('ingredients',)
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parsed = super().parse(stream, media_type, parser_context)
+        data = {}
+        for key in parsed.data:
+            if key in self.list_fields:
+                data[key] = parsed.data.getlist(key)
+            elif key in self.json_fields:
+                try:
+                    data[key] = json.loads(parsed.data[key])
+                except ValueError:
+                    raise ValidationError({key: 'Ожидается JSON.'})
+            else:
+                data[key] = parsed.data[key]
+        parsed.data = data
+        # dict.update(MultiValueDict) скопировал бы списки, а не файлы.
+        parsed.files = parsed.files.dict()
+        return parsed
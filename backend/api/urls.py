@@ -1,9 +1,18 @@
-from django.urls import include, path
+from django.conf import settings
+from django.urls import include, path, re_path
 
 from rest_framework.routers import DefaultRouter
 from djoser.views import TokenCreateView, TokenDestroyView
 
-from .views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
+from . import async_views
+from .exports import EXPORTS, FORMATS
+from .views import (
+    ExportView,
+    IngredientViewSet,
+    RecipeViewSet,
+    TagViewSet,
+    UserViewSet,
+)
 
 app_name = 'api'
 
@@ -18,4 +27,45 @@ urlpatterns = [
     path('auth/token/login/', TokenCreateView.as_view(), name='token-login'),
     path('auth/token/logout/', TokenDestroyView.as_view(),
          name='token-logout'),
+    re_path(
+        rf'^export/(?P<table>{"|".join(EXPORTS)})'
+        rf'\.(?P<fmt>{"|".join(FORMATS)})(?P<gz>\.gz)?$',
+        ExportView.as_view(),
+        name='export',
+    ),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    # Чтение — асинхронно, запись — прежними ViewSet'ами. Имена — как
+    # у маршрутов роутера (reverse и метки /metrics не меняются).
+    urlpatterns = [
+        path('tags/', async_views.read_or_delegate(
+            async_views.tag_list,
+            TagViewSet.as_view({'get': 'list'}),
+        ), name='tags-list'),
+        path('tags/<int:pk>/', async_views.read_or_delegate(
+            async_views.tag_detail,
+            TagViewSet.as_view({'get': 'retrieve'}),
+        ), name='tags-detail'),
+        path('ingredients/', async_views.read_or_delegate(
+            async_views.ingredient_list,
+            IngredientViewSet.as_view({'get': 'list'}),
+        ), name='ingredients-list'),
+        path('ingredients/<int:pk>/', async_views.read_or_delegate(
+            async_views.ingredient_detail,
+            IngredientViewSet.as_view({'get': 'retrieve'}),
+        ), name='ingredients-detail'),
+        path('recipes/', async_views.read_or_delegate(
+            async_views.recipe_list,
+            RecipeViewSet.as_view({'get': 'list', 'post': 'create'}),
+        ), name='recipes-list'),
+        path('recipes/<int:pk>/', async_views.read_or_delegate(
+            async_views.recipe_detail,
+            RecipeViewSet.as_view({
+                'get': 'retrieve',
+                'put': 'update',
+                'patch': 'partial_update',
+                'delete': 'destroy',
+            }),
+        ), name='recipes-detail'),
+    ] + urlpatterns
@@ -1,26 +1,49 @@
 from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
 from django.db.models import Count, Sum
-from django.http import Http404, HttpResponse
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect
 
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet as DjoserUserViewSet
-from hashids import Hashids
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.pagination import LimitOffsetPagination
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from foodgram.cache import SHORT_LINK_KEY
+from foodgram.constants import (
+    IMPORT_BODY_MAX_BYTES,
+    SHORT_CODE_MAX_LENGTH,
+    SHORT_LINK_CACHE_TTL,
+)
+from foodgram.metrics import cache_lookup
 from recipes.models import (
     Favorite, Ingredient, Recipe,
-    RecipeIngredient, ShoppingCart, Tag
+    RecipeIngredient, ShoppingCart, Tag,
+    decode_short_code,
 )
 from users.models import Follow, User
+from .bulk_import import RECIPES_FIELD, NDJSONParser, RecipeImport, read_lines
+from .changes import read_changes
+from .exports import (
+    FORMATS,
+    GZIP_CONTENT_TYPE,
+    async_chunks,
+    encode,
+    export_rows,
+    gzipped,
+)
+from .facets import get_facets, requested_facets
 from .filters import CustomRecipeFilter, IngredientNameFilter
-from .pagination import CustomRecipePaginator
+from .pagination import CustomRecipePaginator, UserListPaginator
 from .permissions import ContentOwnerAccessControl
 from .serializers import (
+    ChangesQuerySerializer,
+    CompactRecipeViewSerializer,
     FavoriteSerializer,
     FollowCreateHandlerSerializer,
     FollowDetailViewSerializer,
@@ -31,26 +54,40 @@ from .serializers import (
     TagViewSerializer,
     UserProfileViewSerializer,
 )
+from .uploads import (
+    PayloadTooLarge,
+    RecipeMultiPartParser,
+    allow_large_uploads,
+)
 
 
 def get_recipe_by_hash(request, short_hash):
     """Редирект по короткому хэшу /s/<hash> → /recipes/<pk>."""
-    hashids = Hashids(salt=settings.SECRET_KEY, min_length=3)
-    try:
-        decoded = hashids.decode(short_hash)
-        if not decoded:
-            raise ValueError('Invalid hash')
-        pk = decoded[0]
-        return redirect(f'/recipes/{pk}')
-    except (ValueError, IndexError):
+    if not (short_hash.isascii() and short_hash.isalnum()) or (
+        len(short_hash) > SHORT_CODE_MAX_LENGTH
+    ):
         raise Http404('Рецепт не найден')
+    key = SHORT_LINK_KEY.format(short_hash)
+    pk = cache.get(key)
+    cache_lookup('short_link', pk is not None)
+    if pk is not None:
+        return redirect(f'/recipes/{pk}')
+    pk = Recipe.objects.filter(short_code=short_hash).values_list(
+        'pk', flat=True).first()
+    if pk is None:
+        # Рецепты без сохранённого кода (например, из bulk_create).
+        pk = decode_short_code(short_hash)
+        if pk is None or not Recipe.objects.filter(pk=pk).exists():
+            raise Http404('Рецепт не найден')
+    cache.set(key, pk, SHORT_LINK_CACHE_TTL)
+    return redirect(f'/recipes/{pk}')
 
 
 class UserViewSet(DjoserUserViewSet):
     """Профили/подписки пользователей."""
-    queryset = User.objects.all()
+    queryset = User.objects.order_by('id')
     serializer_class = UserProfileViewSerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = UserListPaginator
     permission_classes = [AllowAny]
 
     lookup_field = 'id'
@@ -81,6 +118,7 @@ class UserViewSet(DjoserUserViewSet):
         queryset = (
             User.objects.filter(followers__follower=request.user)
             .annotate(recipes_count=Count('recipes', distinct=True))
+            .order_by('id')
         )
         page = self.paginate_queryset(queryset)
         serializer = FollowDetailViewSerializer(
@@ -127,9 +165,11 @@ class UserViewSet(DjoserUserViewSet):
 
         if request.method == 'DELETE':
             if user.avatar:
-                user.avatar.delete(save=False)
+                avatar = user.avatar
                 user.avatar = None
                 user.save(update_fields=['avatar'])
+                # Файл удаляется, только если на него больше нет ссылок.
+                avatar.delete(save=False)
             return Response(status=status.HTTP_204_NO_CONTENT)
 
         serializer = self.get_serializer(user, data=request.data, partial=True)
@@ -163,6 +203,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
     pagination_class = CustomRecipePaginator
     filter_backends = [DjangoFilterBackend]
     filterset_class = CustomRecipeFilter
+    parser_classes = [JSONParser, FormParser, RecipeMultiPartParser]
 
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
@@ -170,10 +211,19 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return RecipeDetailSerializer
 
     def get_permissions(self):
-        if self.action in ['list', 'retrieve', 'get_short_link']:
+        if self.action in ['list', 'retrieve', 'get_short_link', 'changes']:
             return [AllowAny()]
         return [ContentOwnerAccessControl()]
 
+    def list(self, request, *args, **kwargs):
+        """Список рецептов; с ?facets=... — ещё и счётчики фасетов."""
+        facets = requested_facets(request)
+        response = super().list(request, *args, **kwargs)
+        if facets:
+            queryset = self.filter_queryset(self.get_queryset())
+            response.data['facets'] = get_facets(request, queryset, facets)
+        return response
+
     @action(detail=True,
             methods=['post', 'delete'], permission_classes=[IsAuthenticated])
     def favorite(self, request, pk=None):
@@ -211,6 +261,69 @@ class RecipeViewSet(viewsets.ModelViewSet):
             )
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(
+        detail=False,
+        methods=['post'],
+        permission_classes=[IsAuthenticated],
+        parser_classes=[NDJSONParser, MultiPartParser],
+        url_path='import',
+    )
+    def bulk_import(self, request):
+        """
+        Пакетный импорт: тело application/x-ndjson или multipart, где
+        NDJSON — файл в поле recipes, а image_file строки — имя поля
+        с изображением.
+        """
+        if int(request.META.get('CONTENT_LENGTH') or 0) > (
+            IMPORT_BODY_MAX_BYTES
+        ):
+            raise PayloadTooLarge(
+                f'Тело импорта больше '
+                f'{IMPORT_BODY_MAX_BYTES // (1024 * 1024)} МБ: '
+                f'разделите файл на части.'
+            )
+        files = {}
+        if request.content_type.startswith('multipart/'):
+            allow_large_uploads(request, [RECIPES_FIELD])
+            files = request.FILES.dict()
+            manifest = files.pop(RECIPES_FIELD, None)
+            if manifest is None:
+                return Response(
+                    {RECIPES_FIELD: 'Нужен файл NDJSON с рецептами.'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            lines = read_lines(manifest)
+        else:
+            lines = request.data
+        recipe_import = RecipeImport(request, files)
+        recipe_import.run(lines)
+        if not recipe_import.received:
+            return Response(
+                {'errors': 'Нет ни одного рецепта.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(recipe_import.report())
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Изменения рецептов после курсора ?since=: id созданных,
+        изменённых и удалённых; с ?expand=1 — ещё и их компактный вид.
+        """
+        query = ChangesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        data = read_changes(params['since'], params['limit'])
+        if params['expand']:
+            data['recipes'] = CompactRecipeViewSerializer(
+                Recipe.objects.filter(
+                    pk__in=data['created'] + data['updated']
+                ).order_by('pk'),
+                many=True,
+                context={'request': request},
+            ).data
+        return Response(data)
+
     @action(detail=False,
             methods=['get'], permission_classes=[IsAuthenticated])
     def download_shopping_cart(self, request):
@@ -249,3 +362,29 @@ class RecipeViewSet(viewsets.ModelViewSet):
         recipe = self.get_object()
         return Response(
             {'short-link': f'{settings.BASE_URL}/s/{recipe.short_hash}'})
+
+
+class ExportView(APIView):
+    """
+    Потоковая выгрузка таблицы для аналитики и резервных копий:
+    /api/export/<таблица>.<ndjson|csv>[.gz], только для сотрудников.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, table, fmt, gz=None):
+        fields, rows = export_rows(table)
+        chunks = encode(fields, rows, fmt)
+        filename = f'{table}.{fmt}'
+        content_type = FORMATS[fmt]
+        if gz:
+            chunks = gzipped(chunks)
+            filename += gz
+            content_type = GZIP_CONTENT_TYPE
+        if isinstance(request._request, ASGIRequest):
+            chunks = async_chunks(chunks)
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="{filename}"')
+        # nginx отдаёт куски сразу, а не копит ответ во временном файле.
+        response['X-Accel-Buffering'] = 'no'
+        return response
@@ -0,0 +1,76 @@
+"""
+Версионированный кэш.
+
+Ключи содержат версию пространства имён (рецепты, данные пользователя
+и т.п.), а запись в связанные таблицы меняет эту версию — старые ключи
+становятся недостижимыми и вытесняются по TTL.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+
+VERSION_KEY = 'version:{}'
+RECIPES_NAMESPACE = 'recipes'
+USERS_NAMESPACE = 'users'
+SHORT_LINK_KEY = 'short-link:{}'
+AUTH_TOKEN_KEY = 'auth-token:{}'
+
+
+def get_versions(*namespaces):
+    """Текущие версии пространств имён (отсутствующие создаются)."""
+    keys = [VERSION_KEY.format(namespace) for namespace in namespaces]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Время, а не 1: после вытеснения версия не повторит старую.
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_version(namespace):
+    """Инвалидирует все ключи пространства имён."""
+    key = VERSION_KEY.format(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def user_namespace(user_id):
+    """Пространство имён данных, зависящих от пользователя."""
+    return f'user:{user_id}'
+
+
+def auth_namespace(user_id):
+    """Пространство имён кэша аутентификации пользователя."""
+    return f'auth:{user_id}'
+
+
+def token_key(token):
+    """Ключ кэша токена (сам токен в ключи не попадает)."""
+    return AUTH_TOKEN_KEY.format(hashlib.sha256(token.encode()).hexdigest())
+
+
+def hash_signature(value):
+    """Короткая подпись значения (например, SQL с параметрами)."""
+    return hashlib.md5(repr(value).encode()).hexdigest()
+
+
+def query_signature(query_params, ignore=()):
+    """Стабильная подпись набора GET-параметров (без учёта порядка)."""
+    return hash_signature(sorted(
+        (key, value)
+        for key in query_params if key not in ignore
+        for value in query_params.getlist(key)
+    ))
+
+
+def versioned_key(prefix, signature, namespaces):
+    """Ключ кэша, зависящий от подписи запроса и версий namespaces."""
+    versions = '.'.join(
+        f'{namespace}={version}' for namespace, version
+        in zip(namespaces, get_versions(*namespaces))
+    )
+    return f'{prefix}:{signature}:{versions}'
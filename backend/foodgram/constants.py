@@ -2,10 +2,14 @@
 ACCOUNT_USERNAME_LIMIT = 155
 USER_EMAIL_LIMIT = 260
 PROFILE_FIELD_RESTRICTION = 155
+USER_PAGINATION = 6
+USER_PAGE_SIZE_MAX = 100
 
 # Tags
 LABEL_CHARACTER_LIMIT = 210
 HEX_CODE_LIMIT = 9
+# Теги с id 1..63 хранятся битами в Recipe.tags_mask (BIGINT со знаком)
+TAG_BITMASK_CAPACITY = 63
 
 # Ingredients
 ITEM_NAME_LIMIT = 220
@@ -16,6 +20,85 @@ DISH_NAME_LIMIT = 220
 PREP_TIME_LOWER = 0.05
 PREP_TIME_UPPER = 33000
 RECIPE_PAGINATION = 6
+RECIPE_PAGE_SIZE_MAX = 50
+
+# Short links
+SHORT_CODE_MIN_LENGTH = 3
+SHORT_CODE_MAX_LENGTH = 16
+SHORT_LINK_CACHE_TTL = 24 * 60 * 60
+
+# Token authentication cache
+AUTH_TOKEN_CACHE_TTL = 5 * 60
+AUTH_TOKEN_LOCAL_TTL = 60
+AUTH_TOKEN_LOCAL_SIZE = 1024
+
+# Request instrumentation
+# Сколько повторяющихся SQL попадает в журнал медленного запроса
+PERF_DUPLICATE_QUERIES = 5
+# Сколько кадров проекта сохраняется в записи медленного SQL
+SLOW_QUERY_STACK_DEPTH = 8
+# Глубина стека tracemalloc и длина списков в отчёте о памяти
+MEMORY_PROFILE_FRAMES = 25
+MEMORY_PROFILE_TOP = 10
+
+# Facets
+FACETS_CACHE_TTL = 60
+FACET_AUTHORS_LIMIT = 20
+# (метка, от включительно, до не включительно; None — без границы)
+COOKING_TIME_BUCKETS = (
+    ('0-15', 0, 15),
+    ('15-30', 15, 30),
+    ('30-60', 30, 60),
+    ('60+', 60, None),
+)
+
+# Pagination counts
+COUNT_CACHE_TTL = 30
+# Ниже этого числа строк оценка reltuples не используется
+COUNT_ESTIMATE_THRESHOLD = 100_000
+
+# Images
+IMAGE_UPLOAD_MAX_BYTES = 10 * 1024 * 1024
+IMAGE_MAX_PIXELS = 40_000_000
+# Кратно 4: каждый кусок base64 декодируется независимо
+BASE64_DECODE_CHUNK = 64 * 1024
+# Производные изображения: (метка, ширина в px)
+RECIPE_IMAGE_SIZES = (('thumb', 320), ('medium', 960))
+AVATAR_IMAGE_SIZES = (('thumb', 64), ('medium', 256))
+IMAGE_DERIVATIVE_FORMATS = ('webp', 'jpeg')
+IMAGE_DERIVATIVE_QUALITY = 80
+IMAGE_DERIVATIVE_WORKERS = 2
+# Секунды на загрузку изображения по URL
+IMAGE_DOWNLOAD_TIMEOUT = 10
+
+# Bulk import
+IMPORT_BATCH_SIZE = 500
+# Строка NDJSON вмещает рецепт с изображением в data URI
+IMPORT_LINE_MAX_BYTES = IMAGE_UPLOAD_MAX_BYTES * 4 // 3 + 64 * 1024
+# Сколько ошибок по строкам попадает в ответ
+IMPORT_ERRORS_LIMIT = 1000
+# Тело одного запроса импорта: столько успевает обработать один воркер
+# backend-import за его GUNICORN_TIMEOUT (300 с), с большим запасом.
+# Тот же лимит — client_max_body_size в nginx.
+IMPORT_BODY_MAX_BYTES = 100 * 1024 * 1024
+
+# Streaming export
+# Строк на выборку серверного курсора (и на запрос связей рецептов)
+EXPORT_CHUNK_SIZE = 2000
+# Байт закодированных строк на кусок ответа
+EXPORT_BUFFER_BYTES = 64 * 1024
+
+# Delta sync
+CHANGES_PAGE_SIZE = 500
+CHANGES_MAX_PAGE_SIZE = 2000
+# Строк журнала на один DELETE при уплотнении
+CHANGE_LOG_COMPACT_BATCH = 50000
+
+# Media deletion
+MEDIA_DELETE_BATCH_SIZE = 100
+# Секунды ожидания соседних удалений перед пачкой
+MEDIA_DELETE_BATCH_DELAY = 1.0
+MEDIA_GC_MIN_AGE = 3600
 
 # Validation
 MINIMUM_QUANTITY = 0
@@ -0,0 +1,67 @@
+"""
+Чтение с реплик.
+
+Запросы идут на реплику только внутри routing(replica=True) — его
+включают ReplicaRoutingMiddleware для безопасных запросов к API и
+use_replica() для выгрузок. После первой записи в том же контексте,
+а также внутри транзакции на основной базе чтения идут на основную.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class RoutingState:
+    """Состояние маршрутизации одного запроса или задания."""
+
+    def __init__(self, replica):
+        self.replica = replica
+        self.wrote = False
+
+
+_state = ContextVar('replica_routing', default=None)
+
+
+@contextmanager
+def routing(replica):
+    """Отслеживает записи; replica — читать ли с реплик до первой."""
+    token = _state.set(RoutingState(replica))
+    try:
+        yield _state.get()
+    finally:
+        _state.reset(token)
+
+
+def use_replica():
+    """Чтения внутри блока — с реплики (для выгрузок и отчётов)."""
+    return routing(replica=True)
+
+
+class ReplicaRouter:
+    """Чтения — на случайную из DATABASE_REPLICAS, записи — на default."""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if (
+            state is None or not state.replica or state.wrote
+            or not settings.DATABASE_REPLICAS
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика содержит те же строки, что и основная база.
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
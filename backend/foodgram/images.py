@@ -0,0 +1,314 @@
+"""
+Производные изображения (миниатюры) для рецептов и аватаров.
+
+Для каждого оригинала рядом, в подкаталоге derivatives/, создаются
+уменьшенные копии в WebP и JPEG. Генерация идёт в фоновом потоке после
+коммита транзакции; готовность определяется по последнему файлу набора.
+Фактические ширины миниатюр (маленький оригинал не увеличивается)
+записываются в поле <поле>_derivatives строк с этим файлом: srcset
+строится по ним, без обращения к хранилищу.
+Там же, в фоне, загружаются изображения по URL (пакетный импорт).
+"""
+import base64
+import ipaddress
+import logging
+import posixpath
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection, HTTPSConnection
+from io import BytesIO
+from urllib.error import URLError
+from urllib.parse import urlsplit
+from urllib.request import (
+    HTTPHandler,
+    HTTPRedirectHandler,
+    HTTPSHandler,
+    ProxyHandler,
+    Request,
+    build_opener,
+)
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from foodgram.constants import (
+    IMAGE_DERIVATIVE_FORMATS,
+    IMAGE_DERIVATIVE_QUALITY,
+    IMAGE_DERIVATIVE_WORKERS,
+    IMAGE_DOWNLOAD_TIMEOUT,
+    IMAGE_MAX_PIXELS,
+    IMAGE_UPLOAD_MAX_BYTES,
+)
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVES_DIR = 'derivatives'
+PIL_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+# 1×1 прозрачный PNG: заглушка для обязательного ImageField
+PLACEHOLDER_PNG_B64 = (
+    b'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR4nGMA'
+    b'AQAABQABDQottAAAAABJRU5ErkJggg=='
+)
+
+_executor = None
+
+
+def get_placeholder_bytes():
+    return base64.b64decode(PLACEHOLDER_PNG_B64)
+
+
+def derivative_name(name, label, fmt):
+    """Путь производного файла для оригинала name."""
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, DERIVATIVES_DIR, f'{stem}_{label}.{fmt}')
+
+
+def is_derivative(name):
+    return f'/{DERIVATIVES_DIR}/' in f'/{name}'
+
+
+def derivative_names(name, sizes):
+    """Все производные файлы оригинала (последний — маркер готовности)."""
+    return [
+        derivative_name(name, label, fmt)
+        for label, _ in sizes
+        for fmt in IMAGE_DERIVATIVE_FORMATS
+    ]
+
+
+def has_derivatives(name, sizes, storage=default_storage):
+    return storage.exists(derivative_names(name, sizes)[-1])
+
+
+def reference_fields():
+    """Пары (модель, поле) из MEDIA_REFERENCE_FIELDS."""
+    for reference in settings.MEDIA_REFERENCE_FIELDS:
+        app_model, field = reference.rsplit('.', 1)
+        yield apps.get_model(app_model), field
+
+
+def derivative_widths(name, sizes, storage=default_storage):
+    """Ширины готовых миниатюр по заголовкам файлов: {метка: px}."""
+    widths = {}
+    for label, _ in sizes:
+        target = derivative_name(name, label, IMAGE_DERIVATIVE_FORMATS[0])
+        with storage.open(target, 'rb') as file, Image.open(file) as image:
+            widths[label] = image.width
+    return widths
+
+
+def record_derivatives(name, widths):
+    """Ширины миниатюр name — в <поле>_derivatives ссылающихся строк."""
+    value = {'name': name, 'widths': widths}
+    for model, field in reference_fields():
+        model._default_manager.filter(**{field: name}).update(
+            **{f'{field}_derivatives': value})
+
+
+def generate_derivatives(name, sizes, force=False, storage=default_storage):
+    """Создаёт производные файлы оригинала; возвращает их число."""
+    if not force and has_derivatives(name, sizes, storage):
+        # Файл мог достаться новым строкам повторной загрузкой.
+        record_derivatives(name, derivative_widths(name, sizes, storage))
+        return 0
+    with storage.open(name, 'rb') as original:
+        with Image.open(original) as opened:
+            image = ImageOps.exif_transpose(opened).copy()
+    created = 0
+    widths = {}
+    for label, width in sizes:
+        resized = image.copy()
+        # По ширине; thumbnail() не увеличивает маленькие изображения.
+        resized.thumbnail((width, width * 4))
+        widths[label] = resized.width
+        for fmt in IMAGE_DERIVATIVE_FORMATS:
+            converted = resized
+            if fmt == 'jpeg' and resized.mode != 'RGB':
+                converted = resized.convert('RGB')
+            elif resized.mode not in ('RGB', 'RGBA'):
+                converted = resized.convert('RGBA')
+            buffer = BytesIO()
+            converted.save(
+                buffer, PIL_FORMATS[fmt], quality=IMAGE_DERIVATIVE_QUALITY)
+            target = derivative_name(name, label, fmt)
+            if storage.exists(target):
+                storage.delete(target)
+            storage.save(target, ContentFile(buffer.getvalue()))
+            created += 1
+    record_derivatives(name, widths)
+    return created
+
+
+def _generate_in_background(name, sizes):
+    try:
+        generate_derivatives(name, sizes)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', name)
+    finally:
+        connection.close()
+
+
+def run_in_background(func, *args):
+    """Выполняет func(*args) в фоновом потоке после коммита."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=IMAGE_DERIVATIVE_WORKERS,
+            thread_name_prefix='image-derivatives',
+        )
+    transaction.on_commit(lambda: _executor.submit(func, *args))
+
+
+def schedule_derivatives(name, sizes):
+    """Ставит генерацию производных в фоновый поток после коммита."""
+    if not name or is_derivative(name):
+        return
+    run_in_background(_generate_in_background, name, sizes)
+
+
+def is_global_address(sockaddr):
+    return ipaddress.ip_address(sockaddr[0].split('%')[0]).is_global
+
+
+def is_public_url(url):
+    """http(s)-адрес, все IP которого публичные (не сеть сервера)."""
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        return False
+    try:
+        addresses = socket.getaddrinfo(parts.hostname, parts.port or None)
+    except (OSError, UnicodeError):
+        return False
+    return all(is_global_address(address[4]) for address in addresses)
+
+
+class PinnedConnectionMixin:
+    """
+    Соединение только с проверенным публичным адресом.
+
+    Имя разрешается один раз: проверяются и используются для connect()
+    одни и те же адреса, так что повторное разрешение (DNS rebinding)
+    не уведёт запрос во внутреннюю сеть. Для HTTPS имя хоста остаётся
+    в SNI и проверке сертификата.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # HTTPConnection.connect() открывает сокет через этот атрибут.
+        self._create_connection = self.create_pinned_connection
+
+    @staticmethod
+    def create_pinned_connection(address, timeout, source_address=None):
+        host, port = address
+        addresses = socket.getaddrinfo(
+            host, port, type=socket.SOCK_STREAM)
+        if not addresses or not all(
+            is_global_address(sockaddr) for *_, sockaddr in addresses
+        ):
+            raise URLError(f'Закрытый адрес: {host}')
+        error = None
+        for family, type_, proto, _, sockaddr in addresses:
+            sock = socket.socket(family, type_, proto)
+            try:
+                if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                    sock.settimeout(timeout)
+                if source_address:
+                    sock.bind(source_address)
+                sock.connect(sockaddr)
+                return sock
+            except OSError as exc:
+                sock.close()
+                error = exc
+        raise error
+
+
+class PinnedHTTPConnection(PinnedConnectionMixin, HTTPConnection):
+    pass
+
+
+class PinnedHTTPSConnection(PinnedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class PinnedHTTPHandler(HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(PinnedHTTPConnection, req)
+
+
+class PinnedHTTPSHandler(HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(PinnedHTTPSConnection, req, context=self._context)
+
+
+class PublicRedirectHandler(HTTPRedirectHandler):
+    """Редиректы — только на http(s) с публичными адресами."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        if not is_public_url(newurl):
+            raise URLError(f'Редирект на закрытый адрес: {newurl}')
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def download_image(url, upload_to):
+    """
+    Скачивает изображение в хранилище и возвращает имя файла.
+
+    Те же лимиты, что у загрузки через API: размер и число пикселей.
+    """
+    if not is_public_url(url):
+        raise ValueError(f'Адрес недоступен для загрузки: {url}')
+    # Без прокси из окружения: соединение — только с проверенным адресом.
+    opener = build_opener(
+        ProxyHandler({}),
+        PinnedHTTPHandler,
+        PinnedHTTPSHandler,
+        PublicRedirectHandler,
+    )
+    request = Request(url, headers={'User-Agent': 'foodgram-image-fetch'})
+    with opener.open(request, timeout=IMAGE_DOWNLOAD_TIMEOUT) as response:
+        data = response.read(IMAGE_UPLOAD_MAX_BYTES + 1)
+    if len(data) > IMAGE_UPLOAD_MAX_BYTES:
+        raise ValueError(f'Изображение больше лимита: {url}')
+    with Image.open(BytesIO(data)) as image:
+        width, height = image.size
+        if width * height > IMAGE_MAX_PIXELS:
+            raise ValueError(f'Слишком большое разрешение: {url}')
+        image.verify()
+        fmt = image.format.lower()
+    return default_storage.save(
+        posixpath.join(upload_to, f'remote.{fmt}'), ContentFile(data))
+
+
+def build_srcset(field_file, derivatives, request=None):
+    """
+    srcset по форматам: {'webp': 'url 300w, url 960w', 'jpeg': ...}.
+
+    derivatives — значение <поле>_derivatives: ширины берутся из него,
+    а не из настроек. None, пока миниатюры этого файла не готовы, —
+    клиент показывает оригинал.
+    """
+    if not field_file or not derivatives or (
+        derivatives.get('name') != field_file.name
+    ):
+        return None
+    srcset = {}
+    for fmt in IMAGE_DERIVATIVE_FORMATS:
+        entries = []
+        seen = set()
+        for label, width in derivatives['widths'].items():
+            # Маленький оригинал: одинаковые миниатюры разных размеров.
+            if width in seen:
+                continue
+            seen.add(width)
+            url = field_file.storage.url(derivative_name(
+                field_file.name, label, fmt))
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            entries.append(f'{url} {width}w')
+        srcset[fmt] = ', '.join(entries)
+    return srcset
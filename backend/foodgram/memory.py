@@ -0,0 +1,141 @@
+"""
+Профилирование памяти запроса через tracemalloc.
+
+tracemalloc общий на процесс, поэтому одновременно профилируется один
+запрос, а остальные идут без него. Отчёт — пик памяти и самые крупные
+места выделения живых к концу ответа объектов (тело, данные
+сериализатора): по строкам и по ближайшему кадру кода проекта — какое
+представление или сериализатор копирует данные.
+
+При нескольких запросах на процесс (потоки, SERVER_MODE=asgi) в отчёт
+попадают и выделения соседних запросов: если они шли во время
+трассировки, отчёт помечается scope=process, иначе scope=request.
+"""
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+from foodgram.constants import MEMORY_PROFILE_FRAMES, MEMORY_PROFILE_TOP
+
+_lock = threading.Lock()
+_state_lock = threading.Lock()
+# Запросы процесса, идущие без профиля, и текущий профиль.
+_in_flight = 0
+_active = None
+# Кадры обвязки не считаются местом вызова.
+SKIP_FILES = (
+    'foodgram/memory.py',
+    'foodgram/performance.py',
+    'foodgram/middleware.py',
+    'manage.py',
+)
+
+
+@contextmanager
+def in_flight():
+    """Отмечает непрофилируемый запрос на время его обработки."""
+    global _in_flight
+    with _state_lock:
+        _in_flight += 1
+        if _active is not None:
+            _active.shared = True
+    try:
+        yield
+    finally:
+        with _state_lock:
+            _in_flight -= 1
+
+
+def allocation_line(traceback):
+    frame = traceback[-1]
+    return f'{frame.filename}:{frame.lineno}'
+
+
+def project_frame(traceback, fallback):
+    """
+    Ближайший к месту выделения кадр из кода проекта; fallback, если
+    его нет (обобщённые представления DRF целиком в site-packages).
+    """
+    root = str(settings.BASE_DIR)
+    for frame in reversed(traceback):
+        filename = frame.filename
+        if (
+            filename.startswith(root)
+            and 'site-packages' not in filename
+            and not filename.endswith(SKIP_FILES)
+        ):
+            path = Path(filename).relative_to(root)
+            return f'{path}:{frame.lineno}'
+    return fallback
+
+
+def top_sites(statistics, key):
+    sites = {}
+    for stat in statistics:
+        site = key(stat)
+        if site is None:
+            continue
+        size, count = sites.get(site, (0, 0))
+        sites[site] = (size + stat.size, count + stat.count)
+    ordered = sorted(sites.items(), key=lambda item: item[1], reverse=True)
+    return [
+        {'site': site, 'kb': round(size / 1024, 1), 'blocks': count}
+        for site, (size, count) in ordered[:MEMORY_PROFILE_TOP]
+    ]
+
+
+class MemoryProfile:
+    """Профиль одного запроса: start() → ... → finish()."""
+
+    def __init__(self):
+        self.started = False
+        # Во время трассировки шли другие запросы процесса.
+        self.shared = False
+
+    def start(self):
+        """False, если профилируется другой запрос."""
+        global _active
+        if not _lock.acquire(blocking=False):
+            return False
+        if tracemalloc.is_tracing():
+            # Включён кем-то ещё (например, -X tracemalloc): не мешаем.
+            _lock.release()
+            return False
+        with _state_lock:
+            self.shared = _in_flight > 0
+            _active = self
+        tracemalloc.start(MEMORY_PROFILE_FRAMES)
+        self.started = True
+        return True
+
+    def finish(self, view=None):
+        """Снимок, остановка трассировки и отчёт; view — имя для мест
+        выделения вне кода проекта."""
+        global _active
+        if not self.started:
+            return None
+        try:
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+            ])
+        finally:
+            tracemalloc.stop()
+            with _state_lock:
+                _active = None
+            self.started = False
+            _lock.release()
+        statistics = snapshot.statistics('traceback')
+        return {
+            'scope': 'process' if self.shared else 'request',
+            'peak_kb': round(peak / 1024, 1),
+            'retained_kb': round(current / 1024, 1),
+            'top_lines': top_sites(
+                statistics, lambda stat: allocation_line(stat.traceback)),
+            'top_project_sites': top_sites(
+                statistics, lambda stat: project_frame(stat.traceback, view)),
+        }
@@ -0,0 +1,112 @@
+"""
+Метрики в формате Prometheus.
+
+При нескольких воркерах gunicorn каждый процесс пишет значения в файлы
+каталога PROMETHEUS_MULTIPROC_DIR (его задаёт gunicorn.conf.py), а
+/metrics собирает их через MultiProcessCollector: ответ одинаков,
+какой бы воркер его ни отдал. Без этой переменной (runserver, тесты)
+используется обычный реестр процесса.
+"""
+import os
+
+from django.conf import settings
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+REQUEST_LATENCY = Histogram(
+    'foodgram_request_duration_seconds',
+    'Время обработки запроса',
+    ['route', 'method'],
+)
+REQUESTS = Counter(
+    'foodgram_requests_total',
+    'Запросы по маршруту и коду ответа',
+    ['route', 'method', 'status'],
+)
+RESPONSE_SIZE = Histogram(
+    'foodgram_response_size_bytes',
+    'Размер тела ответа',
+    ['route'],
+    buckets=SIZE_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    'foodgram_db_queries_per_request',
+    'Число SQL-запросов на запрос',
+    ['route'],
+    buckets=QUERY_BUCKETS,
+)
+DB_TIME = Histogram(
+    'foodgram_db_duration_seconds',
+    'Суммарное время SQL на запрос',
+    ['route'],
+)
+CACHE_LOOKUPS = Counter(
+    'foodgram_cache_lookups_total',
+    'Обращения к кэшам приложения (доля попаданий — hit / все)',
+    ['cache', 'result'],
+)
+IMPORTED_RECIPES = Counter(
+    'foodgram_imported_recipes_total',
+    'Строки пакетного импорта рецептов (скорость — rate() по created)',
+    ['result'],
+)
+WORKER = Gauge(
+    'foodgram_worker',
+    'Живые воркеры (при нескольких процессах — с меткой pid)',
+    ['server_mode'],
+    multiprocess_mode='liveall',
+)
+
+
+def route_name(request):
+    """Имя маршрута (api:recipes-list) вместо пути — без id в метках."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match.route or 'unnamed'
+
+
+def observe_request(request, response, metrics):
+    route = route_name(request)
+    REQUEST_LATENCY.labels(route, request.method).observe(
+        metrics.total_time)
+    REQUESTS.labels(route, request.method, response.status_code).inc()
+    if not response.streaming:
+        RESPONSE_SIZE.labels(route).observe(len(response.content))
+    DB_QUERIES.labels(route).observe(metrics.sql_count)
+    DB_TIME.labels(route).observe(metrics.sql_time)
+
+
+def cache_lookup(cache_name, hit):
+    CACHE_LOOKUPS.labels(cache_name, 'hit' if hit else 'miss').inc()
+
+
+def recipes_imported(created, failed):
+    IMPORTED_RECIPES.labels('created').inc(created)
+    IMPORTED_RECIPES.labels('failed').inc(failed)
+
+
+def mark_worker():
+    WORKER.labels(settings.SERVER_MODE).set(1)
+
+
+def metrics_view(request):
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(
+        generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,380 @@
+import json
+import logging
+import random
+
+from asgiref.sync import (
+    iscoroutinefunction, markcoroutinefunction, sync_to_async,
+)
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import Resolver404, resolve
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from foodgram import metrics as prometheus, performance
+from foodgram.cache import hash_signature
+from foodgram.constants import PERF_DUPLICATE_QUERIES
+from foodgram.db.routers import routing
+from foodgram.memory import MemoryProfile, in_flight
+
+logger = logging.getLogger('foodgram.performance')
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+STICKY_KEY = 'replica-sticky:{}'
+STICKY_COOKIE = 'replica_sticky'
+MEMORY_PROFILE_HEADER = 'HTTP_X_MEMORY_PROFILE'
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Безопасные запросы к API и списки в админке читают с реплик.
+
+    После записи клиент на REPLICA_STICKY_SECONDS закрепляется за
+    основной базой, чтобы не увидеть устаревшие данные из-за отставания
+    реплики. Клиент определяется по токену или сессии (флаг — в общем
+    кэше воркеров) и по подписанной cookie с тем же сроком: она
+    закрепляет и запросы без учётных данных, например вход в систему.
+    IP не годится — за nginx он у всех клиентов один.
+    """
+
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        keys = self.sticky_keys(request)
+        replica = self.is_replica_request(request) and not (
+            self.has_sticky_cookie(request)
+            or keys and cache.get_many(keys)
+        )
+        with routing(replica) as state:
+            response = self.get_response(request)
+        if state.wrote:
+            if keys:
+                cache.set_many(
+                    dict.fromkeys(keys, True),
+                    settings.REPLICA_STICKY_SECONDS,
+                )
+            self.set_sticky_cookie(request, response)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+        keys = self.sticky_keys(request)
+        replica = self.is_replica_request(request) and not (
+            self.has_sticky_cookie(request)
+            or keys and await cache.aget_many(keys)
+        )
+        with routing(replica) as state:
+            response = await self.get_response(request)
+        if state.wrote:
+            if keys:
+                await cache.aset_many(
+                    dict.fromkeys(keys, True),
+                    settings.REPLICA_STICKY_SECONDS,
+                )
+            self.set_sticky_cookie(request, response)
+        return response
+
+    def is_replica_request(self, request):
+        return (
+            request.method in SAFE_METHODS
+            and self.is_replica_path(request.path_info)
+        )
+
+    @staticmethod
+    def sticky_keys(request):
+        credentials = request.META.get('HTTP_AUTHORIZATION') or (
+            request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+        if not credentials:
+            return []
+        return [STICKY_KEY.format(hash_signature(credentials))]
+
+    @staticmethod
+    def has_sticky_cookie(request):
+        return request.get_signed_cookie(
+            STICKY_COOKIE,
+            default=None,
+            salt=STICKY_COOKIE,
+            max_age=settings.REPLICA_STICKY_SECONDS,
+        ) is not None
+
+    @staticmethod
+    def set_sticky_cookie(request, response):
+        response.set_signed_cookie(
+            STICKY_COOKIE,
+            '1',
+            salt=STICKY_COOKIE,
+            max_age=settings.REPLICA_STICKY_SECONDS,
+            secure=request.is_secure(),
+            httponly=True,
+            samesite='Lax',
+        )
+
+    @staticmethod
+    def is_replica_path(path):
+        if path.startswith('/api/'):
+            return True
+        if not path.startswith('/admin/'):
+            return False
+        try:
+            match = resolve(path)
+        except Resolver404:
+            return False
+        return (match.url_name or '').endswith('_changelist')
+
+
+class MetricsMiddleware:
+    """
+    Счётчики каждого запроса для /metrics: задержка, код и размер
+    ответа, число SQL по маршруту. Стоит первым, чтобы учитывать
+    время остальных middleware.
+    """
+
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        performance.install()
+        prometheus.mark_worker()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token = performance.start_metrics(path=request.path)
+        try:
+            response = self.get_response(request)
+        finally:
+            performance.stop_metrics(token)
+        prometheus.observe_request(request, response, metrics)
+        return response
+
+    async def __acall__(self, request):
+        metrics, token = performance.start_metrics(path=request.path)
+        try:
+            response = await self.get_response(request)
+        finally:
+            performance.stop_metrics(token)
+        prometheus.observe_request(request, response, metrics)
+        return response
+
+
+class ServerTimingMiddleware:
+    """
+    Server-Timing с числом и временем SQL, временем сериализации и
+    остального Python для доли запросов PERF_SAMPLE_RATE.
+
+    Запросы дольше PERF_SLOW_REQUEST_MS пишутся в журнал одной
+    JSON-строкой с самыми частыми повторами SQL (признак N+1).
+    """
+
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        performance.install()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        metrics, token = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                performance.stop_metrics(token)
+        self.report(request, response, metrics)
+        return response
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        metrics, token = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                performance.stop_metrics(token)
+        self.report(request, response, metrics)
+        return response
+
+    @staticmethod
+    def start(request):
+        """Подробные замеры: в счётчиках MetricsMiddleware или свои."""
+        metrics = performance.current_metrics()
+        if metrics is None:
+            return performance.start_metrics(
+                detailed=True, path=request.path)
+        metrics.detailed = True
+        return metrics, None
+
+    @staticmethod
+    def sampled():
+        return random.random() < settings.PERF_SAMPLE_RATE
+
+    def report(self, request, response, metrics):
+        total = metrics.total_time * 1000
+        sql = metrics.sql_time * 1000
+        serializer = metrics.serializer_time * 1000
+        timings = [
+            f'db;dur={sql:.2f};desc="{metrics.sql_count} queries"',
+            f'serializer;dur={serializer:.2f}',
+            f'app;dur={total - sql:.2f}',
+            f'total;dur={total:.2f}',
+        ]
+        if response.has_header('Server-Timing'):
+            timings.insert(0, response['Server-Timing'])
+        response['Server-Timing'] = ', '.join(timings)
+        if total < settings.PERF_SLOW_REQUEST_MS:
+            return
+        logger.warning(json.dumps({
+            'event': 'slow_request',
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'total_ms': round(total, 2),
+            'sql_ms': round(sql, 2),
+            'sql_count': metrics.sql_count,
+            'serializer_ms': round(serializer, 2),
+            'python_ms': round(total - sql, 2),
+            'duplicate_queries': metrics.duplicates(PERF_DUPLICATE_QUERIES),
+        }, ensure_ascii=False))
+
+
+class MemoryProfileMiddleware:
+    """
+    tracemalloc-профиль запроса: по заголовку X-Memory-Profile от
+    сотрудника или для доли MEMORY_PROFILE_SAMPLE_RATE запросов.
+
+    Отчёт пишется в журнал, по заголовку пик памяти отдаётся ещё и в
+    X-Memory-Peak-KB, а в X-Memory-Scope — request или process (во время
+    трассировки шли другие запросы процесса). Потоковые ответы
+    (выгрузки) профилируются до конца отдачи.
+    """
+
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if request.META.get(MEMORY_PROFILE_HEADER):
+            trigger = 'header' if self.is_staff(request) else None
+        else:
+            trigger = self.sampled()
+        profile = MemoryProfile()
+        if trigger is None or not profile.start():
+            with in_flight():
+                return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            profile.finish(self.view_path(request))
+            raise
+        return self.finish(request, response, profile, trigger)
+
+    async def __acall__(self, request):
+        if request.META.get(MEMORY_PROFILE_HEADER):
+            staff = await sync_to_async(self.is_staff)(request)
+            trigger = 'header' if staff else None
+        else:
+            trigger = self.sampled()
+        profile = MemoryProfile()
+        if trigger is None or not profile.start():
+            with in_flight():
+                return await self.get_response(request)
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            profile.finish(self.view_path(request))
+            raise
+        return self.finish(request, response, profile, trigger)
+
+    @staticmethod
+    def sampled():
+        if random.random() < settings.MEMORY_PROFILE_SAMPLE_RATE:
+            return 'sample'
+        return None
+
+    @staticmethod
+    def is_staff(request):
+        """Сотрудник по сессии (админка) или по токену API."""
+        if request.user.is_staff:
+            return True
+        try:
+            user = Request(request, authenticators=[
+                authenticator() for authenticator
+                in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+            ]).user
+        except APIException:
+            return False
+        return user.is_staff
+
+    def finish(self, request, response, profile, trigger):
+        if not response.streaming:
+            self.report(request, response, profile, trigger)
+            return response
+        if response.is_async:
+            response.streaming_content = self.aprofiled(
+                response.streaming_content, request, response, profile,
+                trigger)
+        else:
+            response.streaming_content = self.profiled(
+                response.streaming_content, request, response, profile,
+                trigger)
+        return response
+
+    def profiled(self, content, request, response, profile, trigger):
+        try:
+            yield from content
+        finally:
+            self.report(request, response, profile, trigger)
+
+    async def aprofiled(self, content, request, response, profile, trigger):
+        try:
+            async for chunk in content:
+                yield chunk
+        finally:
+            self.report(request, response, profile, trigger)
+
+    @staticmethod
+    def view_path(request):
+        match = getattr(request, 'resolver_match', None)
+        return f'view {match._func_path}' if match else None
+
+    def report(self, request, response, profile, trigger):
+        report = profile.finish(self.view_path(request))
+        if trigger == 'header' and not response.streaming:
+            response['X-Memory-Peak-KB'] = report['peak_kb']
+            response['X-Memory-Scope'] = report['scope']
+        logger.info(json.dumps({
+            'event': 'memory_profile',
+            'trigger': trigger,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            **report,
+        }, ensure_ascii=False))
@@ -0,0 +1,120 @@
+"""
+Замеры на запрос: число и время SQL, время сериализации, остальное
+время Python.
+
+Число и время SQL считаются для каждого запроса (для /metrics);
+тексты запросов и время сериализации — только для подробных замеров
+(выборка PERF_SAMPLE_RATE). Вне запроса обёртка SQL и примесь
+сериализатора сводятся к одной проверке ContextVar.
+"""
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from foodgram import slow_queries
+
+_metrics = ContextVar('request_metrics', default=None)
+_serializer_depth = ContextVar('serializer_depth', default=0)
+
+
+class RequestMetrics:
+    """Счётчики одного запроса."""
+
+    def __init__(self, detailed=False, path=None):
+        self.detailed = detailed
+        self.path = path
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.serializer_time = 0.0
+        self.statements = Counter()
+        self.statement_time = defaultdict(float)
+
+    @property
+    def total_time(self):
+        return time.perf_counter() - self.started
+
+    def duplicates(self, limit):
+        """Самые частые повторяющиеся SQL (кандидаты в N+1)."""
+        return [
+            {
+                'sql': sql,
+                'count': count,
+                'ms': round(self.statement_time[sql] * 1000, 2),
+            }
+            for sql, count in self.statements.most_common(limit)
+            if count > 1
+        ]
+
+
+def current_metrics():
+    return _metrics.get()
+
+
+def start_metrics(detailed=False, path=None):
+    metrics = RequestMetrics(detailed, path)
+    return metrics, _metrics.set(metrics)
+
+
+def stop_metrics(token):
+    _metrics.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    """execute_wrapper: время и текст запроса (без параметров)."""
+    metrics = _metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        metrics.sql_count += 1
+        metrics.sql_time += duration
+        if metrics.detailed:
+            metrics.statements[sql] += 1
+            metrics.statement_time[sql] += duration
+
+
+def install_query_recorder(sender=None, connection=None, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+    # Первым, чтобы EXPLAIN не попадал во время запроса в record_query.
+    if settings.SLOW_QUERY_MS and (
+        slow_queries.capture not in connection.execute_wrappers
+    ):
+        connection.execute_wrappers.insert(0, slow_queries.capture)
+
+
+def install():
+    """
+    Подключает record_query (и журнал медленных SQL, если включён)
+    к открытым и всем новым соединениям.
+    """
+    for connection in connections.all(initialized_only=True):
+        install_query_recorder(connection=connection)
+    connection_created.connect(
+        install_query_recorder, dispatch_uid='foodgram.performance')
+
+
+class TimedSerializerMixin:
+    """Время to_representation верхнего уровня (вложенные не дублируются)."""
+
+    def to_representation(self, instance):
+        metrics = _metrics.get()
+        if metrics is None or not metrics.detailed:
+            return super().to_representation(instance)
+        depth = _serializer_depth.get()
+        token = _serializer_depth.set(depth + 1)
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            _serializer_depth.reset(token)
+            if depth == 0:
+                metrics.serializer_time += time.perf_counter() - start
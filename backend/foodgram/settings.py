@@ -39,17 +39,23 @@ INSTALLED_APPS = [
     'django_filters',
     'users',
     'recipes',
-    'api'
+    'api',
+    # Последним: удаляет старые файлы после сохранения моделей.
+    'django_cleanup.apps.CleanupConfig',
 ]
 
 MIDDLEWARE = [
+    'foodgram.middleware.MetricsMiddleware',
+    'foodgram.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'foodgram.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'foodgram.middleware.MemoryProfileMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram.urls'
@@ -71,6 +77,10 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
+ASGI_APPLICATION = 'foodgram.asgi.application'
+# asgi — uvicorn-воркеры и асинхронные представления чтения (см. api.urls)
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
+ASYNC_READ_VIEWS = SERVER_MODE == 'asgi'
 
 
 # Database
@@ -92,8 +102,107 @@ else:
             'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
             'HOST': os.getenv('POSTGRES_DB_HOST', 'db'),
             'PORT': os.getenv('POSTGRES_DB_PORT', 5432),
+            # Секунды жизни соединения между запросами; 'None' — без предела
+            'CONN_MAX_AGE': (
+                None if os.getenv('POSTGRES_CONN_MAX_AGE') == 'None'
+                # Под ASGI соединения открываются в разных потоках
+                # и не переиспользуются: там по умолчанию 0.
+                else int(os.getenv(
+                    'POSTGRES_CONN_MAX_AGE', 0 if ASYNC_READ_VIEWS else 60))
+            ),
+            'CONN_HEALTH_CHECKS': os.getenv(
+                'POSTGRES_CONN_HEALTH_CHECKS', 'True') == 'True',
         }
     }
+    if os.getenv('POSTGRES_POOL') == 'True':
+        # Пул внутри процесса: соединения возвращаются в него после запроса
+        DATABASES['default'].update({
+            'ENGINE': 'foodgram.db.backends.postgresql_pool',
+            'CONN_MAX_AGE': 0,
+            'POOL': {
+                'min_size': int(os.getenv('POSTGRES_POOL_MIN_SIZE', 1)),
+                'max_size': int(os.getenv('POSTGRES_POOL_MAX_SIZE', 10)),
+                'timeout': float(os.getenv('POSTGRES_POOL_TIMEOUT', 30)),
+            },
+        })
+
+# Реплики для чтения: хосты PostgreSQL (или пути к файлам SQLite при
+# LOCAL=True) через запятую. Записи и чтения после них идут на default.
+DATABASE_REPLICAS = []
+for index, replica in enumerate(
+    filter(None, os.getenv('DATABASE_REPLICAS', '').split(',')), 1
+):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME' if os.getenv('LOCAL') == 'True' else 'HOST': replica.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['foodgram.db.routers.ReplicaRouter']
+# Сколько секунд после записи клиент читает с основной базы
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+
+# Доля запросов с замерами (заголовок Server-Timing, журнал медленных)
+PERF_SAMPLE_RATE = float(os.getenv('PERF_SAMPLE_RATE', 1 if DEBUG else 0.05))
+PERF_SLOW_REQUEST_MS = int(os.getenv('PERF_SLOW_REQUEST_MS', 500))
+# Доля запросов с профилем памяти tracemalloc (сотрудники могут
+# запросить его заголовком X-Memory-Profile: 1)
+MEMORY_PROFILE_SAMPLE_RATE = float(
+    os.getenv('MEMORY_PROFILE_SAMPLE_RATE', 0))
+# Журнал SQL дольше SLOW_QUERY_MS (0 — выключен) с планами для доли
+# SLOW_QUERY_EXPLAIN_RATE выборок на PostgreSQL
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 0))
+SLOW_QUERY_EXPLAIN_RATE = float(os.getenv('SLOW_QUERY_EXPLAIN_RATE', 0.1))
+SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG', BASE_DIR / 'slow_queries.log')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'message',
+        },
+        # Файл пишут все воркеры: ротирует его logrotate, а обработчик
+        # переоткрывает файл, заметив подмену.
+        'slow_queries': {
+            'class': 'logging.handlers.WatchedFileHandler',
+            'filename': SLOW_QUERY_LOG,
+            'delay': True,
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        'foodgram.performance': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'foodgram.slow_queries': {
+            'handlers': ['slow_queries'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
+    }
+}
+# Кэш в памяти процесса не виден другим воркерам: отзыв токена или
+# закрепление за основной базой в одном воркере остальные не заметят.
+CACHE_SHARED_BY_WORKERS = (
+    int(os.getenv('GUNICORN_WORKERS', 1)) == 1
+    or not CACHES['default']['BACKEND'].endswith('.LocMemCache')
+)
 
 
 # Password validation
@@ -116,7 +225,7 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
 
     'DEFAULT_PERMISSION_CLASSES': [
@@ -149,6 +258,28 @@ STATIC_ROOT = '/app/collected_static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = '/app/media'
 
+STORAGES = {
+    'default': {
+        'BACKEND': 'foodgram.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+# Поля, ссылки из которых удерживают файл от удаления
+MEDIA_REFERENCE_FIELDS = [
+    'recipes.Recipe.image',
+    'users.User.avatar',
+]
+# Удалять медиафайлы фоновым потоком после коммита, а не в запросе
+MEDIA_DEFERRED_DELETE = os.getenv('MEDIA_DEFERRED_DELETE', 'True') == 'True'
+
+FILE_UPLOAD_HANDLERS = [
+    'api.uploads.UploadSizeLimitHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
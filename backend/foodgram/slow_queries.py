@@ -0,0 +1,132 @@
+"""
+Журнал медленных SQL (включается SLOW_QUERY_MS).
+
+Запрос дольше порога пишется JSON-строкой в ротируемый файл
+SLOW_QUERY_LOG: нормализованный SQL, его отпечаток, стек вызова из кода
+проекта (представление, метод сериализатора) и, для доли
+SLOW_QUERY_EXPLAIN_RATE выборок на PostgreSQL, план
+EXPLAIN (ANALYZE, BUFFERS). Сводка — команда slow_queries.
+"""
+import hashlib
+import json
+import logging
+import random
+import re
+import time
+import traceback
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+
+from foodgram import performance
+from foodgram.constants import SLOW_QUERY_STACK_DEPTH
+
+logger = logging.getLogger('foodgram.slow_queries')
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER = re.compile(r'%s|%\(\w+\)s')
+VALUE_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+WHITESPACE = re.compile(r'\s+')
+EXPLAIN_SAVEPOINT = 'foodgram_explain'
+# Кадры этих файлов — обвязка, а не место вызова.
+SKIP_FILES = (
+    'foodgram/slow_queries.py',
+    'foodgram/performance.py',
+    'foodgram/middleware.py',
+    'manage.py',
+)
+
+
+def normalize_sql(sql):
+    """SQL без значений: одинаковые запросы с разными id совпадают."""
+    sql = STRING_LITERAL.sub('?', sql)
+    sql = PLACEHOLDER.sub('?', sql)
+    sql = NUMBER.sub('?', sql)
+    sql = VALUE_LIST.sub('(...)', sql)
+    return WHITESPACE.sub(' ', sql).strip()
+
+
+def fingerprint(normalized):
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12]
+
+
+def call_site():
+    """Кадры кода проекта, от внутреннего к внешнему."""
+    root = str(settings.BASE_DIR)
+    frames = []
+    for frame in reversed(traceback.extract_stack()):
+        filename = frame.filename
+        if (
+            not filename.startswith(root)
+            or 'site-packages' in filename
+            or filename.endswith(SKIP_FILES)
+        ):
+            continue
+        path = Path(filename).relative_to(root)
+        frames.append(f'{path}:{frame.lineno} {frame.name}')
+        if len(frames) == SLOW_QUERY_STACK_DEPTH:
+            break
+    return frames
+
+
+def explain(connection, sql, params):
+    """
+    План EXPLAIN (ANALYZE, BUFFERS) или текст ошибки.
+
+    Выполняется мимо execute_wrappers. Внутри транзакции — под точкой
+    сохранения, чтобы ошибка плана не сломала транзакцию запроса.
+    """
+    in_transaction = not connection.get_autocommit()
+    with connection.connection.cursor() as cursor:
+        if in_transaction:
+            cursor.execute(f'SAVEPOINT {EXPLAIN_SAVEPOINT}')
+        try:
+            cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS) {sql}', params)
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+        except connection.Database.Error as error:
+            if in_transaction:
+                cursor.execute(f'ROLLBACK TO SAVEPOINT {EXPLAIN_SAVEPOINT}')
+            return None, str(error).strip()
+        if in_transaction:
+            cursor.execute(f'RELEASE SAVEPOINT {EXPLAIN_SAVEPOINT}')
+    return plan, None
+
+
+def should_explain(connection, sql, many):
+    return (
+        not many
+        and connection.vendor == 'postgresql'
+        and sql.lstrip()[:6].upper() == 'SELECT'
+        and ' FOR UPDATE' not in sql.upper()
+        and random.random() < settings.SLOW_QUERY_EXPLAIN_RATE
+    )
+
+
+def capture(execute, sql, params, many, context):
+    """execute_wrapper: запросы дольше SLOW_QUERY_MS — в журнал."""
+    start = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = (time.perf_counter() - start) * 1000
+    if duration < settings.SLOW_QUERY_MS:
+        return result
+    connection = context['connection']
+    normalized = normalize_sql(sql)
+    metrics = performance.current_metrics()
+    entry = {
+        'at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'ms': round(duration, 2),
+        'fingerprint': fingerprint(normalized),
+        'sql': normalized,
+        'database': connection.alias,
+        'path': metrics.path if metrics else None,
+        'stack': call_site(),
+        'plan': None,
+    }
+    if should_explain(connection, sql, many):
+        entry['plan'], error = explain(connection, sql, params)
+        if error:
+            entry['explain_error'] = error
+    logger.warning(json.dumps(entry, ensure_ascii=False))
+    return result
@@ -0,0 +1,179 @@
+"""
+Хранилище медиа с адресацией по содержимому.
+
+Файл получает имя по SHA-256 содержимого в шардированных каталогах
+внутри upload_to: recipes/images/ab/cd/<sha256>.png. Одинаковые загрузки
+указывают на один файл. Удаление (в т.ч. из django-cleanup) выполняется,
+только когда на файл не ссылается ни одна строка MEDIA_REFERENCE_FIELDS
+и файл не моложе MEDIA_GC_MIN_AGE: повторная загрузка обновляет время
+изменения, поэтому файл, на который сошлётся ещё не закоммиченная
+строка, не удаляется. Такие файлы потом собирает gc_media.
+
+При MEDIA_DEFERRED_DELETE удаление не выполняется в запросе: имена
+ставятся в очередь после коммита, и фоновый поток удаляет их пачками.
+"""
+import atexit
+import hashlib
+import logging
+import os
+import posixpath
+import queue
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import connection, transaction
+
+from foodgram.constants import (
+    MEDIA_DELETE_BATCH_DELAY,
+    MEDIA_DELETE_BATCH_SIZE,
+    MEDIA_GC_MIN_AGE,
+)
+from foodgram.images import DERIVATIVES_DIR, is_derivative, reference_fields
+
+logger = logging.getLogger(__name__)
+
+CONTENT_NAME_RE = re.compile(
+    r'(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.[^/]*)?$')
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def is_content_addressed(name):
+    return bool(CONTENT_NAME_RE.search(name))
+
+
+class DeletionWorker(threading.Thread):
+    """Фоновый поток, удаляющий файлы из очереди пачками."""
+
+    def __init__(self, storage):
+        super().__init__(name='media-deletion', daemon=True)
+        self.storage = storage
+        self.queue = queue.Queue()
+
+    def take_batch(self, block=True):
+        names = []
+        try:
+            names.append(self.queue.get(block=block))
+            if block:
+                # Даём накопиться соседним удалениям.
+                time.sleep(MEDIA_DELETE_BATCH_DELAY)
+            while len(names) < MEDIA_DELETE_BATCH_SIZE:
+                names.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        return names
+
+    def process(self, names):
+        try:
+            self.storage.delete_batch(names)
+        except Exception:
+            logger.exception('Не удалось удалить медиафайлы: %s', names)
+        finally:
+            connection.close()
+
+    def run(self):
+        while True:
+            self.process(self.take_batch())
+
+    def flush(self):
+        """Синхронно удаляет всё, что осталось в очереди (при выходе)."""
+        while names := self.take_batch(block=False):
+            self.process(names)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage с именами по хэшу и подсчётом ссылок."""
+
+    def content_name(self, name, content):
+        """Имя файла по содержимому в каталоге исходного имени."""
+        directory, filename = posixpath.split(name)
+        ext = posixpath.splitext(filename)[1].lower()
+        digest = content_hash(content)
+        return posixpath.join(directory, digest[:2], digest[2:4], digest + ext)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        # Производные изображения именуются от оригинала, а не от себя.
+        if not is_derivative(name):
+            name = self.content_name(name, content)
+            try:
+                # Свежий файл не удалит отложенное удаление (см. выше).
+                os.utime(self.path(name))
+                return name
+            except FileNotFoundError:
+                pass
+        return super().save(name, content, max_length)
+
+    _deletion_worker = None
+    _deletion_worker_lock = threading.Lock()
+
+    def referenced_names(self, names):
+        """Какие из names ещё упомянуты в MEDIA_REFERENCE_FIELDS."""
+        referenced = set()
+        for model, field in reference_fields():
+            referenced.update(
+                model._default_manager.filter(**{f'{field}__in': names})
+                .values_list(field, flat=True)
+            )
+        return referenced
+
+    def delete(self, name):
+        # Производные не упоминаются в БД и перезаписываются сразу.
+        if is_derivative(name) or not settings.MEDIA_DEFERRED_DELETE:
+            return self.delete_batch([name])
+        transaction.on_commit(lambda: self.deletion_worker().queue.put(name))
+
+    def deletion_worker(self):
+        cls = ContentAddressedStorage
+        with cls._deletion_worker_lock:
+            if cls._deletion_worker is None:
+                cls._deletion_worker = DeletionWorker(self)
+                cls._deletion_worker.start()
+                atexit.register(cls._deletion_worker.flush)
+        return cls._deletion_worker
+
+    def delete_batch(self, names, min_age=MEDIA_GC_MIN_AGE):
+        """Удаляет файлы без ссылок вместе с их миниатюрами."""
+        names = set(names)
+        originals = {
+            name for name in names
+            if not is_derivative(name) and not self.is_recent(name, min_age)
+        }
+        derivatives = {name for name in names if is_derivative(name)}
+        referenced = self.referenced_names(originals) if originals else set()
+        for name in (originals | derivatives) - referenced:
+            if name in originals:
+                self.delete_derivatives(name)
+            super().delete(name)
+
+    def is_recent(self, name, min_age=MEDIA_GC_MIN_AGE):
+        """Файл создан или загружен повторно меньше min_age секунд назад."""
+        try:
+            mtime = os.stat(self.path(name)).st_mtime
+        except FileNotFoundError:
+            return False
+        return mtime > time.time() - min_age
+
+    def delete_derivatives(self, name):
+        """Удаляет миниатюры файла name (см. foodgram.images)."""
+        directory, filename = posixpath.split(name)
+        derivatives_dir = posixpath.join(directory, DERIVATIVES_DIR)
+        if not self.exists(derivatives_dir):
+            return
+        stem = posixpath.splitext(filename)[0]
+        for derivative in self.listdir(derivatives_dir)[1]:
+            if derivative.startswith(f'{stem}_'):
+                super().delete(posixpath.join(derivatives_dir, derivative))
@@ -1,13 +1,21 @@
-from api.views import get_recipe_by_hash
+from api import async_views, views
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from foodgram.metrics import metrics_view
+
 urlpatterns = [
     path('api/', include('api.urls')),
     path('admin/', admin.site.urls),
-    path('s/<str:short_hash>/', get_recipe_by_hash, name='recipe-short-link'),
+    path(
+        's/<str:short_hash>/',
+        async_views.get_recipe_by_hash if settings.ASYNC_READ_VIEWS
+        else views.get_recipe_by_hash,
+        name='recipe-short-link',
+    ),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
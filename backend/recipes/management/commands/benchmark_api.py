@@ -0,0 +1,435 @@
+import asyncio
+import itertools
+import json
+import random
+import re
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import quote, urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+from .benchmark_concurrency import HTTPClient, percentile
+
+COLLECTION = (
+    settings.BASE_DIR.parent / 'postman_collection'
+    / 'foodgram.postman_collection.json'
+)
+BASELINE_DIR = settings.BASE_DIR / 'benchmarks'
+SCENARIO_WEIGHTS = {
+    'anonymous_browse': 60,
+    'authed_browse': 25,
+    'recipe_edit': 10,
+    'cart_download': 5,
+}
+VARIABLE = re.compile(r'{{(\w+)}}')
+# Числовые id в метках заменяются, чтобы шаги сценариев группировались.
+NUMERIC_SEGMENT = re.compile(r'/\d+/')
+ERRORS = (OSError, ValueError, IndexError, asyncio.IncompleteReadError)
+
+
+def collection_requests(path):
+    """GET-запросы коллекции, кроме папок *_bad_requests."""
+    with open(path, encoding='utf-8') as file:
+        items = json.load(file)['item']
+    found = {}
+
+    def walk(items):
+        for item in items:
+            if 'item' in item:
+                if not item['name'].endswith('bad_requests'):
+                    walk(item['item'])
+                continue
+            request = item['request']
+            if request['method'] != 'GET':
+                continue
+            url = request['url']
+            raw = url['raw'] if isinstance(url, dict) else url
+            authed = request.get('auth', {}).get('type') == 'apikey' or any(
+                header.get('key') == 'Authorization'
+                for header in request.get('header', [])
+            )
+            found.setdefault((raw, authed), item['name'])
+
+    walk(items)
+    return [(name, raw, authed) for (raw, authed), name in found.items()]
+
+
+def label_for(method, target, authed):
+    """Метка без значений: /api/recipes/{id}/?page, а не ?page=3."""
+    path, _, query = target.partition('?')
+    label = f'{method} {NUMERIC_SEGMENT.sub("/{id}/", path)}'
+    keys = dict.fromkeys(
+        key for key, _, _ in (pair.partition('=') for pair in query.split('&'))
+        if key
+    )
+    if keys:
+        label += '?' + '&'.join(keys)
+    return label + (' [token]' if authed else '')
+
+
+class Fixtures:
+    """Реальные id из базы, с которой работает сервер."""
+
+    def __init__(self, users):
+        authors = list(
+            User.objects.annotate(recipe_count=Count('recipes'))
+            .filter(recipe_count__gt=0, is_active=True)
+            .order_by('-recipe_count', 'pk')[:users]
+        )
+        if not authors:
+            raise CommandError(
+                'В базе нет рецептов: сначала generate_dataset.')
+        self.tokens = [
+            Token.objects.get_or_create(user=author)[0].key
+            for author in authors
+        ]
+        self.own_recipes = {
+            token: list(author.recipes.values_list('pk', flat=True)[:50])
+            for token, author in zip(self.tokens, authors)
+        }
+        self.cart_candidates = {
+            token: itertools.cycle(
+                Recipe.objects.exclude(shopping_carts__user=author)
+                .values_list('pk', flat=True)[:200]
+            )
+            for token, author in zip(self.tokens, authors)
+        }
+        self.recipe_ids = list(
+            Recipe.objects.values_list('pk', flat=True)[:1000])
+        self.tag_slugs = list(Tag.objects.values_list('slug', flat=True))
+        tags = list(Tag.objects.order_by('pk')[:3])
+        ingredient = Ingredient.objects.order_by('pk').first()
+        self.variables = {
+            'userId': authors[0].pk,
+            'secondUserId': authors[-1].pk,
+            'firstRecipeId': self.recipe_ids[0],
+            'firstTagId': tags[0].pk if tags else None,
+            'secondTagSlug': tags[1].slug if len(tags) > 1 else None,
+            'thirdTagSlug': tags[2].slug if len(tags) > 2 else None,
+            'firstIndredientId': ingredient.pk if ingredient else None,
+            'ingredientNameFirstLatter': (
+                ingredient.name[0] if ingredient else None),
+        }
+
+    def substitute(self, raw):
+        """Путь запроса коллекции или None, если переменной нет в базе."""
+        def value(match):
+            name = match.group(1)
+            if name == 'baseUrl':
+                return ''
+            if self.variables.get(name) is None:
+                raise KeyError(name)
+            return str(self.variables[name])
+
+        try:
+            return quote(VARIABLE.sub(value, raw), safe='/?&=%')
+        except KeyError:
+            return None
+
+    def recipe_body(self, pk, rng):
+        recipe = Recipe.objects.prefetch_related(
+            'tags', 'ingredient_connections').get(pk=pk)
+        return json.dumps({
+            'name': recipe.name,
+            'text': f'{recipe.text} ({rng.randint(1, 10 ** 6)})',
+            'cooking_time': recipe.cooking_time,
+            'tags': [tag.pk for tag in recipe.tags.all()],
+            'ingredients': [
+                {'id': link.ingredient_id, 'amount': link.amount}
+                for link in recipe.ingredient_connections.all()
+            ],
+        }).encode()
+
+
+class Command(BaseCommand):
+    help = (
+        'Бенчмарк API: GET-запросы Postman-коллекции и взвешенные '
+        'сценарии (гость, пользователь, правка рецепта, корзина) против '
+        'запущенного сервера. p50/p95/p99 и запросы/с по эндпоинтам, '
+        'сохранение и сравнение базовых замеров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url', default='http://localhost:8000',
+            help='Адрес сервера, работающего с этой же базой.',
+        )
+        parser.add_argument(
+            '--phase', choices=('collection', 'scenarios', 'all'),
+            default='all',
+        )
+        parser.add_argument(
+            '--collection', default=str(COLLECTION),
+            help='Путь к Postman-коллекции.',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Запросов на каждый GET коллекции.',
+        )
+        parser.add_argument(
+            '--sessions', type=int, default=500,
+            help='Число сессий-сценариев.',
+        )
+        parser.add_argument(
+            '--mix', type=str,
+            default=','.join(
+                f'{name}={weight}'
+                for name, weight in SCENARIO_WEIGHTS.items()
+            ),
+            help='Веса сценариев: anonymous_browse=60,recipe_edit=10,...',
+        )
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument(
+            '--users', type=int, default=20,
+            help='Сколько авторов-пользователей получат токены.',
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--save', metavar='NAME',
+            help='Сохранить результат как базовый замер NAME.',
+        )
+        parser.add_argument(
+            '--compare', metavar='NAME',
+            help='Сравнить с базовым замером NAME.',
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=10,
+            help='Регрессия: p95 выросло или запросы/с упали больше, '
+                 'чем на столько процентов.',
+        )
+        parser.add_argument(
+            '--fail-on-regression', action='store_true',
+            help='Завершиться с ошибкой при регрессии.',
+        )
+
+    def handle(self, *args, **options):
+        parts = urlsplit(options['url'])
+        if parts.scheme != 'http':
+            raise CommandError('Поддерживается только http://.')
+        self.address = (parts.hostname, parts.port or 80)
+        self.fixtures = Fixtures(options['users'])
+        results = {}
+        if options['phase'] in ('collection', 'all'):
+            results.update(self.run_collection(options))
+        if options['phase'] in ('scenarios', 'all'):
+            results.update(self.run_scenarios(options))
+        self.print_results(results)
+        if options['save']:
+            path = self.save(options['save'], results, options)
+            self.stdout.write(self.style.SUCCESS(f'Сохранено: {path}'))
+        if options['compare']:
+            regressions = self.compare(options['compare'], results, options)
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f'Регрессий: {regressions}.')
+
+    async def send(self, client, step, stats):
+        label, method, target, body, token = step
+        headers = []
+        if token:
+            headers.append(('Authorization', f'Token {token}'))
+        if body:
+            headers.append(('Content-Type', 'application/json'))
+        start = time.perf_counter()
+        try:
+            status = await client.request(method, target, body, headers)
+        except ERRORS as error:
+            stats[label]['errors'].append(repr(error))
+            await client.close()
+            return
+        stats[label]['timings'].append((time.perf_counter() - start) * 1000)
+        if status >= 400:
+            stats[label]['errors'].append(status)
+
+    async def load(self, steps, concurrency):
+        """Очередь шагов; шаги одной сессии идут одним соединением."""
+        stats = defaultdict(lambda: {'timings': [], 'errors': []})
+        sessions = iter(steps)
+
+        async def worker():
+            client = HTTPClient(*self.address, [('Accept', '*/*')])
+            try:
+                for session in sessions:
+                    for step in session:
+                        await self.send(client, step, stats)
+            finally:
+                await client.close()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return stats, time.perf_counter() - start
+
+    def run_collection(self, options):
+        tokens = self.fixtures.tokens
+        results = {}
+        for name, raw, authed in collection_requests(options['collection']):
+            target = self.fixtures.substitute(raw)
+            if target is None:
+                self.stdout.write(self.style.WARNING(
+                    f'Пропуск «{name}»: нет данных для {raw}.'))
+                continue
+            label = label_for('GET', target, authed)
+            steps = [
+                [(label, 'GET', target, b'', tokens[0] if authed else None)]
+                for _ in range(options['requests'])
+            ]
+            stats, elapsed = asyncio.run(
+                self.load(steps, options['concurrency']))
+            results.update(self.summarize(stats, elapsed, 'collection'))
+        return results
+
+    def run_scenarios(self, options):
+        weights = {}
+        for pair in options['mix'].split(','):
+            name, _, weight = pair.partition('=')
+            if not hasattr(self, f'scenario_{name}'):
+                raise CommandError(f'Неизвестный сценарий: {name}.')
+            weights[name] = float(weight)
+        rng = random.Random(options['seed'])
+        names = rng.choices(
+            list(weights), weights=list(weights.values()),
+            k=options['sessions'],
+        )
+        sessions = [
+            getattr(self, f'scenario_{name}')(name, rng) for name in names]
+        stats, elapsed = asyncio.run(
+            self.load(sessions, options['concurrency']))
+        # Общая пропускная способность смеси — главная цифра для сравнения.
+        steps = list(stats.values())
+        stats['scenarios: всего'] = {
+            key: [value for data in steps for value in data[key]]
+            for key in ('timings', 'errors')
+        }
+        return self.summarize(stats, elapsed, 'scenarios')
+
+    def scenario_anonymous_browse(self, name, rng):
+        recipes = self.fixtures.recipe_ids
+        steps = [
+            ('GET', f'/api/recipes/?page={rng.randint(1, 5)}'),
+            ('GET', f'/api/recipes/{rng.choice(recipes)}/'),
+            ('GET', '/api/tags/'),
+            ('GET', f'/api/recipes/{rng.choice(recipes)}/'),
+        ]
+        if self.fixtures.tag_slugs:
+            slug = rng.choice(self.fixtures.tag_slugs)
+            steps.append(('GET', f'/api/recipes/?tags={slug}'))
+        return self.session(name, steps, None)
+
+    def scenario_authed_browse(self, name, rng):
+        return self.session(name, [
+            ('GET', '/api/users/me/'),
+            ('GET', '/api/recipes/'),
+            ('GET', '/api/recipes/?is_favorited=1'),
+            ('GET', f'/api/recipes/{rng.choice(self.fixtures.recipe_ids)}/'),
+            ('GET', '/api/users/subscriptions/?recipes_limit=3'),
+        ], rng.choice(self.fixtures.tokens))
+
+    def scenario_recipe_edit(self, name, rng):
+        token = rng.choice(self.fixtures.tokens)
+        pk = rng.choice(self.fixtures.own_recipes[token])
+        return self.session(name, [
+            ('GET', f'/api/recipes/{pk}/'),
+            ('PATCH', f'/api/recipes/{pk}/',
+             self.fixtures.recipe_body(pk, rng)),
+        ], token)
+
+    def scenario_cart_download(self, name, rng):
+        token = rng.choice(self.fixtures.tokens)
+        pk = next(self.fixtures.cart_candidates[token])
+        return self.session(name, [
+            ('POST', f'/api/recipes/{pk}/shopping_cart/'),
+            ('GET', '/api/recipes/download_shopping_cart/'),
+            ('DELETE', f'/api/recipes/{pk}/shopping_cart/'),
+        ], token)
+
+    @staticmethod
+    def session(name, steps, token):
+        return [
+            (
+                f'{name}: {label_for(method, target, False)}',
+                method, target, body[0] if body else b'', token,
+            )
+            for method, target, *body in steps
+        ]
+
+    @staticmethod
+    def summarize(stats, elapsed, phase):
+        results = {}
+        for label, data in stats.items():
+            timings = data['timings']
+            if not timings:
+                results[label] = {
+                    'phase': phase, 'errors': len(data['errors'])}
+                continue
+            results[label] = {
+                'phase': phase,
+                'count': len(timings),
+                'errors': len(data['errors']),
+                'rps': round(len(timings) / elapsed, 1),
+                'p50': round(percentile(timings, 0.5), 2),
+                'p95': round(percentile(timings, 0.95), 2),
+                'p99': round(percentile(timings, 0.99), 2),
+            }
+        return results
+
+    def print_results(self, results):
+        for label, result in results.items():
+            if 'count' not in result:
+                self.stdout.write(self.style.ERROR(
+                    f'{label}: ни одного ответа ({result["errors"]} ошибок)'))
+                continue
+            style = self.style.WARNING if result['errors'] else str
+            self.stdout.write(style(
+                f'{label}: {result["rps"]} запр/с, '
+                f'p50 {result["p50"]} мс, p95 {result["p95"]} мс, '
+                f'p99 {result["p99"]} мс, ошибок: {result["errors"]}'
+            ))
+
+    @staticmethod
+    def baseline_path(name):
+        return Path(BASELINE_DIR) / f'{name}.json'
+
+    def save(self, name, results, options):
+        path = self.baseline_path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({
+            'created': datetime.now(timezone.utc).isoformat(
+                timespec='seconds'),
+            'options': {
+                key: options[key] for key in (
+                    'requests', 'sessions', 'mix', 'concurrency', 'seed')
+            },
+            'results': results,
+        }, ensure_ascii=False, indent=2), encoding='utf-8')
+        return path
+
+    def compare(self, name, results, options):
+        path = self.baseline_path(name)
+        if not path.exists():
+            raise CommandError(f'Нет базового замера {path}.')
+        baseline = json.loads(path.read_text(encoding='utf-8'))
+        self.stdout.write(f'Сравнение с {name} ({baseline["created"]}):')
+        regressions = 0
+        for label, result in results.items():
+            before = baseline['results'].get(label)
+            if not before or 'count' not in before or 'count' not in result:
+                continue
+            p95 = (result['p95'] / before['p95'] - 1) * 100
+            rps = (result['rps'] / before['rps'] - 1) * 100
+            regressed = (
+                p95 > options['threshold'] or rps < -options['threshold'])
+            regressions += regressed
+            style = self.style.ERROR if regressed else self.style.SUCCESS
+            self.stdout.write(style(
+                f'{label}: p95 {before["p95"]} → {result["p95"]} мс '
+                f'({p95:+.0f}%), {before["rps"]} → {result["rps"]} запр/с '
+                f'({rps:+.0f}%)'
+            ))
+        return regressions
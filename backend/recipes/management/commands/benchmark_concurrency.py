@@ -0,0 +1,139 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+class HTTPClient:
+    """Минимальный HTTP/1.1-клиент с keep-alive поверх asyncio."""
+
+    def __init__(self, host, port, headers):
+        self.host = host
+        self.port = port
+        self.headers = headers
+        self.reader = self.writer = None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+    async def get(self, target):
+        return await self.request('GET', target)
+
+    async def request(self, method, target, body=b'', headers=()):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port)
+        lines = [f'{method} {target} HTTP/1.1', f'Host: {self.host}']
+        lines += [
+            f'{name}: {value}' for name, value
+            in [*self.headers, *headers]
+        ]
+        if body or method not in ('GET', 'HEAD'):
+            lines.append(f'Content-Length: {len(body)}')
+        self.writer.write(
+            ('\r\n'.join(lines) + '\r\n\r\n').encode() + body)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length, chunked, keep_alive = None, False, True
+        while (line := await self.reader.readline()) not in (b'\r\n', b''):
+            name, _, value = line.decode('latin-1').partition(':')
+            name, value = name.strip().lower(), value.strip().lower()
+            if name == 'content-length':
+                length = int(value)
+            elif name == 'transfer-encoding':
+                chunked = 'chunked' in value
+            elif name == 'connection':
+                keep_alive = value != 'close'
+        if chunked:
+            while size := int((await self.reader.readline()).strip(), 16):
+                await self.reader.readexactly(size + 2)
+            await self.reader.readline()
+        elif length is not None:
+            await self.reader.readexactly(length)
+        else:
+            await self.reader.read()
+            keep_alive = False
+        if not keep_alive:
+            await self.close()
+        return status
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузка на запущенный сервер с высокой конкурентностью: '
+        'запросы/с и задержки. Запустите под SERVER_MODE=wsgi и '
+        'SERVER_MODE=asgi и сравните.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'urls', nargs='+',
+            help='Адреса, например http://localhost:8000/api/recipes/',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=200,
+            help='Число одновременных соединений.',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=5000,
+            help='Число запросов на каждый адрес.',
+        )
+        parser.add_argument(
+            '--token', type=str,
+            help='Токен для заголовка Authorization.',
+        )
+
+    async def _load(self, url, total, concurrency, headers):
+        parts = urlsplit(url)
+        if parts.scheme != 'http':
+            raise CommandError('Поддерживается только http://.')
+        target = parts.path + (f'?{parts.query}' if parts.query else '')
+        remaining = iter(range(total))
+        timings, errors = [], []
+
+        async def worker():
+            client = HTTPClient(parts.hostname, parts.port or 80, headers)
+            try:
+                for _ in remaining:
+                    start = time.perf_counter()
+                    try:
+                        status = await client.get(target)
+                    except (OSError, ValueError, IndexError,
+                            asyncio.IncompleteReadError) as error:
+                        errors.append(repr(error))
+                        await client.close()
+                        continue
+                    timings.append((time.perf_counter() - start) * 1000)
+                    if status >= 400:
+                        errors.append(status)
+            finally:
+                await client.close()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return timings, errors, time.perf_counter() - start
+
+    def handle(self, *args, **options):
+        headers = [('Accept', 'application/json')]
+        if options['token']:
+            headers.append(('Authorization', f'Token {options["token"]}'))
+        for url in options['urls']:
+            timings, errors, elapsed = asyncio.run(self._load(
+                url, options['requests'], options['concurrency'], headers))
+            if not timings:
+                raise CommandError(f'{url}: ни одного ответа ({errors[:1]}).')
+            self.stdout.write(self.style.SUCCESS(
+                f'{url}: {len(timings) / elapsed:.0f} запр/с, '
+                f'p50 {percentile(timings, 0.5):.1f} мс, '
+                f'p95 {percentile(timings, 0.95):.1f} мс, '
+                f'p99 {percentile(timings, 0.99):.1f} мс, '
+                f'ошибок: {len(errors)}'
+            ))
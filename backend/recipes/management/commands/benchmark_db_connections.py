@@ -0,0 +1,88 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from statistics import median
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.utils import load_backend
+
+POOL_ENGINE = 'foodgram.db.backends.postgresql_pool'
+
+
+class Command(BaseCommand):
+    help = (
+        'Накладные расходы на соединение с PostgreSQL: новое соединение '
+        'на запрос, постоянные соединения (CONN_MAX_AGE) и пул.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=500,
+            help='Число имитируемых запросов на режим.',
+        )
+        parser.add_argument(
+            '--threads', type=int, default=4,
+            help='Число параллельных потоков (как потоки воркера).',
+        )
+
+    def _wrapper(self, engine, **overrides):
+        settings_dict = {
+            **connections['default'].settings_dict,
+            'ENGINE': engine,
+            **overrides,
+        }
+        return load_backend(engine).DatabaseWrapper(
+            settings_dict, alias=f'benchmark-{engine}')
+
+    def _request(self, make_wrapper, local):
+        """Один запрос: SELECT 1 и завершение, как в request_finished."""
+        wrapper = getattr(local, 'wrapper', None)
+        if wrapper is None:
+            wrapper = local.wrapper = make_wrapper()
+        start = time.perf_counter()
+        wrapper.close_if_unusable_or_obsolete()
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        wrapper.close_if_unusable_or_obsolete()
+        return (time.perf_counter() - start) * 1000
+
+    def _run(self, make_wrapper, total, threads):
+        local = threading.local()
+        wrappers = []
+
+        def call(_):
+            duration = self._request(make_wrapper, local)
+            if local.wrapper not in wrappers:
+                wrappers.append(local.wrapper)
+            return duration
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            timings = list(executor.map(call, range(total)))
+        elapsed = time.perf_counter() - start
+        for wrapper in wrappers:
+            wrapper.inc_thread_sharing()
+            wrapper.close()
+        return total / elapsed, median(timings), max(timings)
+
+    def handle(self, *args, **options):
+        if connections['default'].vendor != 'postgresql':
+            raise CommandError('Нужна база PostgreSQL.')
+        engine = 'django.db.backends.postgresql'
+        modes = (
+            ('новое соединение на запрос', lambda: self._wrapper(
+                engine, CONN_MAX_AGE=0)),
+            ('CONN_MAX_AGE=60 + health checks', lambda: self._wrapper(
+                engine, CONN_MAX_AGE=60, CONN_HEALTH_CHECKS=True)),
+            (f'пул, {options["threads"]} соединений', lambda: self._wrapper(
+                POOL_ENGINE, CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=False,
+                POOL={'min_size': 0, 'max_size': options['threads']})),
+        )
+        for label, make_wrapper in modes:
+            rps, p50, worst = self._run(
+                make_wrapper, options['requests'], options['threads'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{label}: {rps:.0f} запр/с, медиана {p50:.2f} мс, '
+                f'максимум {worst:.2f} мс'
+            ))
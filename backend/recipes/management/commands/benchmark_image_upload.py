@@ -0,0 +1,65 @@
+import base64
+import os
+import tracemalloc
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from api.uploads import check_uploaded_image, decode_base64_image
+
+MB = 1024 * 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Пиковое потребление памяти при приёме изображения: '
+        'base64 в JSON (целиком и потоково) и multipart.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size-mb', type=float, default=8,
+            help='Размер изображения в МБ (до кодирования в base64).',
+        )
+
+    def _peak(self, func):
+        tracemalloc.start()
+        try:
+            result = func()
+            return tracemalloc.get_traced_memory()[1], result
+        finally:
+            tracemalloc.stop()
+
+    def handle(self, *args, **options):
+        # Случайные байты за PNG-сигнатурой: проверяется приём, а не Pillow.
+        raw = b'\x89PNG\r\n\x1a\n' + os.urandom(int(options['size_mb'] * MB))
+        data_uri = 'data:image/png;base64,' + base64.b64encode(raw).decode()
+        # Тело multipart-запроса собирается в памяти ещё до замера.
+        request = RequestFactory().post('/api/users/me/avatar/', {
+            'avatar': SimpleUploadedFile('avatar.png', raw, 'image/png'),
+        })
+        del raw
+
+        def whole_payload():
+            header, encoded = data_uri.split(';base64,')
+            return len(base64.b64decode(encoded))
+
+        def streaming():
+            file = decode_base64_image(data_uri)
+            file.close()
+            return file.size
+
+        def multipart():
+            file = check_uploaded_image(request.FILES['avatar'])
+            return file.size
+
+        for label, func in (
+            ('base64 целиком (старый путь)', whole_payload),
+            ('base64 потоково', streaming),
+            ('multipart', multipart),
+        ):
+            peak, size = self._peak(func)
+            self.stdout.write(self.style.SUCCESS(
+                f'{label}: {size / MB:.1f} МБ, пик памяти {peak / MB:.2f} МБ'
+            ))
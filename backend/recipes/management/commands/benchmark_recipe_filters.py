@@ -0,0 +1,112 @@
+import itertools
+import time
+from statistics import median
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import RequestFactory
+
+from api.filters import CustomRecipeFilter
+from foodgram.constants import RECIPE_PAGINATION
+from recipes.models import Favorite, Recipe, Tag
+from users.models import User
+
+FILTER_NAMES = (
+    'tags', 'tags_all', 'author', 'is_favorited', 'is_in_shopping_cart')
+
+
+class Command(BaseCommand):
+    help = (
+        'Замер времени и планов запросов CustomRecipeFilter '
+        'для всех комбинаций фильтров на текущих данных.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Сколько раз выполнять каждый запрос (берётся медиана).',
+        )
+        parser.add_argument(
+            '--user-email', type=str,
+            help='Пользователь для is_favorited/is_in_shopping_cart '
+                 '(по умолчанию — с наибольшим числом избранного).',
+        )
+        parser.add_argument(
+            '--explain', action='store_true',
+            help='Печатать план запроса первой страницы.',
+        )
+
+    def _resolve_user(self, email):
+        if email:
+            user = User.objects.filter(email=email).first()
+            if not user:
+                raise CommandError(f'Пользователь {email} не найден.')
+            return user
+        user_id = (
+            Favorite.objects.values('user_id')
+            .annotate(total=Count('id')).order_by('-total')
+            .values_list('user_id', flat=True).first()
+        )
+        return User.objects.filter(pk=user_id).first() or User.objects.first()
+
+    def _params(self):
+        """Значения фильтров: самые частые теги и самый активный автор."""
+        slugs = list(
+            Tag.objects.annotate(total=Count('recipes'))
+            .order_by('-total').values_list('slug', flat=True)[:2]
+        )
+        author_id = (
+            Recipe.objects.values('author_id')
+            .annotate(total=Count('id')).order_by('-total')
+            .values_list('author_id', flat=True).first()
+        )
+        return {
+            'tags': slugs,
+            'tags_all': slugs,
+            'author': [author_id],
+            'is_favorited': [1],
+            'is_in_shopping_cart': [1],
+        }
+
+    def _measure(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return median(timings)
+
+    def handle(self, *args, **options):
+        user = self._resolve_user(options['user_email'])
+        if not user:
+            raise CommandError('В БД нет пользователей.')
+        params = self._params()
+        factory = RequestFactory()
+        explain_options = (
+            {'analyze': True, 'buffers': True}
+            if connection.vendor == 'postgresql' else {}
+        )
+        self.stdout.write(
+            f'Рецептов: {Recipe.objects.count()}, пользователь: {user.email}')
+        for size in range(len(FILTER_NAMES) + 1):
+            for names in itertools.combinations(FILTER_NAMES, size):
+                query = {name: params[name] for name in names}
+                request = factory.get('/api/recipes/', query)
+                request.user = user
+                queryset = CustomRecipeFilter(
+                    request.GET, queryset=Recipe.objects.all(),
+                    request=request,
+                ).qs
+                page = queryset[:RECIPE_PAGINATION]
+                count_ms = self._measure(queryset.count, options['repeat'])
+                page_ms = self._measure(
+                    lambda: list(page.all()), options['repeat'])
+                self.stdout.write(self.style.SUCCESS(
+                    f'{"+".join(names) or "без фильтров"}: '
+                    f'count {count_ms:.2f} мс, '
+                    f'страница {page_ms:.2f} мс, '
+                    f'найдено {queryset.count()}'
+                ))
+                if options['explain']:
+                    self.stdout.write(page.explain(**explain_options))
@@ -0,0 +1,95 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from api.authentication import CachedTokenAuthentication
+from users.models import User
+
+
+def probe_view(authentication_class):
+    class Probe(APIView):
+        authentication_classes = [authentication_class]
+        permission_classes = [IsAuthenticated]
+
+        def get(self, request):
+            return Response({'id': request.user.pk})
+
+    return Probe.as_view()
+
+
+class Command(BaseCommand):
+    help = (
+        'Пропускная способность аутентифицированных запросов: '
+        'TokenAuthentication против CachedTokenAuthentication.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=2000,
+            help='Число запросов на каждый вариант.',
+        )
+        parser.add_argument(
+            '--threads', type=int, default=1,
+            help='Число параллельных потоков.',
+        )
+        parser.add_argument(
+            '--user-email', type=str,
+            help='Пользователь (по умолчанию — первый активный).',
+        )
+
+    def _run(self, view, request, total, threads):
+        def call(_):
+            response = view(request)
+            if response.status_code != 200:
+                raise CommandError(f'Ответ {response.status_code}.')
+            # Потоки не должны держать соединения после завершения.
+            if threads > 1:
+                connection.close()
+
+        # Прогрев: первый запрос заполняет кэши.
+        call(None)
+        with CaptureQueriesContext(connection) as queries:
+            view(request)
+        start = time.perf_counter()
+        if threads > 1:
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                list(executor.map(call, range(total)))
+        else:
+            for index in range(total):
+                call(index)
+        return total / (time.perf_counter() - start), len(queries)
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(is_active=True)
+        if options['user_email']:
+            users = users.filter(email=options['user_email'])
+        user = users.order_by('id').first()
+        if user is None:
+            raise CommandError('Нет подходящего пользователя.')
+        token, created = Token.objects.get_or_create(user=user)
+        request = APIRequestFactory().get(
+            '/api/users/me/', HTTP_AUTHORIZATION=f'Token {token.key}')
+        try:
+            for authentication_class in (
+                TokenAuthentication, CachedTokenAuthentication
+            ):
+                rps, queries = self._run(
+                    probe_view(authentication_class), request,
+                    options['requests'], options['threads'],
+                )
+                self.stdout.write(self.style.SUCCESS(
+                    f'{authentication_class.__name__}: {rps:.0f} запр/с, '
+                    f'запросов к БД на вызов: {queries}'
+                ))
+        finally:
+            if created:
+                token.delete()
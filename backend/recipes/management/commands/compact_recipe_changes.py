@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, Max, Min, OuterRef, Q
+
+from foodgram.constants import CHANGE_LOG_COMPACT_BATCH
+from recipes.models import RecipeChange
+
+
+class Command(BaseCommand):
+    help = (
+        'Уплотнение журнала изменений рецептов: у каждого рецепта '
+        'остаётся только последняя запись (включая запись об удалении), '
+        'поэтому выданные клиентам курсоры остаются действительными. '
+        'Рецепт, созданный и затем изменённый, после этого приходит '
+        'клиентам в updated, а не в created.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=CHANGE_LOG_COMPACT_BATCH,
+            help='Диапазон id журнала на один DELETE.',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        bounds = RecipeChange.objects.aggregate(
+            first=Min('id'), last=Max('id'))
+        # «Позже» — в порядке журнала, (txid, id).
+        newer = RecipeChange.objects.filter(
+            Q(txid__gt=OuterRef('txid'))
+            | Q(txid=OuterRef('txid'), id__gt=OuterRef('id')),
+            recipe_id=OuterRef('recipe_id'),
+        )
+        removed = 0
+        start = (bounds['first'] or 1) - 1
+        # Короткие DELETE по диапазонам id не держат блокировки долго.
+        while bounds['last'] and start < bounds['last']:
+            end = start + options['batch_size']
+            count, _ = RecipeChange.objects.filter(
+                id__gt=start, id__lte=end
+            ).filter(Exists(newer)).delete()
+            removed += count
+            start = end
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено устаревших записей журнала: {removed}, осталось: '
+            f'{RecipeChange.objects.count()} '
+            f'({time.perf_counter() - started:.1f} с).'
+        ))
@@ -0,0 +1,111 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from foodgram.constants import (
+    AVATAR_IMAGE_SIZES,
+    MEDIA_GC_MIN_AGE,
+    RECIPE_IMAGE_SIZES,
+)
+from foodgram.images import derivative_names
+from foodgram.storage import reference_fields
+
+DERIVATIVE_SIZES = {
+    'recipes.Recipe': RECIPE_IMAGE_SIZES,
+    'users.User': AVATAR_IMAGE_SIZES,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Ищет в MEDIA_ROOT файлы, на которые не ссылается ни одна запись, '
+        'и удаляет их с флагом --delete.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--delete', action='store_true',
+            help='Удалить найденные файлы (по умолчанию только отчёт).',
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=MEDIA_GC_MIN_AGE,
+            help='Не трогать файлы моложе стольких секунд.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Число параллельных потоков обхода.',
+        )
+
+    def _referenced(self):
+        referenced = set()
+        for model, field in reference_fields():
+            sizes = DERIVATIVE_SIZES.get(model._meta.label, ())
+            names = (
+                model._default_manager.exclude(**{field: ''})
+                .exclude(**{field: None})
+                .order_by().values_list(field, flat=True).distinct()
+                .iterator()
+            )
+            for name in names:
+                referenced.add(name)
+                if sizes:
+                    referenced.update(derivative_names(name, sizes))
+        return referenced
+
+    def _scan(self, directory, referenced, deadline):
+        """Файлы без ссылок в каталоге и список его подкаталогов."""
+        orphans, subdirs = [], []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                    continue
+                name = os.path.relpath(
+                    entry.path, settings.MEDIA_ROOT).replace(os.sep, '/')
+                if name in referenced:
+                    continue
+                stat = entry.stat()
+                if stat.st_mtime < deadline:
+                    orphans.append((name, stat.st_size))
+        return orphans, subdirs
+
+    def handle(self, *args, **options):
+        media_root = settings.MEDIA_ROOT
+        if not os.path.isdir(media_root):
+            self.stdout.write(self.style.WARNING(
+                f'Каталог {media_root} не найден.'))
+            return
+        # Файлы загружаются до коммита: свежие могут ещё не иметь ссылки.
+        deadline = time.time() - options['min_age']
+        referenced = self._referenced()
+        orphans = []
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            # Обход в ширину: каждый уровень каталогов — параллельно.
+            level = [media_root]
+            while level:
+                next_level = []
+                for found, subdirs in executor.map(
+                    lambda path: self._scan(path, referenced, deadline),
+                    level,
+                ):
+                    orphans.extend(found)
+                    next_level.extend(subdirs)
+                level = next_level
+        total = sum(size for _, size in orphans)
+        for name, size in sorted(orphans):
+            self.stdout.write(f'{name} ({size} Б)')
+        if options['delete'] and orphans:
+            # Оригиналы перепроверяются по БД прямо перед удалением.
+            default_storage.delete_batch(
+                [name for name, _ in orphans], min_age=options['min_age'])
+            action = 'Удалено'
+        else:
+            action = 'Найдено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} файлов без ссылок: {len(orphans)}, '
+            f'{total / (1024 * 1024):.1f} МБ.'
+        ))
@@ -0,0 +1,332 @@
+import csv
+import io
+import random
+import time
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from foodgram.cache import RECIPES_NAMESPACE, USERS_NAMESPACE, bump_version
+from foodgram.constants import RECIPE_IMAGE_SIZES, TAG_BITMASK_CAPACITY
+from foodgram.images import get_placeholder_bytes, schedule_derivatives
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeChange,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag,
+    build_tags_mask,
+    encode_short_code,
+)
+from users.models import Follow, User
+
+FIRST_NAMES = (
+    'Анна', 'Иван', 'Мария', 'Пётр', 'Ольга', 'Алексей', 'Елена',
+    'Дмитрий', 'Наталья', 'Сергей', 'Татьяна', 'Михаил',
+)
+LAST_NAMES = (
+    'Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Петров',
+    'Соколов', 'Михайлов', 'Новиков', 'Фёдоров', 'Морозов', 'Волков',
+)
+DISHES = (
+    'Суп', 'Салат', 'Рагу', 'Запеканка', 'Паста', 'Омлет', 'Пирог',
+    'Каша', 'Котлеты', 'Плов', 'Рулет', 'Гратен', 'Боул', 'Тарт',
+)
+DISH_DETAILS = (
+    'с грибами', 'с курицей', 'с овощами', 'с сыром', 'по-домашнему',
+    'с тыквой', 'с лососем', 'с фасолью', 'по-итальянски', 'с зеленью',
+    'с говядиной', 'пряный', 'быстрый', 'с рисом', 'с томатами',
+)
+UNITS = ('г', 'мл', 'шт', 'ч. л.', 'ст. л.', 'по вкусу')
+# NULL в COPY: пустая строка остаётся пустой строкой.
+COPY_NULL = r'\N'
+PUBLISHED_WITHIN_DAYS = 365
+
+
+class Zipf:
+    """
+    Выбор из population с весом 1 / rank ** exponent; ранги —
+    случайная перестановка, то есть «популярные» объекты случайны.
+    """
+
+    def __init__(self, rng, population, exponent):
+        self.rng = rng
+        self.population = list(population)
+        rng.shuffle(self.population)
+        self.cum_weights = list(accumulate(
+            1 / rank ** exponent
+            for rank in range(1, len(self.population) + 1)
+        ))
+
+    def choice(self):
+        return self.rng.choices(
+            self.population, cum_weights=self.cum_weights)[0]
+
+    def sample(self, count, exclude=None):
+        """До count разных значений (популярные чаще)."""
+        count = min(count, len(self.population) - (exclude is not None))
+        chosen = {}
+        for _ in range(10):
+            if len(chosen) >= count:
+                break
+            for value in self.rng.choices(
+                self.population, cum_weights=self.cum_weights,
+                k=2 * (count - len(chosen)),
+            ):
+                if value != exclude and len(chosen) < count:
+                    chosen[value] = None
+        return list(chosen)
+
+
+def next_id(model):
+    return (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+
+class Command(BaseCommand):
+    help = (
+        'Синтетический набор данных для нагрузочных тестов: пользователи, '
+        'рецепты, ингредиенты, теги, избранное, корзины и подписки с '
+        'распределением Ципфа. Вставка пачками (COPY на PostgreSQL), '
+        'результат определяется --seed и текущим содержимым базы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--tags', type=int, default=8,
+            help='Сколько тегов должно быть (недостающие создаются).',
+        )
+        parser.add_argument(
+            '--ingredients', type=int, default=2000,
+            help='Сколько ингредиентов создать, если справочник пуст.',
+        )
+        parser.add_argument(
+            '--ingredients-per-recipe', type=int, default=8,
+            help='Среднее число ингредиентов в рецепте.',
+        )
+        parser.add_argument(
+            '--favorites', type=float, default=10,
+            help='Среднее число избранных рецептов у пользователя.',
+        )
+        parser.add_argument(
+            '--carts', type=float, default=3,
+            help='Среднее число рецептов в корзине пользователя.',
+        )
+        parser.add_argument(
+            '--follows', type=float, default=5,
+            help='Среднее число подписок пользователя.',
+        )
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help='Показатель распределения Ципфа (больше — сильнее перекос).',
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=50000)
+
+    def handle(self, *args, **options):
+        if options['users'] < 2 or options['recipes'] < 1:
+            raise CommandError('Нужны хотя бы 2 пользователя и 1 рецепт.')
+        if options['tags'] > TAG_BITMASK_CAPACITY:
+            raise CommandError(
+                f'Тегов не больше {TAG_BITMASK_CAPACITY} (маска тегов).')
+        self.rng = random.Random(options['seed'])
+        self.options = options
+        self.batch_size = options['batch_size']
+        started = time.perf_counter()
+        with transaction.atomic():
+            tag_ids = self.ensure_tags(options['tags'])
+            ingredient_ids = self.ensure_ingredients(options['ingredients'])
+            user_ids = self.generate_users(options['users'])
+            authors = Zipf(self.rng, user_ids, options['zipf'])
+            recipe_ids = self.generate_recipes(
+                options['recipes'], authors, tag_ids, ingredient_ids)
+            recipes = Zipf(self.rng, recipe_ids, options['zipf'])
+            self.generate_user_recipes(
+                Favorite, user_ids, recipes, options['favorites'])
+            self.generate_user_recipes(
+                ShoppingCart, user_ids, recipes, options['carts'])
+            self.generate_follows(user_ids, authors, options['follows'])
+            self.reset_sequences()
+        bump_version(RECIPES_NAMESPACE)
+        bump_version(USERS_NAMESPACE)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.perf_counter() - started:.1f} с.'))
+
+    def insert(self, model, fields, rows):
+        """Вставляет строки пачками: COPY на PostgreSQL, иначе executemany."""
+        table = model._meta.db_table
+        columns = [model._meta.get_field(name).column for name in fields]
+        total = 0
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) == self.batch_size:
+                    self.insert_batch(cursor, table, columns, batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                self.insert_batch(cursor, table, columns, batch)
+                total += len(batch)
+        self.stdout.write(
+            f'{table}: {total} строк за {time.perf_counter() - started:.1f} с')
+        return total
+
+    @staticmethod
+    def insert_batch(cursor, table, columns, batch):
+        quote = connection.ops.quote_name
+        column_list = ', '.join(quote(column) for column in columns)
+        if connection.vendor == 'postgresql':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in batch:
+                writer.writerow(
+                    COPY_NULL if value is None else value for value in row)
+            buffer.seek(0)
+            cursor.copy_expert(
+                f"COPY {quote(table)} ({column_list}) FROM STDIN "
+                f"WITH (FORMAT csv, NULL '{COPY_NULL}')",
+                buffer,
+            )
+            return
+        placeholders = ', '.join(['%s'] * len(columns))
+        cursor.executemany(
+            f'INSERT INTO {quote(table)} ({column_list}) '
+            f'VALUES ({placeholders})',
+            batch,
+        )
+
+    def ensure_tags(self, count):
+        existing = Tag.objects.count()
+        Tag.objects.bulk_create([
+            Tag(name=f'Тег {number}', slug=f'tag-{number}')
+            for number in range(existing + 1, count + 1)
+        ])
+        return list(Tag.objects.filter(
+            pk__lte=TAG_BITMASK_CAPACITY).values_list('pk', flat=True))
+
+    def ensure_ingredients(self, count):
+        if not Ingredient.objects.exists():
+            self.insert(Ingredient, ['name', 'measurement_unit'], (
+                (f'ингредиент {number}', self.rng.choice(UNITS))
+                for number in range(1, count + 1)
+            ))
+        return list(Ingredient.objects.values_list('pk', flat=True))
+
+    def generate_users(self, count):
+        first = next_id(User)
+        ids = range(first, first + count)
+        # Один хэш на всех: PBKDF2 на каждого занял бы часы.
+        password = make_password(
+            'dataset-password', salt=f'dataset{self.options["seed"]}')
+        joined = connection.ops.adapt_datetimefield_value(
+            timezone.now().replace(microsecond=0))
+        self.insert(User, [
+            'id', 'password', 'last_login', 'is_superuser', 'username',
+            'first_name', 'last_name', 'email', 'is_staff', 'is_active',
+            'date_joined', 'avatar',
+        ], (
+            (
+                pk, password, None, False, f'user{pk}',
+                self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES),
+                f'user{pk}@example.com', False, True, joined, '',
+            )
+            for pk in ids
+        ))
+        return list(ids)
+
+    def generate_recipes(self, count, authors, tag_ids, ingredient_ids):
+        first = next_id(Recipe)
+        ids = range(first, first + count)
+        image = default_storage.save(
+            'recipes/images/dataset.png',
+            ContentFile(get_placeholder_bytes()),
+        )
+        schedule_derivatives(image, RECIPE_IMAGE_SIZES)
+        tags = Zipf(self.rng, tag_ids, self.options['zipf'])
+        ingredients = Zipf(self.rng, ingredient_ids, self.options['zipf'])
+        end = timezone.now().replace(microsecond=0)
+        step = timedelta(days=PUBLISHED_WITHIN_DAYS) / count
+        recipe_tags = {pk: tags.sample(self.rng.randint(1, 3)) for pk in ids}
+
+        def recipes():
+            for number, pk in enumerate(ids):
+                name = (
+                    f'{self.rng.choice(DISHES)} '
+                    f'{self.rng.choice(DISH_DETAILS)} №{pk}'
+                )
+                # Логнормальное время: в основном 15–60 минут.
+                cooking_time = max(1, min(
+                    600, int(self.rng.lognormvariate(3.4, 0.6))))
+                published = end - step * (count - number)
+                yield (
+                    pk, name, authors.choice(), f'Описание рецепта «{name}».',
+                    image, cooking_time,
+                    connection.ops.adapt_datetimefield_value(published),
+                    build_tags_mask(recipe_tags[pk]), encode_short_code(pk),
+                )
+
+        self.insert(Recipe, [
+            'id', 'name', 'author', 'text', 'image', 'cooking_time',
+            'pub_date', 'tags_mask', 'short_code',
+        ], recipes())
+        self.insert(Recipe.tags.through, ['recipe', 'tag'], (
+            (pk, tag_id) for pk in ids for tag_id in recipe_tags[pk]))
+        mean = self.options['ingredients_per_recipe']
+        self.insert(RecipeIngredient, ['recipe', 'ingredient', 'amount'], (
+            (pk, ingredient_id, self.rng.randint(1, 500))
+            for pk in ids
+            for ingredient_id in ingredients.sample(
+                max(1, int(self.rng.gauss(mean, mean / 3))))
+        ))
+        # Журнал — тоже COPY: без списка объектов на каждый рецепт.
+        changed_at = connection.ops.adapt_datetimefield_value(timezone.now())
+        txid = RecipeChange.current_txid()
+        self.insert(
+            RecipeChange, ['recipe_id', 'action', 'changed_at', 'txid'],
+            ((pk, RecipeChange.CREATED, changed_at, txid) for pk in ids),
+        )
+        return list(ids)
+
+    def generate_user_recipes(self, model, user_ids, recipes, mean):
+        """Избранное или корзина: у большинства мало, у немногих много."""
+        if mean <= 0:
+            return
+        self.insert(model, ['user', 'recipe'], (
+            (user_id, recipe_id)
+            for user_id in user_ids
+            for recipe_id in recipes.sample(
+                int(self.rng.expovariate(1 / mean)))
+        ))
+
+    def generate_follows(self, user_ids, authors, mean):
+        """Подписки тяготеют к тем же популярным авторам."""
+        if mean <= 0:
+            return
+        self.insert(Follow, ['follower', 'following'], (
+            (user_id, author_id)
+            for user_id in user_ids
+            for author_id in authors.sample(
+                int(self.rng.expovariate(1 / mean)), exclude=user_id)
+        ))
+
+    def reset_sequences(self):
+        sql = connection.ops.sequence_reset_sql(no_style(), [
+            User, Ingredient, Tag, Recipe, Recipe.tags.through,
+            RecipeIngredient, Favorite, ShoppingCart, Follow,
+        ])
+        with connection.cursor() as cursor:
+            for statement in sql:
+                cursor.execute(statement)
@@ -0,0 +1,62 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from foodgram.constants import AVATAR_IMAGE_SIZES, RECIPE_IMAGE_SIZES
+from foodgram.images import generate_derivatives
+from recipes.models import Recipe
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт миниатюры для уже загруженных изображений и аватаров '
+        'и записывает их ширины в строки (для srcset).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересоздать миниатюры, даже если они уже есть.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Число параллельных потоков.',
+        )
+
+    def _generate(self, name, sizes, force):
+        try:
+            return name, generate_derivatives(name, sizes, force=force), None
+        except Exception as error:
+            return name, 0, error
+        finally:
+            connection.close()
+
+    def handle(self, *args, **options):
+        jobs = [
+            (name, RECIPE_IMAGE_SIZES)
+            for name in Recipe.objects.exclude(image='')
+            .order_by().values_list('image', flat=True).distinct().iterator()
+        ] + [
+            (name, AVATAR_IMAGE_SIZES)
+            for name in User.objects.exclude(avatar='').exclude(avatar=None)
+            .order_by().values_list('avatar', flat=True).distinct()
+            .iterator()
+        ]
+        created = skipped = failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            results = executor.map(
+                lambda job: self._generate(*job, options['force']), jobs)
+            for name, count, error in results:
+                if error:
+                    failed += 1
+                    self.stdout.write(self.style.WARNING(f'{name}: {error}'))
+                elif count:
+                    created += 1
+                else:
+                    skipped += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово! Обработано: {created}, уже были: {skipped}, '
+            f'ошибок: {failed}.'
+        ))
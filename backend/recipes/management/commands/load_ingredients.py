@@ -0,0 +1,167 @@
+import csv
+import io
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from foodgram.constants import ITEM_NAME_LIMIT
+from recipes.models import Ingredient
+
+DEFAULT_PATH = settings.BASE_DIR / 'data' / 'ingredients.csv'
+CSV_HEADER = ['name', 'measurement_unit']
+JSON_CHUNK = 64 * 1024
+STAGING_TABLE = 'ingredient_import'
+SEPARATORS = ' \t\r\n,'
+
+
+def read_csv(file):
+    rows = csv.reader(file)
+    for row in rows:
+        # Первая строка может быть заголовком.
+        if [value.strip() for value in row] != CSV_HEADER:
+            yield row
+        break
+    yield from rows
+
+
+def read_json(file):
+    """
+    Объекты JSON-массива по одному, без загрузки файла целиком.
+    Файл из объектов по строкам (JSON Lines) тоже подходит.
+    """
+    decoder = json.JSONDecoder()
+    buffer = file.read(JSON_CHUNK).lstrip()
+    position = 1 if buffer.startswith('[') else 0
+    eof = not buffer
+    while True:
+        while position < len(buffer) and buffer[position] in SEPARATORS:
+            position += 1
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except ValueError:
+            if eof:
+                if position >= len(buffer):
+                    return
+                raise CommandError(
+                    f'Некорректный JSON: {buffer[position:][:80]!r}')
+            chunk = file.read(JSON_CHUNK)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        if isinstance(item, dict):
+            yield [item.get('name', ''), item.get('measurement_unit', '')]
+        else:
+            yield item
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоковая загрузка ингредиентов из CSV или JSON. Уже '
+        'существующие пары (название, единица) пропускаются: '
+        'ON CONFLICT по unique_ingredient, на PostgreSQL — через COPY '
+        'во временную таблицу.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default=str(DEFAULT_PATH),
+            help='Файл .csv (название, единица) или .json/.jsonl.',
+        )
+        parser.add_argument(
+            '--format', choices=('csv', 'json'),
+            help='Формат файла (по умолчанию — по расширению).',
+        )
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f'Файл {path} не найден.')
+        file_format = options['format'] or (
+            'csv' if path.suffix.lower() == '.csv' else 'json')
+        reader = read_csv if file_format == 'csv' else read_json
+        started = time.perf_counter()
+        inserted = valid = invalid = 0
+        with open(path, encoding='utf-8', newline='') as file, \
+                transaction.atomic():
+            insert = self.start_postgresql() if (
+                connection.vendor == 'postgresql') else self.insert_batch
+            for batch in batches(reader(file), options['batch_size']):
+                rows = [self.clean(row) for row in batch]
+                rows = [row for row in rows if row]
+                invalid += len(batch) - len(rows)
+                valid += len(rows)
+                inserted += insert(rows) if rows else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Добавлено: {inserted}, уже были в базе или повторялись: '
+            f'{valid - inserted}, некорректных строк: {invalid} '
+            f'({time.perf_counter() - started:.1f} с).'
+        ))
+
+    @staticmethod
+    def clean(row):
+        """(название, единица) или None для некорректной строки."""
+        if len(row) < 2:
+            return None
+        name, unit = (str(value).strip() for value in row[:2])
+        if not name or not unit or max(len(name), len(unit)) > (
+            ITEM_NAME_LIMIT
+        ):
+            return None
+        return name, unit
+
+    @staticmethod
+    def insert_batch(rows):
+        table = connection.ops.quote_name(Ingredient._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                f'VALUES (%s, %s) ON CONFLICT DO NOTHING',
+                rows,
+            )
+            return cursor.rowcount
+
+    @staticmethod
+    def start_postgresql():
+        """Временная таблица на время транзакции и вставка пачек через неё."""
+        table = connection.ops.quote_name(Ingredient._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE {STAGING_TABLE} '
+                f'(name text, measurement_unit text) ON COMMIT DROP'
+            )
+
+        def insert(rows):
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(rows)
+            buffer.seek(0)
+            with connection.cursor() as cursor:
+                cursor.copy_expert(
+                    f'COPY {STAGING_TABLE} FROM STDIN WITH (FORMAT csv)',
+                    buffer,
+                )
+                cursor.execute(
+                    f'INSERT INTO {table} (name, measurement_unit) '
+                    f'SELECT DISTINCT name, measurement_unit '
+                    f'FROM {STAGING_TABLE} '
+                    f'ON CONFLICT ON CONSTRAINT unique_ingredient DO NOTHING'
+                )
+                inserted = cursor.rowcount
+                cursor.execute(f'TRUNCATE {STAGING_TABLE}')
+            return inserted
+
+        return insert
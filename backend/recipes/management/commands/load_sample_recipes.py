@@ -1,26 +1,118 @@
 # flake8: noqa: F401
 # -*- coding: utf-8 -*-
 from typing import Optional
-import base64
+import json
+from pathlib import Path
 from random import randint, sample
 
+from django.core.exceptions import ValidationError
 from django.core.files.base import ContentFile
-from django.core.management.base import BaseCommand
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
-from django.utils.text import slugify
 
-from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from foodgram.cache import RECIPES_NAMESPACE, bump_version
+from foodgram.constants import RECIPE_IMAGE_SIZES
+from foodgram.images import get_placeholder_bytes, schedule_derivatives
+from recipes.models import (
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    Tag,
+)
 from users.models import User
 
-# 1×1 прозрачный PNG (без Pillow), чтобы пройти required ImageField
-PNG_1PX_B64 = (
-    b"iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR4nGMA"
-    b"AQAABQABDQottAAAAABJRU5ErkJggg=="
-)
+
+# Одна картинка на все рецепты загрузки
+SAMPLE_IMAGE_NAME = "recipes/images/sample.png"
+BATCH_SIZE = 1000
+# Имён в одном name__in: ниже лимита параметров SQLite (999)
+NAME_LOOKUP_CHUNK = 500
+# Поля рецепта, которые приходят из файла и проверяются валидаторами модели
+RECIPE_FILE_FIELDS = ("name", "text", "cooking_time")
+
+
+def chunks(names):
+    """Отсортированные names частями по NAME_LOOKUP_CHUNK."""
+    names = sorted(names)
+    for start in range(0, len(names), NAME_LOOKUP_CHUNK):
+        yield names[start:start + NAME_LOOKUP_CHUNK]
+
+
+def validate(recipe: dict) -> None:
+    """
+    Проверяет рецепт валидаторами моделей (длины, время, количества)
+    до bulk_create, который их не вызывает.
+    """
+    Recipe(
+        name=recipe["name"],
+        text=recipe["text"],
+        cooking_time=recipe["time"],
+    ).clean_fields(exclude=[
+        field.name for field in Recipe._meta.fields
+        if field.name not in RECIPE_FILE_FIELDS
+    ])
+    # Повторы ингредиента суммируются в одну связь
+    amounts = {}
+    for name, amount, unit in recipe["components"]:
+        amounts[(name, unit)] = amounts.get((name, unit), 0) + amount
+    for (name, unit), amount in amounts.items():
+        Ingredient(name=name, measurement_unit=unit).clean_fields()
+        RecipeIngredient(amount=amount).clean_fields(
+            exclude=["recipe", "ingredient"]
+        )
+
+
+def normalize(item: dict) -> dict:
+    """
+    Рецепт из JSON-файла в виде встроенных RECIPES.
+
+    Ингредиенты — "components": [[название, количество, единица], ...]
+    или "ingredients": [{"name", "measurement_unit", "amount"}, ...];
+    время — "time" или "cooking_time"; "tags" — необязательный список
+    slug существующих тегов.
+    """
+    try:
+        components = item.get("components") or [
+            (ingr["name"], ingr["amount"], ingr["measurement_unit"])
+            for ingr in item["ingredients"]
+        ]
+        recipe = {
+            "name": item["name"].strip(),
+            "time": int(item.get("time") or item["cooking_time"]),
+            "text": item["text"],
+            "components": [
+                (name.strip(), int(amount), unit.strip())
+                for name, amount, unit in components
+            ],
+            "tags": item.get("tags"),
+        }
+        validate(recipe)
+    except ValidationError as e:
+        raise CommandError(
+            f"Некорректный рецепт {str(item)[:80]}: {e.messages}"
+        ) from e
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        raise CommandError(
+            f"Некорректный рецепт {str(item)[:80]}: {e!r}"
+        ) from e
+    return recipe
 
 
-def get_placeholder_bytes() -> bytes:
-    return base64.b64decode(PNG_1PX_B64)
+def read_recipes(paths) -> list:
+    if not paths:
+        return [normalize(item) for item in RECIPES]
+    items = []
+    for path in paths:
+        try:
+            with open(path, encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Не удалось прочитать {path}: {e}") from e
+        if isinstance(data, dict):
+            data = data.get("results", [data])
+        items.extend(normalize(item) for item in data)
+    return items
 
 
 # Справочник единиц
@@ -266,9 +358,21 @@ RECIPES = [
 
 
 class Command(BaseCommand):
-    help = "Загружает тестовые рецепты. Теги берутся из БД (случайные), новые теги не создаются."
+    help = (
+        "Загружает тестовые рецепты (встроенные или из JSON-файлов) пачками. "
+        "Теги берутся из БД, новые теги не создаются; недостающие "
+        "ингредиенты создаются."
+    )
 
     def add_arguments(self, parser):
+        parser.add_argument(
+            "files",
+            nargs="*",
+            help=(
+                "JSON-файлы со списками рецептов "
+                "(по умолчанию — встроенные рецепты)."
+            ),
+        )
         parser.add_argument(
             "--user-email",
             type=str,
@@ -282,6 +386,7 @@ class Command(BaseCommand):
             type=str,
             help="Путь к картинке по умолчанию для всех рецептов (необязательно).",
         )
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
 
     def _resolve_author(self, email: Optional[str]) -> User:
         if email:
@@ -296,78 +401,153 @@ class Command(BaseCommand):
             raise SystemExit("Не найдено ни одного пользователя. Создайте пользователя и повторите.")
         return author
 
-    def _get_or_create_ingredient(self, name: str, unit: str) -> Ingredient:
-        obj, _ = Ingredient.objects.get_or_create(
-            name=name.strip(),
-            measurement_unit=unit.strip(),
-        )
-        return obj
-
-    @transaction.atomic
-    def handle(self, *args, **options):
-        author = self._resolve_author(options.get("user_email"))
-        default_image_path = options.get("image")
-
-        # Байты изображения
-        if default_image_path:
+    def _store_image(self, path: Optional[str]) -> str:
+        """Имя файла картинки, общей для всех рецептов загрузки."""
+        if path:
             try:
-                with open(default_image_path, "rb") as fh:
-                    raw_image_bytes = fh.read()
+                with open(path, "rb") as fh:
+                    return default_storage.save(
+                        f"recipes/images/{Path(path).name}",
+                        ContentFile(fh.read()),
+                    )
             except Exception as e:
                 self.stdout.write(self.style.WARNING(
-                    f"Не удалось прочитать файл {default_image_path}: {e}. "
+                    f"Не удалось прочитать файл {path}: {e}. "
                     f"Будет использован плейсхолдер 1×1 PNG."
                 ))
-                raw_image_bytes = get_placeholder_bytes()
-        else:
-            raw_image_bytes = get_placeholder_bytes()
+        # Хранилище адресует файлы по содержимому: повторный запуск
+        # получит тот же файл, а не копию.
+        return default_storage.save(
+            SAMPLE_IMAGE_NAME, ContentFile(get_placeholder_bytes())
+        )
+
+    @staticmethod
+    def _lookup_ingredients(pairs) -> dict:
+        """{(название, единица): id} для пар pairs, что уже есть в БД."""
+        ids = {}
+        for names in chunks({name for name, _ in pairs}):
+            ids.update(
+                ((name, unit), pk)
+                for pk, name, unit in Ingredient.objects.filter(
+                    name__in=names
+                ).values_list("pk", "name", "measurement_unit")
+                if (name, unit) in pairs
+            )
+        return ids
+
+    @staticmethod
+    def _existing_recipe_names(names) -> set:
+        """Какие из names уже есть среди рецептов."""
+        existing = set()
+        for chunk in chunks(names):
+            existing.update(Recipe.objects.filter(
+                name__in=chunk
+            ).values_list("name", flat=True))
+        return existing
+
+    def _ingredient_ids(self, items, batch_size: int) -> dict:
+        """
+        {(название, единица): id}; недостающие создаются одной пачкой.
+
+        Читаются только нужные ингредиенты — по name__in частями,
+        а не весь справочник.
+        """
+        wanted = {
+            (name, unit)
+            for item in items
+            for name, _, unit in item["components"]
+        }
+        ids = self._lookup_ingredients(wanted)
+        missing = wanted - ids.keys()
+        if missing:
+            Ingredient.objects.bulk_create(
+                [Ingredient(name=name, measurement_unit=unit)
+                 for name, unit in sorted(missing)],
+                batch_size=batch_size,
+                ignore_conflicts=True,
+            )
+            ids.update(self._lookup_ingredients(missing))
+            self.stdout.write(f"Создано ингредиентов: {len(missing)}.")
+        return ids
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        author = self._resolve_author(options.get("user_email"))
+        batch_size = options["batch_size"]
+        items = read_recipes(options["files"])
 
         # Теги из БД (без создания)
         all_tags = list(Tag.objects.all())
+        tags_by_slug = {tag.slug: tag for tag in all_tags}
         if not all_tags:
             self.stdout.write(self.style.WARNING(
                 "В БД нет тегов. Рецепты будут созданы без тегов."
             ))
         else:
             self.stdout.write(self.style.SUCCESS(
-                f"Доступно тегов: {len(all_tags)}. Будут назначаться случайно 1–3 на рецепт."
+                f"Доступно тегов: {len(all_tags)}. Рецептам без тегов в файле "
+                f"будут назначаться случайно 1–3."
             ))
 
-        created, skipped = 0, 0
-
-        for item in RECIPES:
-            if Recipe.objects.filter(name=item["name"]).exists():
-                skipped += 1
-                self.stdout.write(f'— пропуск: рецепт "{item["name"]}" уже существует')
+        # Существующие и повторяющиеся в файлах рецепты пропускаются
+        existing = self._existing_recipe_names(
+            {item["name"] for item in items}
+        )
+        new_items = []
+        for item in items:
+            if item["name"] in existing:
                 continue
+            existing.add(item["name"])
+            new_items.append(item)
+        skipped = len(items) - len(new_items)
+        if not new_items:
+            self.stdout.write(self.style.SUCCESS(
+                f"Готово! Создано: 0, пропущено (существовали): {skipped}."
+            ))
+            return
 
-            recipe = Recipe(
-                name=item["name"],
-                author=author,
-                text=item["text"],
-                cooking_time=item["time"],
-            )
-
-            # каждому рецепту — новый ContentFile из одних и тех же байтов
-            image_name = f'{slugify(item["name"])}.png'
-            recipe.image.save(image_name, ContentFile(raw_image_bytes), save=False)
-            recipe.save()
+        ingredient_ids = self._ingredient_ids(new_items, batch_size)
+        image = self._store_image(options.get("image"))
+        schedule_derivatives(image, RECIPE_IMAGE_SIZES)
 
-            # Случайные теги из существующих
-            if all_tags:
-                k = randint(1, min(3, len(all_tags)))
-                recipe.tags.set(sample(all_tags, k))
+        recipe_tags = []
+        for item in new_items:
+            if item["tags"] is not None:
+                tags = [tags_by_slug[slug] for slug in item["tags"]
+                        if slug in tags_by_slug]
+            elif all_tags:
+                tags = sample(all_tags, randint(1, min(3, len(all_tags))))
+            else:
+                tags = []
+            recipe_tags.append(tags)
 
-            # Ингредиенты и связи
+        ingredient_amounts = []
+        for item in new_items:
+            # Повтор ингредиента в рецепте — одна связь с суммой количеств
+            amounts = {}
             for name, amount, unit in item["components"]:
-                ingr = self._get_or_create_ingredient(name, unit)
-                RecipeIngredient.objects.create(
-                    recipe=recipe, ingredient=ingr, amount=int(amount)
-                )
+                pk = ingredient_ids[(name, unit)]
+                amounts[pk] = amounts.get(pk, 0) + amount
+            ingredient_amounts.append(amounts)
 
-            created += 1
-            self.stdout.write(self.style.SUCCESS(f'✓ создан рецепт: "{recipe.name}"'))
+        recipes = Recipe.bulk_create_with_relations(
+            [
+                Recipe(
+                    name=item["name"],
+                    author=author,
+                    text=item["text"],
+                    cooking_time=item["time"],
+                    image=image,
+                )
+                for item in new_items
+            ],
+            [[tag.pk for tag in tags] for tags in recipe_tags],
+            ingredient_amounts,
+            batch_size=batch_size,
+        )
+        transaction.on_commit(lambda: bump_version(RECIPES_NAMESPACE))
 
         self.stdout.write(self.style.SUCCESS(
-            f"Готово! Создано: {created}, пропущено (существовали): {skipped}."
+            f"Готово! Создано: {len(recipes)}, "
+            f"пропущено (существовали): {skipped}."
         ))
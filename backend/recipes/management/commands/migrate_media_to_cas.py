@@ -0,0 +1,68 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from foodgram.storage import (
+    ContentAddressedStorage,
+    is_content_addressed,
+    reference_fields,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит существующие медиафайлы в хранилище с адресацией '
+        'по содержимому и удаляет старые копии.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет перенесено.',
+        )
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ContentAddressedStorage):
+            raise CommandError(
+                'Хранилище по умолчанию не ContentAddressedStorage.')
+        dry_run = options['dry_run']
+        renamed = {}
+        missing = updated = 0
+        for model, field in reference_fields():
+            reference = f'{model._meta.label}.{field}'
+            rows = (
+                model._default_manager.exclude(**{field: ''})
+                .exclude(**{f'{field}__isnull': True})
+                .order_by().values_list('pk', field)
+            )
+            for pk, name in rows.iterator():
+                if is_content_addressed(name):
+                    continue
+                if name not in renamed:
+                    if not default_storage.exists(name):
+                        missing += 1
+                        self.stdout.write(self.style.WARNING(
+                            f'{reference} #{pk}: файл {name} не найден'))
+                        continue
+                    if dry_run:
+                        renamed[name] = name
+                    else:
+                        with default_storage.open(name, 'rb') as file:
+                            renamed[name] = default_storage.save(name, file)
+                if not dry_run:
+                    model._default_manager.filter(pk=pk).update(
+                        **{field: renamed[name]})
+                updated += 1
+                self.stdout.write(f'{reference} #{pk}: {name} → '
+                                  f'{renamed[name]}')
+        if not dry_run:
+            # Без ссылок — удаляются вместе с миниатюрами.
+            default_storage.delete_batch(renamed)
+        unique = len(set(renamed.values()))
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово! Ссылок обновлено: {updated}, файлов: {len(renamed)}, '
+            f'уникальных по содержимому: {unique}, не найдено: {missing}.'
+        ))
+        if updated and not dry_run:
+            self.stdout.write(
+                'Миниатюры для новых имён: '
+                'python manage.py generate_image_derivatives')
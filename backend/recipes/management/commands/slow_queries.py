@@ -0,0 +1,104 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+ORDERINGS = ('total', 'max', 'count', 'mean')
+
+
+def log_files(path):
+    """Журнал и его ротированные копии (path.1, path.2, ...)."""
+    files = [path]
+    index = 1
+    while (backup := Path(f'{path}.{index}')).exists():
+        files.append(backup)
+        index += 1
+    return [file for file in files if file.exists()]
+
+
+class Command(BaseCommand):
+    help = (
+        'Самые тяжёлые запросы из журнала медленных SQL (SLOW_QUERY_MS), '
+        'сгруппированные по нормализованному тексту.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--order', choices=ORDERINGS, default='total',
+            help='Сортировка: суммарное, максимальное, среднее время '
+                 'или число повторов.',
+        )
+        parser.add_argument(
+            '--limit', type=int, default=10,
+            help='Сколько запросов показать.',
+        )
+        parser.add_argument(
+            '--plans', action='store_true',
+            help='Показать последний снятый план EXPLAIN.',
+        )
+        parser.add_argument(
+            '--log', type=str, default=settings.SLOW_QUERY_LOG,
+            help='Путь к журналу.',
+        )
+
+    def collect(self, files):
+        groups = {}
+        for file in files:
+            with open(file, encoding='utf-8') as lines:
+                for line in lines:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    group = groups.setdefault(entry['fingerprint'], {
+                        'sql': entry['sql'],
+                        'count': 0,
+                        'total': 0.0,
+                        'max': 0.0,
+                        'last': '',
+                        'path': None,
+                        'stack': [],
+                        'plan': None,
+                    })
+                    group['count'] += 1
+                    group['total'] += entry['ms']
+                    if entry['ms'] >= group['max']:
+                        group['max'] = entry['ms']
+                        group['path'] = entry.get('path')
+                        group['stack'] = entry['stack']
+                    if entry['at'] >= group['last']:
+                        group['last'] = entry['at']
+                        group['plan'] = entry.get('plan') or group['plan']
+        for group in groups.values():
+            group['mean'] = group['total'] / group['count']
+        return groups
+
+    def handle(self, *args, **options):
+        files = log_files(Path(options['log']))
+        if not files:
+            raise CommandError(
+                f'Журнал {options["log"]} пуст. Включите SLOW_QUERY_MS.')
+        groups = sorted(
+            self.collect(files).items(),
+            key=lambda item: item[1][options['order']],
+            reverse=True,
+        )
+        for fingerprint, group in groups[:options['limit']]:
+            self.stdout.write(self.style.SUCCESS(
+                f'[{fingerprint}] {group["count"]} раз, '
+                f'всего {group["total"]:.0f} мс, '
+                f'среднее {group["mean"]:.1f} мс, '
+                f'максимум {group["max"]:.1f} мс, '
+                f'последний {group["last"]}'
+            ))
+            self.stdout.write(f'  {group["sql"]}')
+            if group['path']:
+                self.stdout.write(f'  запрос: {group["path"]}')
+            for frame in group['stack']:
+                self.stdout.write(f'    {frame}')
+            if options['plans'] and group['plan']:
+                for line in group['plan'].splitlines():
+                    self.stdout.write(f'    | {line}')
+        self.stdout.write(
+            f'Групп: {len(groups)}, файлов журнала: {len(files)}.')
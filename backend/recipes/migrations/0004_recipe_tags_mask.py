@@ -0,0 +1,37 @@
+# Generated by Django 4.2.11 on 2026-10-19 07:56
+
+from django.db import migrations, models
+
+TAG_BITMASK_CAPACITY = 63
+BATCH_SIZE = 1000
+
+
+def backfill_tags_mask(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    masks = {}
+    for recipe_id, tag_id in Recipe.tags.through.objects.values_list(
+        'recipe_id', 'tag_id'
+    ).iterator():
+        if 0 < tag_id <= TAG_BITMASK_CAPACITY:
+            masks[recipe_id] = masks.get(recipe_id, 0) | 1 << (tag_id - 1)
+    recipes = [
+        Recipe(pk=recipe_id, tags_mask=mask)
+        for recipe_id, mask in masks.items()
+    ]
+    Recipe.objects.bulk_update(recipes, ['tags_mask'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_alter_favorite_options_alter_shoppingcart_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='tags_mask',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False, verbose_name='Битовая маска тегов'),
+        ),
+        migrations.RunPython(backfill_tags_mask, migrations.RunPython.noop),
+    ]
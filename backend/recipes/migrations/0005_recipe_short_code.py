@@ -0,0 +1,35 @@
+# Generated by Django 4.2.11 on 2026-10-19 08:07
+
+from django.conf import settings
+from django.db import migrations, models
+from hashids import Hashids
+
+SHORT_CODE_MIN_LENGTH = 3
+BATCH_SIZE = 1000
+
+
+def backfill_short_code(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    encoder = Hashids(salt=settings.SECRET_KEY, min_length=SHORT_CODE_MIN_LENGTH)
+    recipes = [
+        Recipe(pk=pk, short_code=encoder.encode(pk))
+        for pk in Recipe.objects.filter(short_code=None).values_list(
+            'pk', flat=True).iterator()
+    ]
+    Recipe.objects.bulk_update(recipes, ['short_code'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_tags_mask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='short_code',
+            field=models.CharField(editable=False, max_length=16, null=True, unique=True, verbose_name='Короткий код'),
+        ),
+        migrations.RunPython(backfill_short_code, migrations.RunPython.noop),
+    ]
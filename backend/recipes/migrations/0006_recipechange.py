@@ -0,0 +1,45 @@
+# Generated by Django 4.2.11 on 2026-10-19 08:52
+
+from itertools import islice
+
+from django.db import migrations, models
+
+BATCH_SIZE = 5000
+
+
+def backfill_changes(apps, schema_editor):
+    """Уже существующие рецепты попадают в журнал как созданные."""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeChange = apps.get_model('recipes', 'RecipeChange')
+    ids = Recipe.objects.order_by('pk').values_list('pk', flat=True).iterator(
+        chunk_size=BATCH_SIZE)
+    while batch := list(islice(ids, BATCH_SIZE)):
+        RecipeChange.objects.bulk_create([
+            RecipeChange(recipe_id=pk, action='created') for pk in batch
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_short_code'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('recipe_id', models.BigIntegerField(verbose_name='Рецепт')),
+                ('action', models.CharField(choices=[('created', 'Создан'), ('updated', 'Изменён'), ('deleted', 'Удалён')], max_length=7, verbose_name='Действие')),
+                ('changed_at', models.DateTimeField(auto_now_add=True, verbose_name='Время')),
+            ],
+            options={
+                'verbose_name': 'Изменение рецепта',
+                'verbose_name_plural': 'Журнал изменений рецептов',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['recipe_id', 'id'], name='recipe_change_recipe_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_changes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.11 on 2026-10-19 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipechange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, editable=False, help_text='Имя оригинала и фактические ширины миниатюр.', null=True, verbose_name='Миниатюры изображения'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(db_index=True, upload_to='recipes/images/', verbose_name='Изображение блюда'),
+        ),
+    ]
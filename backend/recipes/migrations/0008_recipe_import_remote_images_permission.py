@@ -0,0 +1,17 @@
+# Generated by Django 4.2.11 on 2026-10-19 09:17
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='recipe',
+            options={'default_related_name': 'recipes', 'ordering': ['-pub_date'], 'permissions': [('import_remote_images', 'Может импортировать рецепты с изображением по URL')], 'verbose_name': 'Рецепт', 'verbose_name_plural': 'Рецепты'},
+        ),
+    ]
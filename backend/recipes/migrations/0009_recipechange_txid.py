@@ -0,0 +1,34 @@
+# Generated by Django 4.2.11 on 2026-10-19 09:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_import_remote_images_permission'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='recipechange',
+            options={'ordering': ['txid', 'id'], 'verbose_name': 'Изменение рецепта', 'verbose_name_plural': 'Журнал изменений рецептов'},
+        ),
+        migrations.RemoveIndex(
+            model_name='recipechange',
+            name='recipe_change_recipe_idx',
+        ),
+        migrations.AddField(
+            model_name='recipechange',
+            name='txid',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Транзакция'),
+        ),
+        migrations.AddIndex(
+            model_name='recipechange',
+            index=models.Index(fields=['txid', 'id'], name='recipe_change_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipechange',
+            index=models.Index(fields=['recipe_id', 'txid', 'id'], name='recipe_change_recipe_idx'),
+        ),
+    ]
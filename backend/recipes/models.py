@@ -1,6 +1,8 @@
+from functools import lru_cache
+
 from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connection, connections, models, transaction
 from hashids import Hashids
 from users.models import User
 
@@ -13,9 +15,37 @@ from foodgram.constants import (
     MINIMUM_QUANTITY,
     PREP_TIME_LOWER,
     PREP_TIME_UPPER,
+    SHORT_CODE_MAX_LENGTH,
+    SHORT_CODE_MIN_LENGTH,
+    TAG_BITMASK_CAPACITY,
 )
 
 
+def build_tags_mask(tag_ids):
+    """Битовая маска тегов по их id (id вне ёмкости маски пропускаются)."""
+    mask = 0
+    for tag_id in tag_ids:
+        if 0 < tag_id <= TAG_BITMASK_CAPACITY:
+            mask |= 1 << (tag_id - 1)
+    return mask
+
+
+@lru_cache(maxsize=None)
+def short_code_encoder():
+    """Один экземпляр Hashids на процесс."""
+    return Hashids(salt=settings.SECRET_KEY, min_length=SHORT_CODE_MIN_LENGTH)
+
+
+def encode_short_code(pk):
+    return short_code_encoder().encode(pk)
+
+
+def decode_short_code(code):
+    """pk из короткого кода или None, если код некорректен."""
+    decoded = short_code_encoder().decode(code)
+    return decoded[0] if len(decoded) == 1 else None
+
+
 class RecipeIngredient(models.Model):
     """Связь между рецептом и ингредиентами."""
 
@@ -78,6 +108,14 @@ class Recipe(models.Model):
     image = models.ImageField(
         upload_to='recipes/images/',
         verbose_name='Изображение блюда',
+        db_index=True,
+    )
+    image_derivatives = models.JSONField(
+        'Миниатюры изображения',
+        null=True,
+        blank=True,
+        editable=False,
+        help_text='Имя оригинала и фактические ширины миниатюр.',
     )
     cooking_time = models.PositiveSmallIntegerField(
         validators=[
@@ -107,17 +145,110 @@ class Recipe(models.Model):
         related_name='recipes',
         verbose_name='Ингредиенты',
     )
+    # Денормализованная копия tags: бит (id - 1) выставлен для каждого тега.
+    tags_mask = models.BigIntegerField(
+        default=0,
+        db_index=True,
+        editable=False,
+        verbose_name='Битовая маска тегов',
+    )
+    # Код для /s/<код>; совпадает с прежним хэшем id, старые ссылки живы.
+    short_code = models.CharField(
+        max_length=SHORT_CODE_MAX_LENGTH,
+        unique=True,
+        null=True,
+        editable=False,
+        verbose_name='Короткий код',
+    )
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         default_related_name = 'recipes'
+        permissions = [
+            ('import_remote_images',
+             'Может импортировать рецепты с изображением по URL'),
+        ]
+
+    @classmethod
+    def refresh_tags_masks(cls, recipe_ids):
+        """Пересчитывает tags_mask у рецептов по текущим связям с тегами."""
+        recipe_ids = set(recipe_ids)
+        if not recipe_ids:
+            return
+        tag_ids = {recipe_id: [] for recipe_id in recipe_ids}
+        for recipe_id, tag_id in cls.tags.through.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'tag_id'):
+            tag_ids[recipe_id].append(tag_id)
+        for recipe_id, ids in tag_ids.items():
+            cls.objects.filter(pk=recipe_id).update(
+                tags_mask=build_tags_mask(ids))
+
+    def refresh_tags_mask(self):
+        """Пересчитывает tags_mask рецепта и обновляет его в памяти."""
+        self.tags_mask = build_tags_mask(
+            self.tags.values_list('pk', flat=True))
+        Recipe.objects.filter(pk=self.pk).update(tags_mask=self.tags_mask)
+
+    @classmethod
+    def bulk_create_with_relations(cls, recipes, tag_ids, ingredients,
+                                   batch_size=None):
+        """
+        bulk_create рецептов вместе со связями: tag_ids[i] — id тегов
+        recipes[i], ingredients[i] — {id ингредиента: количество}.
+
+        save() и сигналы не вызываются: tags_mask и short_code
+        заполняются здесь, как и журнал изменений; кэш и миниатюры —
+        забота вызывающего.
+        """
+        for recipe, ids in zip(recipes, tag_ids):
+            recipe.tags_mask = build_tags_mask(ids)
+        recipes = cls.objects.bulk_create(recipes, batch_size=batch_size)
+        for recipe in recipes:
+            recipe.short_code = encode_short_code(recipe.pk)
+        # bulk_update строит CASE на каждую строку — заметно дольше.
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'UPDATE {connection.ops.quote_name(cls._meta.db_table)} '
+                f'SET short_code = %s WHERE id = %s',
+                [(recipe.short_code, recipe.pk) for recipe in recipes],
+            )
+        cls.tags.through.objects.bulk_create(
+            [
+                cls.tags.through(recipe_id=recipe.pk, tag_id=tag_id)
+                for recipe, ids in zip(recipes, tag_ids)
+                for tag_id in ids
+            ],
+            batch_size=batch_size,
+        )
+        RecipeIngredient.objects.bulk_create(
+            [
+                RecipeIngredient(
+                    recipe_id=recipe.pk, ingredient_id=pk, amount=amount)
+                for recipe, amounts in zip(recipes, ingredients)
+                for pk, amount in amounts.items()
+            ],
+            batch_size=batch_size,
+        )
+        RecipeChange.record(
+            RecipeChange.CREATED, [recipe.pk for recipe in recipes],
+            batch_size=batch_size,
+        )
+        return recipes
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if self.short_code is None:
+            # Код строится по id, поэтому записывается после вставки.
+            self.short_code = encode_short_code(self.pk)
+            Recipe.objects.filter(pk=self.pk).update(
+                short_code=self.short_code)
 
     @property
     def short_hash(self):
-        encoder = Hashids(salt=settings.SECRET_KEY, min_length=3)
-        return encoder.encode(self.id)
+        return self.short_code or encode_short_code(self.pk)
 
     def __str__(self):
         return self.name
@@ -167,6 +298,11 @@ class Tag(models.Model):
         verbose_name = 'Тег'
         verbose_name_plural = 'Теги'
 
+    @property
+    def mask_bit(self):
+        """Бит тега в Recipe.tags_mask (0 — тег не помещается в маску)."""
+        return build_tags_mask([self.pk]) if self.pk else 0
+
     def __str__(self):
         return self.name
 
@@ -220,3 +356,89 @@ class ShoppingCart(UserRecipeBase):
         verbose_name = 'Корзина покупок'
         verbose_name_plural = 'Корзины покупок'
         default_related_name = 'shopping_carts'
+
+
+class RecipeChange(models.Model):
+    """
+    Журнал изменений рецептов для синхронизации клиентов.
+
+    Порядок журнала — (txid, id): txid — номер транзакции PostgreSQL,
+    записавшей строку. Читатель отдаёт только строки транзакций ниже
+    горизонта снимка (все они уже завершены), поэтому строка, которая
+    закоммитится позже, не окажется позади выданного курсора, и
+    писателей не нужно выстраивать в очередь. На SQLite txid = 0:
+    пишущие транзакции и так последовательны, порядок — по id.
+    """
+
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    ACTIONS = (
+        (CREATED, 'Создан'),
+        (UPDATED, 'Изменён'),
+        (DELETED, 'Удалён'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    txid = models.BigIntegerField('Транзакция', default=0, editable=False)
+    # Не внешний ключ: запись об удалении переживает рецепт.
+    recipe_id = models.BigIntegerField('Рецепт')
+    action = models.CharField('Действие', max_length=7, choices=ACTIONS)
+    changed_at = models.DateTimeField('Время', auto_now_add=True)
+
+    class Meta:
+        ordering = ['txid', 'id']
+        indexes = [
+            # Страницы журнала по курсору (txid, id).
+            models.Index(
+                fields=['txid', 'id'], name='recipe_change_order_idx'),
+            # Уплотнение ищет более поздние записи того же рецепта.
+            models.Index(
+                fields=['recipe_id', 'txid', 'id'],
+                name='recipe_change_recipe_idx',
+            ),
+        ]
+        verbose_name = 'Изменение рецепта'
+        verbose_name_plural = 'Журнал изменений рецептов'
+
+    @staticmethod
+    def current_txid():
+        """Номер текущей транзакции PostgreSQL (0 на других СУБД)."""
+        if connection.vendor != 'postgresql':
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_current_xact_id()::text::bigint')
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    def commit_horizon(using):
+        """
+        txid, ниже которого все транзакции завершены, или None, если
+        порядок id и есть порядок коммитов (не PostgreSQL).
+        """
+        db = connections[using]
+        if db.vendor != 'postgresql':
+            return None
+        with db.cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint')
+            return cursor.fetchone()[0]
+
+    @classmethod
+    def record(cls, action, recipe_ids, batch_size=None):
+        """Записывает действие по рецептам в текущей транзакции."""
+        recipe_ids = list(recipe_ids)
+        if not recipe_ids:
+            return
+        with transaction.atomic():
+            txid = cls.current_txid()
+            cls.objects.bulk_create(
+                [
+                    cls(recipe_id=recipe_id, action=action, txid=txid)
+                    for recipe_id in recipe_ids
+                ],
+                batch_size=batch_size,
+            )
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.action}'
@@ -0,0 +1,111 @@
+from django.core.cache import cache
+from django.db.models import F
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from foodgram.cache import (
+    RECIPES_NAMESPACE,
+    SHORT_LINK_KEY,
+    bump_version,
+    user_namespace,
+)
+from foodgram.constants import RECIPE_IMAGE_SIZES
+from foodgram.images import schedule_derivatives
+from .models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeChange,
+    ShoppingCart,
+    Tag,
+)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def sync_recipe_tags_mask(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    """Держит Recipe.tags_mask в соответствии со связями рецепт—тег."""
+    if action == 'pre_clear' and reverse:
+        # После очистки со стороны тега затронутые рецепты уже не найти.
+        instance._cleared_recipe_ids = list(
+            instance.recipes.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        # Рецепт правят через save(): изменение уже в журнале.
+        instance.refresh_tags_mask()
+        return
+    if action == 'post_clear':
+        pk_set = instance.__dict__.pop('_cleared_recipe_ids', ())
+    Recipe.refresh_tags_masks(pk_set)
+    RecipeChange.record(RecipeChange.UPDATED, pk_set)
+
+
+@receiver(post_delete, sender=Tag)
+def clear_deleted_tag_bit(sender, instance, **kwargs):
+    """Снимает бит удалённого тега (каскад по M2M не шлёт m2m_changed)."""
+    bit = instance.mask_bit
+    if bit:
+        recipes = Recipe.objects.alias(
+            tag_bit=F('tags_mask').bitand(bit)
+        ).filter(tag_bit=bit)
+        recipe_ids = list(recipes.values_list('pk', flat=True))
+        recipes.update(tags_mask=F('tags_mask').bitand(~bit))
+        RecipeChange.record(RecipeChange.UPDATED, recipe_ids)
+
+
+@receiver(pre_delete, sender=Ingredient)
+def log_ingredient_recipes_change(sender, instance, **kwargs):
+    """Рецепты теряют удаляемый ингредиент каскадом, без save()."""
+    RecipeChange.record(
+        RecipeChange.UPDATED,
+        instance.recipe_uses.values_list('recipe_id', flat=True),
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def log_recipe_save(sender, instance, created, **kwargs):
+    """Запись в журнал изменений в транзакции сохранения."""
+    RecipeChange.record(
+        RecipeChange.CREATED if created else RecipeChange.UPDATED,
+        [instance.pk],
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+def log_recipe_delete(sender, instance, **kwargs):
+    RecipeChange.record(RecipeChange.DELETED, [instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+@receiver([post_save, post_delete], sender=Tag)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipes_cache(sender, **kwargs):
+    """Сбрасывает кэш выборок рецептов (фасеты, счётчики)."""
+    bump_version(RECIPES_NAMESPACE)
+
+
+@receiver([post_save, post_delete], sender=Favorite)
+@receiver([post_save, post_delete], sender=ShoppingCart)
+def invalidate_user_recipes_cache(sender, instance, **kwargs):
+    """Сбрасывает кэш выборок, зависящих от избранного/корзины."""
+    bump_version(user_namespace(instance.user_id))
+
+
+@receiver(post_save, sender=Recipe)
+def create_recipe_image_derivatives(sender, instance, **kwargs):
+    """Миниатюры изображения рецепта (в фоне, после коммита)."""
+    schedule_derivatives(instance.image.name, RECIPE_IMAGE_SIZES)
+
+
+@receiver(post_delete, sender=Recipe)
+def forget_short_link(sender, instance, **kwargs):
+    """Убирает из кэша короткую ссылку удалённого рецепта."""
+    if instance.short_code:
+        cache.delete(SHORT_LINK_KEY.format(instance.short_code))
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.11 on 2026-10-19 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='avatar_derivatives',
+            field=models.JSONField(blank=True, editable=False, help_text='Имя оригинала и фактические ширины миниатюр.', null=True, verbose_name='Миниатюры аватара'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='avatar',
+            field=models.ImageField(blank=True, db_index=True, default='', null=True, upload_to='avatars/', verbose_name='Аватар'),
+        ),
+    ]
@@ -25,7 +25,15 @@ class User(AbstractUser):
         upload_to='avatars/',
         default='',
         blank=True,
-        null=True
+        null=True,
+        db_index=True,
+    )
+    avatar_derivatives = models.JSONField(
+        'Миниатюры аватара',
+        null=True,
+        blank=True,
+        editable=False,
+        help_text='Имя оригинала и фактические ширины миниатюр.',
     )
 
     USERNAME_FIELD = 'email'
@@ -0,0 +1,52 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from foodgram.cache import (
+    USERS_NAMESPACE,
+    auth_namespace,
+    bump_version,
+    token_key,
+)
+from foodgram.constants import AVATAR_IMAGE_SIZES
+from foodgram.images import schedule_derivatives
+from .models import Follow, User
+
+
+@receiver([post_save, post_delete], sender=User)
+@receiver([post_save, post_delete], sender=Follow)
+def invalidate_users_cache(sender, **kwargs):
+    """Сбрасывает кэш выборок пользователей и подписок (счётчики)."""
+    bump_version(USERS_NAMESPACE)
+
+
+@receiver(post_save, sender=User)
+def create_avatar_derivatives(sender, instance, **kwargs):
+    """Миниатюры аватара (в фоне, после коммита)."""
+    if instance.avatar:
+        schedule_derivatives(instance.avatar.name, AVATAR_IMAGE_SIZES)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_auth_cache(sender, instance, **kwargs):
+    """Пароль, is_active и профиль: закэшированные токены устаревают."""
+    # После коммита: иначе параллельный запрос закэширует старую строку.
+    namespace = auth_namespace(instance.pk)
+    transaction.on_commit(lambda: bump_version(namespace))
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token_cache(sender, instance, **kwargs):
+    """Выход (удаление токена) действует сразу."""
+    key = token_key(instance.key)
+    # Версия — на случай, если параллельный запрос уже прочитал токен
+    # из БД и положит его в кэш после удаления ключа.
+    namespace = auth_namespace(instance.user_id)
+
+    def invalidate():
+        cache.delete(key)
+        bump_version(namespace)
+
+    transaction.on_commit(invalidate)